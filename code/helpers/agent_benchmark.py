@@ -0,0 +1,215 @@
+import asyncio
+import statistics
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict, field
+from typing import Any, Callable
+
+from agents import Agent, Runner, RunConfig
+
+from helpers.fake_model_server import FakeModelServer, LatencyProfile
+from helpers.model_client import get_client, get_github_model_provider
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    runs: int
+    concurrency: int
+    errors: int
+    wall_s: float
+    runs_per_s: float
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    model_requests: int
+    memory_per_run_kib: float | None = None
+    error_samples: list[str] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list
+    """
+    if not samples:
+        return 0.0
+    rank = max(0, min(len(samples) - 1, round(pct / 100 * len(samples) + 0.5) - 1))
+    return samples[rank]
+
+
+def get_benchmark_run_config(base_url: str, model: str = "gpt-4o-mini") -> RunConfig:
+    """
+    RunConfig pointing every agent at the fake server, tracing off so no spans leave the process
+    """
+    client = get_client(base_url, "benchmark")
+    return RunConfig(
+        model_provider=get_github_model_provider(client, model),
+        tracing_disabled=True,
+    )
+
+
+async def _measure_memory(agent: Agent, inputs: list[Any], run_config: RunConfig, runs: int) -> float:
+    peaks = []
+    tracemalloc.start()
+    try:
+        for i in range(runs):
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            await Runner.run(agent, inputs[i % len(inputs)], run_config=run_config)
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+    return statistics.fmean(peaks) / 1024
+
+
+async def benchmark_agent(
+        agent: Agent,
+        inputs: list[Any],
+        run_config: RunConfig,
+        runs: int = 50,
+        concurrency: int = 10,
+        memory_runs: int = 5,
+        name: str | None = None,
+        server: FakeModelServer | None = None) -> BenchmarkResult:
+    """
+    Runs the agent graph `runs` times with at most `concurrency` sessions in flight.
+
+    Latency percentiles come from the concurrent phase, memory per run from a
+    separate sequential phase under tracemalloc so tracing does not skew latency.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    errors: list[str] = []
+    requests_before = server.requests if server else 0
+
+    async def one_run(i: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await Runner.run(agent, inputs[i % len(inputs)], run_config=run_config)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+                return
+            latencies.append(time.perf_counter() - start)
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(one_run(i) for i in range(runs)))
+    wall = time.perf_counter() - wall_start
+    model_requests = (server.requests - requests_before) if server else 0
+
+    memory = await _measure_memory(agent, inputs, run_config, memory_runs) if memory_runs else None
+
+    latencies.sort()
+    return BenchmarkResult(
+        name=name or agent.name,
+        runs=runs,
+        concurrency=concurrency,
+        errors=len(errors),
+        wall_s=wall,
+        runs_per_s=len(latencies) / wall if wall else 0.0,
+        mean_ms=statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        p50_ms=percentile(latencies, 50) * 1000,
+        p95_ms=percentile(latencies, 95) * 1000,
+        p99_ms=percentile(latencies, 99) * 1000,
+        model_requests=model_requests,
+        memory_per_run_kib=memory,
+        error_samples=errors[:5],
+    )
+
+
+async def benchmark_workflows(
+        workflows: dict[str, tuple[Callable[[], Agent], list[Any]]] | None = None,
+        latency: LatencyProfile = LatencyProfile(),
+        runs: int = 50,
+        concurrency_levels: tuple[int, ...] = (1, 10),
+        memory_runs: int = 5) -> list[BenchmarkResult]:
+    """
+    Benchmarks agent graphs offline against a FakeModelServer.
+
+    workflows maps a name to (agent factory, inputs), by default the weather graph
+    from get_attn_agent in each collector mode. Use LatencyProfile(ttft_median_ms=0, ...)
+    to measure pure orchestration overhead.
+    """
+    from helpers.wttn_agent import get_attn_agent
+    from helpers.wttn_client import WttnReportCache, set_wttn_cache
+
+    if workflows is None:
+        cities = ["what is the weather today in London", "what is the weather today in Sydney"]
+        workflows = {
+            "weather_llm_collector": (lambda: get_attn_agent(collector_mode="llm"), cities),
+            "weather_parser_collector": (lambda: get_attn_agent(collector_mode="parser"), cities),
+            "weather_findings_collector": (lambda: get_attn_agent(collector_mode="findings"), cities),
+        }
+
+    server = FakeModelServer(latency=latency)
+    base_url = server.start_in_thread()
+    # zero ttl keeps every run paying for its (local) wttr.in fetch, the caller's cache is put back after
+    previous_cache = set_wttn_cache(WttnReportCache(endpoint=f"{base_url}/wttr", ttl=0))
+    run_config = get_benchmark_run_config(base_url)
+
+    results = []
+    try:
+        for name, (factory, inputs) in workflows.items():
+            agent = factory()
+            for concurrency in concurrency_levels:
+                results.append(await benchmark_agent(
+                    agent, inputs, run_config,
+                    runs=runs, concurrency=concurrency, memory_runs=memory_runs,
+                    name=f"{name}@{concurrency}", server=server,
+                ))
+    finally:
+        set_wttn_cache(previous_cache)
+        server.stop_thread()
+    return results
+
+
+async def benchmark_hedging(
+        primary_latency: LatencyProfile = LatencyProfile(ttft_median_ms=300, ttft_sigma=1.2),
+        secondary_latency: LatencyProfile = LatencyProfile(ttft_median_ms=350, ttft_sigma=0.2),
+        primary_error_rate: float = 0.0,
+        runs: int = 50,
+        concurrency: int = 5,
+        **hedge_options) -> list[BenchmarkResult]:
+    """
+    The parser weather graph on a heavy tailed primary server alone, then hedged with a steadier secondary.
+
+    primary_error_rate injects 503s into the primary to exercise failover and its circuit breaker.
+    hedge_options go to HedgedModel.
+    """
+    from helpers.hedged_model import get_hedged_github_model_provider
+    from helpers.wttn_agent import get_attn_agent
+    from helpers.wttn_client import WttnReportCache, set_wttn_cache
+
+    primary = FakeModelServer(latency=primary_latency, error_rate=primary_error_rate, error_status=503)
+    secondary = FakeModelServer(latency=secondary_latency)
+    primary_url, secondary_url = primary.start_in_thread(), secondary.start_in_thread()
+    previous_cache = set_wttn_cache(WttnReportCache(endpoint=f"{secondary_url}/wttr", ttl=0))
+    hedged_config = RunConfig(
+        model_provider=get_hedged_github_model_provider(
+            get_client(primary_url, "benchmark"), "gpt-4o-mini",
+            secondary_client=get_client(secondary_url, "benchmark"), **hedge_options,
+        ),
+        tracing_disabled=True,
+    )
+
+    agent = get_attn_agent(collector_mode="parser")
+    inputs = ["what is the weather today in London", "what is the weather today in Sydney"]
+    try:
+        return [
+            await benchmark_agent(
+                agent, inputs, get_benchmark_run_config(primary_url),
+                runs=runs, concurrency=concurrency, memory_runs=0, name="primary_only", server=primary,
+            ),
+            await benchmark_agent(
+                agent, inputs, hedged_config,
+                runs=runs, concurrency=concurrency, memory_runs=0, name="hedged", server=primary,
+            ),
+        ]
+    finally:
+        set_wttn_cache(previous_cache)
+        primary.stop_thread()
+        secondary.stop_thread()
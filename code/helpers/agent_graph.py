@@ -0,0 +1,137 @@
+import hashlib
+import json
+from typing import Any, Iterator
+
+from pydantic import TypeAdapter
+from agents import Agent, FunctionTool
+
+
+def tool_agent(tool: Any) -> Agent | None:
+    """
+    The agent behind an Agent.as_tool() tool, None for plain function tools
+    """
+    agent = getattr(tool, "_agent_instance", None)
+    if isinstance(agent, Agent):
+        return agent
+    if not isinstance(tool, FunctionTool):
+        return None
+    # older SDKs only keep the agent in the closure of the invoke function
+    pending = [tool.on_invoke_tool]
+    seen = set()
+    while pending:
+        function = pending.pop()
+        if id(function) in seen:
+            continue
+        seen.add(id(function))
+        for cell in getattr(function, "__closure__", None) or ():
+            try:
+                value = cell.cell_contents
+            except ValueError:
+                continue
+            if isinstance(value, Agent):
+                return value
+            if callable(value) and hasattr(value, "__closure__"):
+                pending.append(value)
+    return None
+
+
+def agent_tools(agent: Agent) -> Iterator[tuple[Any, Agent]]:
+    """
+    (tool, sub agent) for every as_tool sub agent of the agent
+    """
+    for tool in agent.tools:
+        sub_agent = tool_agent(tool)
+        if sub_agent is not None:
+            yield tool, sub_agent
+
+
+def handoff_agents(agent: Agent) -> list[Agent]:
+    """
+    Agents the agent can hand off to, whether listed directly or wrapped in handoff()
+    """
+    targets = []
+    for item in agent.handoffs:
+        if isinstance(item, Agent):
+            targets.append(item)
+        else:
+            # handoff() objects only keep a weak reference to their agent
+            ref = getattr(item, "_agent_ref", None)
+            target = ref() if ref is not None else None
+            if isinstance(target, Agent):
+                targets.append(target)
+    return targets
+
+
+def walk_agents(agent: Agent) -> list[Agent]:
+    """
+    The agent and every agent reachable through handoffs and as_tool tools, each once, breadth first
+    """
+    seen = {id(agent)}
+    order = [agent]
+    for current in order:
+        for child in handoff_agents(current) + [sub_agent for _, sub_agent in agent_tools(current)]:
+            if id(child) not in seen:
+                seen.add(id(child))
+                order.append(child)
+    return order
+
+
+def find_agent(agent: Agent, name: str) -> Agent | None:
+    return next((a for a in walk_agents(agent) if a.name == name), None)
+
+
+def _describe(value: Any) -> Any:
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, type) or hasattr(value, "__origin__"):
+        try:
+            return TypeAdapter(value).json_schema()
+        except Exception:
+            return repr(value)
+    return getattr(value, "__qualname__", None) or type(value).__name__
+
+
+def _tool_identity(tool: Any) -> list:
+    # tools built by one factory share name and schema, the functions and flags captured
+    # in their closures tell them apart (e.g. the parser and findings collector tools)
+    identity = [tool.name, getattr(tool, "params_json_schema", None)]
+    pending = [getattr(tool, "on_invoke_tool", None)]
+    seen = set()
+    while pending:
+        function = pending.pop()
+        if function is None or id(function) in seen:
+            continue
+        seen.add(id(function))
+        # newer SDKs wrap the invoke function in an error handling invoker object
+        pending.append(getattr(function, "_invoke_tool_impl", None))
+        identity.append(getattr(function, "__qualname__", None))
+        for cell in getattr(function, "__closure__", None) or ():
+            try:
+                value = cell.cell_contents
+            except ValueError:
+                continue
+            if isinstance(value, (str, int, float, bool)):
+                identity.append(value)
+            elif callable(value) and hasattr(value, "__closure__"):
+                pending.append(value)
+    return identity
+
+
+def graph_fingerprint(agent: Agent) -> str:
+    """
+    Hash of what shapes the answers of an agent graph: names, instructions, models,
+    settings, output schemas, tools and handoffs of every reachable agent
+    """
+    description = [
+        {
+            "name": a.name,
+            "instructions": _describe(a.instructions),
+            "model": _describe(a.model),
+            "model_settings": repr(a.model_settings),
+            "output_type": _describe(a.output_type),
+            "tools": [_tool_identity(t) for t in a.tools],
+            "handoffs": [h.name for h in handoff_agents(a)],
+        }
+        for a in walk_agents(agent)
+    ]
+    return hashlib.sha256(json.dumps(description, sort_keys=True, default=str).encode()).hexdigest()[:16]
@@ -0,0 +1,290 @@
+import asyncio
+import dataclasses
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Iterable
+
+import openai
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from agents import Agent, Model, ModelProvider, Runner, RunConfig
+
+from helpers.agent_graph import find_agent
+from helpers.http_client import backoff_delay
+from helpers.model_client import GitHubModelProvider, without_retries
+
+
+class TokenBucket:
+    """
+    Refills at per_minute / 60 units a second, up to burst units
+    """
+
+    def __init__(self, per_minute: float, burst: float | None = None):
+        self.rate = per_minute / 60
+        self.capacity = burst or per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1) -> None:
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def adjust(self, amount: float) -> None:
+        """
+        Debits (or refunds, when negative) without waiting, the balance may go below zero
+        """
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class RateLimiter:
+    """
+    Shared requests-per-minute and tokens-per-minute budgets
+    """
+
+    def __init__(self, requests_per_minute: float | None = None, tokens_per_minute: float | None = None):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.throttled = 0
+
+    async def acquire(self, estimated_tokens: int) -> None:
+        if self.requests is not None:
+            await self.requests.acquire(1)
+        if self.tokens is not None:
+            await self.tokens.acquire(estimated_tokens)
+
+    def settle(self, estimated_tokens: int, used_tokens: int) -> None:
+        if self.tokens is not None:
+            self.tokens.adjust(used_tokens - estimated_tokens)
+
+
+def _estimate_tokens(system_instructions: str | None, input: Any) -> int:
+    text = (system_instructions or "") + (input if isinstance(input, str) else json.dumps(input, default=str))
+    return len(text) // 4 + 1
+
+
+def _retry_after(error: openai.APIStatusError) -> float | None:
+    try:
+        return float(error.response.headers.get("retry-after"))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+class RateLimitedModel(Model):
+    """
+    Waits for the shared budgets before every model call and retries 429 responses with backoff
+    """
+
+    def __init__(self, model: Model, limiter: RateLimiter, max_retries: int = 5):
+        self.model = model
+        self.limiter = limiter
+        self.max_retries = max_retries
+
+    async def _backoff(self, attempt: int, error: openai.RateLimitError) -> None:
+        self.limiter.throttled += 1
+        if attempt > self.max_retries:
+            raise error
+        await asyncio.sleep(_retry_after(error) or backoff_delay(attempt, base=1.0, cap=60.0))
+
+    async def get_response(self, system_instructions, input, *args, **kwargs):
+        estimate = _estimate_tokens(system_instructions, input)
+        attempt = 0
+        while True:
+            attempt += 1
+            await self.limiter.acquire(estimate)
+            try:
+                response = await self.model.get_response(system_instructions, input, *args, **kwargs)
+            except openai.RateLimitError as e:
+                await self._backoff(attempt, e)
+                continue
+            self.limiter.settle(estimate, response.usage.total_tokens if response.usage else estimate)
+            return response
+
+    async def stream_response(self, system_instructions, input, *args, **kwargs):
+        # a 429 comes before the first event, later errors cannot be retried without replaying events
+        estimate = _estimate_tokens(system_instructions, input)
+        attempt = 0
+        while True:
+            attempt += 1
+            await self.limiter.acquire(estimate)
+            started = False
+            used = estimate
+            try:
+                async for event in self.model.stream_response(system_instructions, input, *args, **kwargs):
+                    started = True
+                    if getattr(event, "type", None) == "response.completed" and event.response.usage is not None:
+                        used = event.response.usage.total_tokens
+                    yield event
+            except openai.RateLimitError as e:
+                if started:
+                    raise
+                await self._backoff(attempt, e)
+                continue
+            self.limiter.settle(estimate, used)
+            return
+
+
+def _without_client_retries(provider: ModelProvider) -> ModelProvider:
+    # the OpenAI client retries 429s on its own, which stacks a second backoff under
+    # RateLimitedModel's and hides the throttling from the limiter
+    if isinstance(provider, GitHubModelProvider):
+        return GitHubModelProvider([without_retries(client) for client in provider.clients], provider.model, provider.registry)
+    return provider
+
+
+class RateLimitedModelProvider(ModelProvider):
+    def __init__(self, provider: ModelProvider, limiter: RateLimiter, max_retries: int = 5):
+        self.provider = provider
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self._models: dict[str | None, Model] = {}
+
+    def get_model(self, model_name: str | None) -> Model:
+        if model_name not in self._models:
+            self._models[model_name] = RateLimitedModel(
+                self.provider.get_model(model_name), self.limiter, self.max_retries
+            )
+        return self._models[model_name]
+
+
+@dataclass
+class BatchResult:
+    index: int
+    key: str
+    input: Any
+    output: Any = None
+    error: str | None = None
+    latency_s: float = 0.0
+    total_tokens: int = 0
+    from_checkpoint: bool = False
+
+
+def input_key(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    return value
+
+
+def _load_checkpoint(path: str) -> dict[str, dict]:
+    done = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    if entry.get("error") is None:
+                        done[entry["key"]] = entry
+    return done
+
+
+def _restore_output(agent: Agent, entry: dict) -> Any:
+    # after handoffs the output type is the one of the agent that answered
+    answered_by = find_agent(agent, entry.get("agent") or agent.name) or agent
+    try:
+        return TypeAdapter(answered_by.output_type or str).validate_python(entry["output"])
+    except ValidationError:
+        # the output type changed since the checkpoint was written
+        return entry["output"]
+
+
+async def run_batch(
+        agent: Agent,
+        inputs: Iterable[Any],
+        run_config: RunConfig,
+        concurrency: int = 8,
+        requests_per_minute: float | None = None,
+        tokens_per_minute: float | None = None,
+        checkpoint_path: str | None = None,
+        max_retries: int = 5,
+        key: Callable[[Any], str] = input_key,
+        max_turns: int = 10) -> AsyncIterator[BatchResult]:
+    """
+    Runs the agent over every input with at most `concurrency` runs in flight,
+    yielding results as they complete (not in input order).
+
+    Every model call, including nested agent-as-tool calls when the SDK passes the
+    run config down, draws from shared RPM/TPM token buckets and 429s are retried here.
+    A GitHubModelProvider is switched to clients without their own retries, other
+    providers should be built on clients with max_retries=0. With checkpoint_path,
+    successful results are appended as JSONL and skipped when the batch is restarted,
+    their outputs validated back into the output type of the agent that answered.
+    """
+    limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+    limited_config = dataclasses.replace(
+        run_config,
+        model_provider=RateLimitedModelProvider(_without_client_retries(run_config.model_provider), limiter, max_retries),
+    )
+
+    done = _load_checkpoint(checkpoint_path) if checkpoint_path else {}
+    checkpoint = open(checkpoint_path, "a", encoding="utf-8") if checkpoint_path else None
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    results: asyncio.Queue = asyncio.Queue()
+
+    async def produce() -> None:
+        for index, value in enumerate(inputs):
+            await queue.put((index, value))
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def work() -> None:
+        while (job := await queue.get()) is not None:
+            index, value = job
+            job_key = key(value)
+            if job_key in done:
+                output = _restore_output(agent, done[job_key])
+                await results.put(BatchResult(index, job_key, value, output=output, from_checkpoint=True))
+                continue
+
+            result = BatchResult(index, job_key, value)
+            answered_by = None
+            start = time.perf_counter()
+            try:
+                run = await Runner.run(agent, value, run_config=limited_config, max_turns=max_turns)
+                result.output = run.final_output
+                answered_by = run.last_agent.name
+                result.total_tokens = run.context_wrapper.usage.total_tokens
+            except Exception as e:
+                result.error = f"{type(e).__name__}: {e}"
+            result.latency_s = time.perf_counter() - start
+
+            if checkpoint is not None:
+                checkpoint.write(json.dumps({
+                    "key": job_key, "output": _jsonable(result.output), "error": result.error,
+                    "agent": answered_by,
+                }, default=str) + "\n")
+                checkpoint.flush()
+            await results.put(result)
+
+    async def run_all() -> None:
+        try:
+            await asyncio.gather(produce(), *(work() for _ in range(concurrency)))
+        finally:
+            await results.put(None)
+
+    runner = asyncio.create_task(run_all())
+    try:
+        while (result := await results.get()) is not None:
+            yield result
+        await runner
+    finally:
+        runner.cancel()
+        if checkpoint is not None:
+            checkpoint.close()
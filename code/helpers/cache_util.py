@@ -0,0 +1,98 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Any, Awaitable, Callable, Hashable
+
+
+_MISSING = object()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    coalesced: int = 0
+
+    def to_dict(self) -> dict:
+        stats = asdict(self)
+        lookups = self.hits + self.misses
+        stats["hit_rate"] = self.hits / lookups if lookups else 0.0
+        return stats
+
+
+class TTLCache:
+    """
+    In-memory LRU cache where every entry also expires after ttl seconds
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            self.stats.misses += 1
+            return default
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.stats.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[1]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one awaited call
+    """
+
+    def __init__(self):
+        self._in_flight: dict[Hashable, asyncio.Future] = {}
+        self.coalesced = 0
+
+    def in_flight(self, key: Hashable) -> bool:
+        """
+        True while a call for key is running, a do() for it now would share that call
+        """
+        return key in self._in_flight
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # shield so one cancelled waiter does not cancel the shared call
+            return await asyncio.shield(future)
+
+        future = asyncio.ensure_future(fn())
+        self._in_flight[key] = future
+        future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(future)
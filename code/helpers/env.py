@@ -0,0 +1,14 @@
+from dotenv import load_dotenv
+
+
+_dotenv_loaded = False
+
+
+def load_env() -> None:
+    """
+    Loads .env once, on first use rather than at import time
+    """
+    global _dotenv_loaded
+    if not _dotenv_loaded:
+        load_dotenv()
+        _dotenv_loaded = True
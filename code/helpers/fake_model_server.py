@@ -0,0 +1,296 @@
+import asyncio
+import itertools
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+
+HANDOFF_PREFIX = "transfer_to_"
+
+
+@dataclass
+class LatencyProfile:
+    """
+    Injected model latency: log-normal time to first token, then a token rate drawn per request
+    """
+    ttft_median_ms: float = 300.0
+    ttft_sigma: float = 0.4
+    tokens_per_second: tuple[float, float] = (40.0, 120.0)
+
+    def ttft(self) -> float:
+        if self.ttft_median_ms <= 0:
+            return 0.0
+        return random.lognormvariate(0, self.ttft_sigma) * self.ttft_median_ms / 1000
+
+    def token_delay(self) -> float:
+        low, high = self.tokens_per_second
+        return 1 / random.uniform(low, high) if high > 0 else 0.0
+
+
+NO_LATENCY = LatencyProfile(ttft_median_ms=0, tokens_per_second=(0, 0))
+
+
+def example_from_schema(schema: dict, defs: dict | None = None, array_items: int = 2) -> Any:
+    """
+    Builds a value that validates against a (pydantic generated) JSON schema
+    """
+    defs = defs if defs is not None else schema.get("$defs", {})
+    if "$ref" in schema:
+        return example_from_schema(defs[schema["$ref"].split("/")[-1]], defs, array_items)
+    for key in ("anyOf", "oneOf", "allOf"):
+        if key in schema:
+            options = [s for s in schema[key] if s.get("type") != "null"] or schema[key]
+            return example_from_schema(options[0], defs, array_items)
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "const" in schema:
+        return schema["const"]
+
+    kind = schema.get("type", "object")
+    if isinstance(kind, list):
+        kind = next((k for k in kind if k != "null"), "string")
+    if kind == "object":
+        return {
+            name: example_from_schema(prop, defs, array_items)
+            for name, prop in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        return [example_from_schema(schema.get("items", {}), defs, array_items) for _ in range(array_items)]
+    if kind == "integer":
+        return 1
+    if kind == "number":
+        return 1.5
+    if kind == "boolean":
+        return True
+    return "sample"
+
+
+def scripted_responder(request: dict, reply_words: int = 60) -> dict:
+    """
+    Default script: call each function tool once, then the first handoff, then answer.
+
+    Structured answers follow the requested json_schema, plain answers are reply_words of filler.
+    """
+    called = {
+        call["function"]["name"]
+        for message in request.get("messages", [])
+        for call in message.get("tool_calls") or []
+    }
+    functions = [tool["function"] for tool in request.get("tools", []) if tool.get("type") == "function"]
+    pending = [f for f in functions if not f["name"].startswith(HANDOFF_PREFIX) and f["name"] not in called]
+    handoffs = [f for f in functions if f["name"].startswith(HANDOFF_PREFIX)]
+
+    if pending:
+        target = pending[0]
+    elif handoffs and not called.intersection(f["name"] for f in handoffs):
+        target = handoffs[0]
+    else:
+        target = None
+
+    if target is not None:
+        arguments = example_from_schema(target.get("parameters") or {"type": "object"})
+        return {"tool_calls": [{"name": target["name"], "arguments": json.dumps(arguments)}]}
+
+    response_format = request.get("response_format") or {}
+    if response_format.get("type") == "json_schema":
+        return {"content": json.dumps(example_from_schema(response_format["json_schema"]["schema"]))}
+    return {"content": " ".join(itertools.islice(itertools.cycle(["lorem", "ipsum", "dolor", "sit", "amet"]), reply_words))}
+
+
+class FakeModelServer:
+    """
+    OpenAI compatible /chat/completions stand-in with scripted answers and injected latency.
+
+    GET /wttr/<city> serves the sample wttr.in report so the weather tools also stay offline.
+    """
+
+    def __init__(
+            self,
+            responder: Callable[[dict], dict] = scripted_responder,
+            latency: LatencyProfile = LatencyProfile(),
+            host: str = "127.0.0.1",
+            port: int = 0,
+            error_rate: float = 0.0,
+            error_status: int = 429):
+        self.responder = responder
+        self.latency = latency
+        self.host = host
+        self.port = port
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+        self._server: asyncio.AbstractServer | None = None
+        self._connections: set[asyncio.Task] = set()
+        self._ids = itertools.count(1)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.base_url
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            # keep-alive connections stay open, end them so no handler is left pending
+            for task in list(self._connections):
+                task.cancel()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+
+    def start_in_thread(self) -> str:
+        """
+        Runs the server on its own loop, so its work does not land on the measured loop
+        """
+        started = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.start())
+            started.set()
+            self._loop.run_forever()
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="fake-model-server", daemon=True)
+        self._thread.start()
+        started.wait()
+        return self.base_url
+
+    def stop_thread(self) -> None:
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self.stop(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                await self._route(method, path, body, writer)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # cancelled by stop(), the stream callback would log a cancelled handler as an error
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, asyncio.CancelledError):
+                pass
+
+    async def _route(self, method: str, path: str, body: bytes, writer: asyncio.StreamWriter) -> None:
+        if method == "GET" and path.startswith("/wttr/"):
+            from helpers.wttn_agent import sample_wttn_response
+            await self._send(writer, 200, sample_wttn_response().encode(), "text/plain; charset=utf-8")
+        elif method == "POST" and path.rstrip("/").endswith("/chat/completions"):
+            self.requests += 1
+            if self.error_rate and random.random() < self.error_rate:
+                error = {"error": {"message": "injected error", "type": "rate_limit_error"}}
+                await self._send(writer, self.error_status, json.dumps(error).encode(), extra={"retry-after": "0"})
+                return
+            request = json.loads(body)
+            if request.get("stream"):
+                await self._stream_completion(request, writer)
+            else:
+                await self._completion(request, writer)
+        else:
+            await self._send(writer, 404, b'{"error": {"message": "not found"}}')
+
+    async def _send(self, writer, status: int, body: bytes, content_type="application/json", extra=None) -> None:
+        headers = [f"HTTP/1.1 {status} X", f"content-type: {content_type}", f"content-length: {len(body)}"]
+        headers += [f"{name}: {value}" for name, value in (extra or {}).items()]
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode() + body)
+        await writer.drain()
+
+    def _script(self, request: dict) -> tuple[dict, dict]:
+        reply = self.responder(request)
+        prompt_tokens = len(json.dumps(request.get("messages", []))) // 4
+        completion_tokens = max(1, len(reply.get("content") or json.dumps(reply.get("tool_calls"))) // 4)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        return reply, usage
+
+    def _tool_calls(self, reply: dict) -> list[dict]:
+        return [
+            {"id": f"call_{next(self._ids)}", "type": "function",
+             "function": {"name": call["name"], "arguments": call["arguments"]}}
+            for call in reply.get("tool_calls", [])
+        ]
+
+    async def _completion(self, request: dict, writer) -> None:
+        reply, usage = self._script(request)
+        await asyncio.sleep(self.latency.ttft() + usage["completion_tokens"] * self.latency.token_delay())
+        tool_calls = self._tool_calls(reply)
+        message = {"role": "assistant", "content": reply.get("content")}
+        if tool_calls:
+            message["tool_calls"] = tool_calls
+        completion = {
+            "id": f"chatcmpl-{next(self._ids)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if tool_calls else "stop"}],
+            "usage": usage,
+        }
+        await self._send(writer, 200, json.dumps(completion).encode())
+
+    async def _stream_completion(self, request: dict, writer) -> None:
+        reply, usage = self._script(request)
+        completion_id = f"chatcmpl-{next(self._ids)}"
+        writer.write(b"HTTP/1.1 200 OK\r\ncontent-type: text/event-stream\r\ntransfer-encoding: chunked\r\n\r\n")
+
+        async def send(payload: dict | str) -> None:
+            data = payload if isinstance(payload, str) else json.dumps(payload)
+            event = f"data: {data}\n\n".encode()
+            writer.write(f"{len(event):x}\r\n".encode() + event + b"\r\n")
+            await writer.drain()
+
+        def chunk(delta: dict, finish_reason=None) -> dict:
+            return {
+                "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                "model": request.get("model", "fake"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+
+        await asyncio.sleep(self.latency.ttft())
+        tool_calls = self._tool_calls(reply)
+        if tool_calls:
+            for index, call in enumerate(tool_calls):
+                await send(chunk({"role": "assistant", "tool_calls": [{"index": index, **call}]}))
+            finish_reason = "tool_calls"
+        else:
+            content = reply.get("content") or ""
+            # roughly one token per four characters
+            for start in range(0, len(content), 4):
+                await send(chunk({"role": "assistant", "content": content[start:start + 4]}))
+                await asyncio.sleep(self.latency.token_delay())
+            finish_reason = "stop"
+        await send(chunk({}, finish_reason))
+        if (request.get("stream_options") or {}).get("include_usage"):
+            await send({**chunk({}), "choices": [], "usage": usage})
+        await send("[DONE]")
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
@@ -0,0 +1,191 @@
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from pydantic import BaseModel
+from agents import Agent, Runner, RunConfig
+
+from helpers.agent_graph import agent_tools, handoff_agents
+
+
+@dataclass
+class Branch:
+    """
+    One independent sub agent run of a fan-out.
+
+    input defaults to the user input, a callable receives the user input and returns the branch input.
+    A failed or timed out required branch cancels the others, an optional one is reported
+    to the writer as unavailable.
+    """
+    name: str
+    agent: Agent
+    input: Any = None
+    timeout: float | None = None
+    required: bool = True
+
+
+@dataclass
+class BranchResult:
+    name: str
+    output: Any = None
+    error: str | None = None
+    timed_out: bool = False
+    cancelled: bool = False
+    latency_s: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and not self.timed_out and not self.cancelled
+
+
+@dataclass
+class FanOutResult:
+    branches: dict[str, BranchResult]
+    final_output: Any = None
+    writer_input: list = field(default_factory=list)
+    branches_s: float = 0.0
+    sequential_s: float = 0.0
+    wall_s: float = 0.0
+
+
+class FanOutError(Exception):
+    def __init__(self, branch: BranchResult, results: dict[str, BranchResult]):
+        reason = "timed out" if branch.timed_out else branch.error
+        super().__init__(f"required branch {branch.name} failed: {reason}")
+        self.branch = branch
+        self.results = results
+
+
+def branches_from_planner(planner: Agent, timeout: float | None = None, required: bool = True) -> list[Branch]:
+    """
+    One branch per as_tool sub agent of the planner, named after the tool
+    """
+    return [
+        Branch(name=tool.name, agent=sub_agent, timeout=timeout, required=required)
+        for tool, sub_agent in agent_tools(planner)
+    ]
+
+
+def _as_items(input: str | list) -> list:
+    if isinstance(input, str):
+        return [{"role": "user", "content": input}]
+    return list(input)
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _jsonable(v) for k, v in value.items()}
+    return value
+
+
+def merge_branch_outputs(input: str | list, results: dict[str, BranchResult]) -> list:
+    """
+    The user input followed by one message holding every branch output as JSON, for the writer agent
+    """
+    sections = []
+    for name, result in results.items():
+        if result.ok:
+            body = json.dumps(_jsonable(result.output), indent=2, default=str)
+            sections.append(f"## {name}\n```json\n{body}\n```")
+        else:
+            reason = "timed out" if result.timed_out else result.error or "cancelled"
+            sections.append(f"## {name}\nunavailable ({reason})")
+    research = "Research results collected for this request:\n\n" + "\n\n".join(sections)
+    return _as_items(input) + [{"role": "user", "content": research}]
+
+
+async def run_branches(
+        branches: list[Branch],
+        input: str | list,
+        run_config: RunConfig | None = None,
+        context: Any = None,
+        max_turns: int = 10) -> dict[str, BranchResult]:
+    """
+    Runs every branch concurrently, each under its own timeout.
+
+    Results keep the order of the branches. Raises FanOutError, after cancelling the
+    branches still running, when a required branch fails. Cancelling the caller cancels every branch.
+    """
+    results = {branch.name: BranchResult(branch.name) for branch in branches}
+    required = {branch.name: branch.required for branch in branches}
+
+    async def run(branch: Branch) -> BranchResult:
+        result = results[branch.name]
+        branch_input = branch.input(input) if callable(branch.input) else branch.input or input
+        start = time.perf_counter()
+        try:
+            run_result = await asyncio.wait_for(
+                Runner.run(branch.agent, branch_input, context=context, run_config=run_config, max_turns=max_turns),
+                branch.timeout,
+            )
+            result.output = run_result.final_output
+        except asyncio.TimeoutError:
+            result.timed_out = True
+        except asyncio.CancelledError:
+            result.cancelled = True
+            raise
+        except Exception as e:
+            result.error = f"{type(e).__name__}: {e}"
+        finally:
+            result.latency_s = time.perf_counter() - start
+        return result
+
+    tasks = {asyncio.create_task(run(branch)): branch for branch in branches}
+    try:
+        for finished in asyncio.as_completed(tasks):
+            result = await finished
+            if not result.ok and required[result.name]:
+                raise FanOutError(result, results)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return results
+
+
+async def run_planner_fan_out(
+        planner: Agent,
+        input: str | list,
+        run_config: RunConfig | None = None,
+        writer: Agent | None = None,
+        branches: list[Branch] | None = None,
+        timeout: float | None = None,
+        context: Any = None,
+        max_turns: int = 10,
+        merge: Callable[[str | list, dict[str, BranchResult]], list] = merge_branch_outputs) -> FanOutResult:
+    """
+    Runs the planner's independent sub agents concurrently, then the writer once on their merged outputs.
+
+    branches default to the planner's as_tool sub agents and the writer to its first
+    handoff, so a planner built as in 11_planner_as_tools_handoff can be passed as is.
+    Critical path latency becomes the slowest branch plus the writer instead of the
+    sum of every sub agent turn.
+    """
+    if branches is None:
+        branches = branches_from_planner(planner, timeout)
+    if writer is None:
+        targets = handoff_agents(planner)
+        if not targets:
+            raise ValueError(f"{planner.name} has no handoff to a writer agent, pass writer=")
+        writer = targets[0]
+
+    start = time.perf_counter()
+    results = await run_branches(branches, input, run_config, context, max_turns)
+    branches_s = time.perf_counter() - start
+
+    writer_input = merge(input, results)
+    written = await Runner.run(writer, writer_input, context=context, run_config=run_config, max_turns=max_turns)
+    return FanOutResult(
+        branches=results,
+        final_output=written.final_output,
+        writer_input=writer_input,
+        branches_s=branches_s,
+        sequential_s=sum(result.latency_s for result in results.values()),
+        wall_s=time.perf_counter() - start,
+    )
@@ -0,0 +1,346 @@
+import asyncio
+import collections
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+import openai
+from openai import AsyncOpenAI
+from agents import Model, ModelProvider
+
+from helpers.http_client import RETRY_STATUS_CODES
+from helpers.model_client import GitHubModelProvider, without_retries
+
+
+class CircuitBreaker:
+    """
+    Stops sending to an endpoint after failure_threshold consecutive failures.
+
+    After reset_timeout seconds one probe request is let through (half open),
+    its success closes the breaker, its failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        # a failed probe reopens at once
+        if self.failures >= self.failure_threshold or self._probing:
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+    def release(self) -> None:
+        """
+        The request was cancelled before it told anything about the endpoint
+        """
+        self._probing = False
+
+
+class LatencyWindow:
+    """
+    The last `size` latencies, so percentiles follow the endpoint as it speeds up or slows down
+    """
+
+    def __init__(self, size: int = 200):
+        self.values: collections.deque[float] = collections.deque(maxlen=size)
+
+    def observe(self, value: float) -> None:
+        self.values.append(value)
+
+    def quantile(self, q: float) -> float | None:
+        if not self.values:
+            return None
+        ordered = sorted(self.values)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+@dataclass
+class Endpoint:
+    name: str
+    model: Model
+    breaker: CircuitBreaker
+    response_latency: LatencyWindow
+    first_event_latency: LatencyWindow
+    stats: dict[str, int] = field(default_factory=lambda: {
+        "started": 0, "hedged": 0, "won": 0, "failed": 0, "cancelled": 0, "skipped": 0,
+    })
+
+
+_END_OF_STREAM = object()
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Errors another endpoint may not have: rate limits, 5xx and connection failures
+    """
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRY_STATUS_CODES
+    return isinstance(error, (openai.APIConnectionError, ConnectionError, asyncio.TimeoutError))
+
+
+class HedgedModel(Model):
+    """
+    Sends each call to the first endpoint, and a hedged duplicate to the next one
+    when no answer came within the hedge_percentile latency of the first.
+
+    The first success wins and the other requests are cancelled. A 429/5xx or
+    connection error fails over to the next endpoint at once, and endpoints whose
+    circuit breaker is open are skipped (if every breaker is open all are tried).
+    The hedge delay adapts to the last latency_window calls of each endpoint (requests
+    cancelled because another won count with their elapsed time, a lower bound), it
+    is initial_hedge_delay until min_samples calls were seen. Streamed calls hedge
+    on the time to the first event. breakers, one per model, lets several HedgedModels
+    on the same endpoints share their circuit breakers. Pass models built on clients with max_retries=0,
+    otherwise the OpenAI client retries a 429 itself before the failover sees it.
+    """
+
+    def __init__(
+            self,
+            models: list[Model] | list[tuple[str, Model]],
+            hedge_percentile: float = 0.9,
+            initial_hedge_delay: float = 2.0,
+            min_hedge_delay: float = 0.05,
+            min_samples: int = 10,
+            max_hedges: int = 1,
+            latency_window: int = 200,
+            failure_threshold: int = 3,
+            reset_timeout: float = 30.0,
+            breakers: list[CircuitBreaker] | None = None):
+        self.endpoints = [
+            Endpoint(
+                name=item[0] if isinstance(item, tuple) else f"endpoint_{i}",
+                model=item[1] if isinstance(item, tuple) else item,
+                breaker=breakers[i] if breakers else CircuitBreaker(failure_threshold, reset_timeout),
+                response_latency=LatencyWindow(latency_window),
+                first_event_latency=LatencyWindow(latency_window),
+            )
+            for i, item in enumerate(models)
+        ]
+        self.hedge_percentile = hedge_percentile
+        self.initial_hedge_delay = initial_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.min_samples = min_samples
+        self.max_hedges = max_hedges
+
+    def hedge_delay(self, window: LatencyWindow) -> float:
+        if len(window.values) < self.min_samples:
+            return self.initial_hedge_delay
+        return max(self.min_hedge_delay, window.quantile(self.hedge_percentile))
+
+    def _candidates(self) -> list[Endpoint]:
+        allowed = []
+        for endpoint in self.endpoints:
+            if endpoint.breaker.allow():
+                allowed.append(endpoint)
+            else:
+                endpoint.stats["skipped"] += 1
+        return allowed or list(self.endpoints)
+
+    async def _race(
+            self,
+            start: Callable[[Endpoint], Awaitable[Any]],
+            latency: Callable[[Endpoint], LatencyWindow]) -> Any:
+        candidates = self._candidates()
+        running: dict[asyncio.Task, tuple[Endpoint, float]] = {}
+        hedges = 0
+        won = False
+        last_error: BaseException | None = None
+
+        def launch(hedged: bool) -> None:
+            endpoint = candidates.pop(0)
+            endpoint.stats["started"] += 1
+            if hedged:
+                endpoint.stats["hedged"] += 1
+            running[asyncio.ensure_future(start(endpoint))] = (endpoint, time.perf_counter())
+
+        launch(hedged=False)
+        try:
+            while running:
+                # the hedge timer runs from the start of the oldest request still running
+                first_endpoint, first_start = next(iter(running.values()))
+                wait = None
+                if candidates and hedges < self.max_hedges:
+                    wait = max(0.0, first_start + self.hedge_delay(latency(first_endpoint)) - time.perf_counter())
+                done, _ = await asyncio.wait(running, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedges += 1
+                    launch(hedged=True)
+                    continue
+
+                for task in done:
+                    endpoint, started = running.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        endpoint.breaker.record_success()
+                        latency(endpoint).observe(time.perf_counter() - started)
+                        endpoint.stats["won"] += 1
+                        won = True
+                        return task.result()
+                    if not is_retryable(error):
+                        endpoint.breaker.release()
+                        raise error
+                    endpoint.breaker.record_failure()
+                    endpoint.stats["failed"] += 1
+                    last_error = error
+                    # fail over without waiting for the hedge delay
+                    if candidates:
+                        launch(hedged=False)
+            raise last_error
+        finally:
+            # a half open breaker let this call probe, give the probe back if it never started
+            for endpoint in candidates:
+                endpoint.breaker.release()
+            for task, (endpoint, started) in running.items():
+                task.cancel()
+                endpoint.breaker.release()
+                endpoint.stats["cancelled"] += 1
+                # the losers took at least this long, leaving them out would only keep
+                # the fast answers and shrink the hedge delay call after call
+                if won:
+                    latency(endpoint).observe(time.perf_counter() - started)
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+    async def get_response(self, *args, **kwargs):
+        return await self._race(
+            lambda endpoint: endpoint.model.get_response(*args, **kwargs),
+            lambda endpoint: endpoint.response_latency,
+        )
+
+    async def stream_response(self, *args, **kwargs):
+        # each stream is consumed by its own task, the SDK's tracing spans are context
+        # variables that must be set and reset in the same context
+        async def open_stream(endpoint: Endpoint) -> tuple[asyncio.Task, asyncio.Queue]:
+            queue: asyncio.Queue = asyncio.Queue()
+            first = asyncio.get_running_loop().create_future()
+
+            async def pump() -> None:
+                try:
+                    async for event in endpoint.model.stream_response(*args, **kwargs):
+                        if not first.done():
+                            first.set_result(None)
+                        queue.put_nowait(event)
+                    queue.put_nowait(_END_OF_STREAM)
+                    if not first.done():
+                        first.set_result(None)
+                except asyncio.CancelledError:
+                    first.cancel()
+                    raise
+                except Exception as e:
+                    if first.done():
+                        queue.put_nowait(e)
+                    else:
+                        first.set_exception(e)
+
+            task = asyncio.create_task(pump())
+            try:
+                await first
+            except BaseException:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                raise
+            return task, queue
+
+        pump, queue = await self._race(open_stream, lambda endpoint: endpoint.first_event_latency)
+        try:
+            while (event := await queue.get()) is not _END_OF_STREAM:
+                if isinstance(event, Exception):
+                    raise event
+                yield event
+        finally:
+            pump.cancel()
+            await asyncio.gather(pump, return_exceptions=True)
+
+    def stats(self) -> dict[str, dict]:
+        return {
+            endpoint.name: {
+                **endpoint.stats,
+                "breaker": endpoint.breaker.state,
+                "hedge_delay_s": self.hedge_delay(endpoint.response_latency),
+                "p50_s": endpoint.response_latency.quantile(0.5),
+                "p99_s": endpoint.response_latency.quantile(0.99),
+            }
+            for endpoint in self.endpoints
+        }
+
+
+class HedgedModelProvider(ModelProvider):
+    """
+    One HedgedModel per model name over several providers, in priority order.
+
+    A route is a provider or (provider, model name); the name replaces the one the
+    agent asked for, e.g. to hedge gpt-4o with gpt-4o-mini on the same endpoint.
+    """
+
+    def __init__(self, routes: list[ModelProvider | tuple[ModelProvider, str | None]], **options):
+        self.routes = [route if isinstance(route, tuple) else (route, None) for route in routes]
+        self.options = options
+        # one breaker per route, a dead endpoint trips once for every model name
+        self.breakers = [
+            CircuitBreaker(options.get("failure_threshold", 3), options.get("reset_timeout", 30.0))
+            for _ in self.routes
+        ]
+        self._models: dict[str | None, HedgedModel] = {}
+        self._lock = threading.Lock()
+
+    def get_model(self, model_name: str | None) -> Model:
+        with self._lock:
+            model = self._models.get(model_name)
+            if model is None:
+                model = HedgedModel(
+                    [
+                        (f"{i}:{name or model_name or 'default'}", provider.get_model(name or model_name))
+                        for i, (provider, name) in enumerate(self.routes)
+                    ],
+                    breakers=self.breakers,
+                    **self.options,
+                )
+                self._models[model_name] = model
+        return model
+
+    def stats(self) -> dict[str | None, dict]:
+        return {name: model.stats() for name, model in self._models.items()}
+
+
+def get_hedged_github_model_provider(
+        client: AsyncOpenAI,
+        model: str = "gpt-4o",
+        secondary_client: AsyncOpenAI | None = None,
+        secondary_model: str | None = None,
+        **options) -> HedgedModelProvider:
+    """
+    get_github_model_provider with a hedged secondary: another endpoint, another model, or both.
+
+    options go to HedgedModel (hedge_percentile, initial_hedge_delay, failure_threshold, ...)
+    """
+    primary = GitHubModelProvider([without_retries(client)], model)
+    secondary = GitHubModelProvider([without_retries(secondary_client or client)], secondary_model or model)
+    return HedgedModelProvider([primary, (secondary, secondary_model)], **options)
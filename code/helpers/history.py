@@ -0,0 +1,323 @@
+import asyncio
+import json
+import sqlite3
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable
+
+
+def estimate_tokens(item: Any) -> int:
+    """
+    Rough token count, about four characters a token
+    """
+    text = item if isinstance(item, str) else json.dumps(item, default=str)
+    return len(text) // 4 + 1
+
+
+@dataclass
+class HistoryEntry:
+    seq: int
+    item: dict
+    agent: str | None
+    tokens: int
+    # active, compacted (tool output replaced by a reference) or dropped
+    state: str = "active"
+
+
+@dataclass
+class TurnReport:
+    turn: int
+    items: int
+    full_tokens: int
+    sent_tokens: int
+    saved_tokens: int
+    # leading items unchanged since the previous turn, these can be served from the provider's prompt cache
+    stable_prefix_items: int
+    rewritten: bool
+
+
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS history_items ("
+    "session_id TEXT NOT NULL, seq INTEGER NOT NULL, agent TEXT, item TEXT NOT NULL, "
+    "tokens INTEGER NOT NULL, state TEXT NOT NULL, PRIMARY KEY (session_id, seq))",
+]
+
+
+class HistoryStore:
+    """
+    SQLite rows of history items, one per item, so a turn only inserts its new items
+    and compaction only updates the state column
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+        self._conn.commit()
+
+    def append(self, session_id: str, entries: list[HistoryEntry]) -> None:
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO history_items VALUES (?, ?, ?, ?, ?, ?)",
+            [(session_id, e.seq, e.agent, json.dumps(e.item, default=str), e.tokens, e.state) for e in entries],
+        )
+        self._conn.commit()
+
+    def set_state(self, session_id: str, entries: list[HistoryEntry]) -> None:
+        self._conn.executemany(
+            "UPDATE history_items SET state = ? WHERE session_id = ? AND seq = ?",
+            [(e.state, session_id, e.seq) for e in entries],
+        )
+        self._conn.commit()
+
+    def load(self, session_id: str) -> list[HistoryEntry]:
+        rows = self._conn.execute(
+            "SELECT seq, item, agent, tokens, state FROM history_items WHERE session_id = ? ORDER BY seq",
+            (session_id,),
+        ).fetchall()
+        return [HistoryEntry(seq, json.loads(item), agent, tokens, state) for seq, item, agent, tokens, state in rows]
+
+    def delete(self, session_id: str, seq: int | None = None) -> None:
+        if seq is None:
+            self._conn.execute("DELETE FROM history_items WHERE session_id = ?", (session_id,))
+        else:
+            self._conn.execute("DELETE FROM history_items WHERE session_id = ? AND seq = ?", (session_id, seq))
+        self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def _is_assistant_message(item: dict) -> bool:
+    return item.get("role") == "assistant"
+
+
+def _call_id(item: dict) -> str | None:
+    if item.get("type") in ("function_call", "function_call_output"):
+        return item.get("call_id")
+    return None
+
+
+def _running_agent() -> str | None:
+    """
+    Name of the agent whose span is current: the runner saves session items under it
+    """
+    from agents.tracing import get_current_span
+
+    span = get_current_span()
+    data = span.span_data if span is not None else None
+    # the task span around the run holds the user input, which no agent wrote
+    return data.name if getattr(data, "type", None) == "agent" else None
+
+
+class ConversationHistory:
+    """
+    Conversation items kept under a token budget, usable in place of to_input_list() + append
+    or as the session= of Runner.run.
+
+    Nothing is rewritten until the items outgrow token_budget, and then everything
+    is rewritten at once, so between rewrites the input only grows at the end and
+    provider prompt caching keeps hitting. A rewrite
+      - drops superseded drafts: all but the last keep_drafts assistant messages of each agent in draft_agents
+      - replaces tool outputs larger than compact_tool_output_tokens, outside the last keep_recent
+        items, with a short reference (get_item returns the original)
+      - if still over low_water * token_budget, drops the oldest items, keeping the first
+        `pinned` items and tool call pairs together
+    Rewriting down to the low water mark leaves room for several turns before the next rewrite.
+    Every to_input_list() call, and every add_items() of a Runner session, is reported
+    in reports with the tokens saved; get_items() only reads.
+    With path, items are persisted to SQLite one row per item, off the event loop in the session methods.
+    """
+
+    session_settings = None
+
+    def __init__(
+            self,
+            session_id: str = "default",
+            token_budget: int = 8000,
+            path: str | None = None,
+            pinned: int = 1,
+            keep_recent: int = 4,
+            draft_agents: Iterable[str] = (),
+            keep_drafts: int = 1,
+            compact_tool_output_tokens: int = 200,
+            low_water: float = 0.6,
+            count_tokens: Callable[[Any], int] = estimate_tokens):
+        self.session_id = session_id
+        self.token_budget = token_budget
+        self.pinned = pinned
+        self.keep_recent = keep_recent
+        self.draft_agents = set(draft_agents)
+        self.keep_drafts = keep_drafts
+        self.compact_tool_output_tokens = compact_tool_output_tokens
+        self.low_water = low_water
+        self.count_tokens = count_tokens
+        self.store = HistoryStore(path) if path else None
+        self.entries: list[HistoryEntry] = self.store.load(session_id) if self.store else []
+        self.reports: list[TurnReport] = []
+        self._rewritten = False
+        self._last_rendered: list[tuple[int, str]] = []
+
+    @property
+    def active_tokens(self) -> int:
+        return sum(self._rendered_tokens(e) for e in self.entries if e.state != "dropped")
+
+    def add(self, items: dict | list[dict], agent: str | None = None) -> None:
+        if isinstance(items, dict):
+            items = [items]
+        self._persist(*self._append([(item, agent) for item in items]))
+
+    def add_result(self, result: Any) -> None:
+        """
+        Adds the new items of a RunResult, labelled with the agent that produced them
+        """
+        self._persist(*self._append([
+            (run_item.to_input_item(), getattr(run_item.agent, "name", None))
+            for run_item in result.new_items
+        ]))
+
+    def _append(self, labelled: list[tuple[dict, str | None]]) -> tuple[list[HistoryEntry], list[HistoryEntry]]:
+        """
+        Adds the items in memory and returns (new, changed) entries for _persist
+        """
+        next_seq = self.entries[-1].seq + 1 if self.entries else 0
+        new = [
+            HistoryEntry(next_seq + i, item, agent, self.count_tokens(item))
+            for i, (item, agent) in enumerate(labelled)
+        ]
+        self.entries.extend(new)
+        changed = self._rewrite() if self.active_tokens > self.token_budget else []
+        return new, changed
+
+    def _persist(self, new: list[HistoryEntry], changed: list[HistoryEntry]) -> None:
+        if not self.store:
+            return
+        if new:
+            self.store.append(self.session_id, new)
+        if changed:
+            self.store.set_state(self.session_id, changed)
+
+    def get_item(self, seq: int) -> dict | None:
+        """
+        The original item, also for compacted and dropped entries
+        """
+        for entry in self.entries:
+            if entry.seq == seq:
+                return entry.item
+        return None
+
+    def _reference(self, entry: HistoryEntry) -> dict:
+        output = entry.item.get("output")
+        text = output if isinstance(output, str) else json.dumps(output, default=str)
+        preview = " ".join(text[:120].split())
+        return {
+            **entry.item,
+            "output": f"[tool output compacted, {entry.tokens} tokens, ref {self.session_id}:{entry.seq}] {preview}...",
+        }
+
+    def _rendered(self, entry: HistoryEntry) -> dict:
+        return self._reference(entry) if entry.state == "compacted" else entry.item
+
+    def _rendered_tokens(self, entry: HistoryEntry) -> int:
+        if entry.state == "compacted":
+            return self.count_tokens(self._reference(entry))
+        return entry.tokens
+
+    def _rewrite(self) -> list[HistoryEntry]:
+        active = [e for e in self.entries if e.state == "active"]
+        changed: list[HistoryEntry] = []
+
+        for agent in self.draft_agents:
+            drafts = [e for e in active if e.agent == agent and _is_assistant_message(e.item)]
+            superseded = drafts[:-self.keep_drafts] if self.keep_drafts else drafts
+            for entry in superseded:
+                entry.state = "dropped"
+                changed.append(entry)
+
+        live = [e for e in self.entries if e.state != "dropped"]
+        old = live[self.pinned:max(self.pinned, len(live) - self.keep_recent)]
+        for entry in old:
+            if (entry.state == "active" and entry.item.get("type") == "function_call_output"
+                    and entry.tokens > self.compact_tool_output_tokens):
+                entry.state = "compacted"
+                changed.append(entry)
+
+        total = self.active_tokens
+        target = self.token_budget * self.low_water
+        old_seqs = {e.seq for e in old}
+        for entry in old:
+            if total <= target:
+                break
+            if entry.state == "dropped":
+                continue
+            # a tool call and its output only make sense together
+            call_id = _call_id(entry.item)
+            group = [e for e in live if _call_id(e.item) == call_id] if call_id else [entry]
+            if any(member.seq not in old_seqs for member in group):
+                continue
+            for member in group:
+                if member.state != "dropped":
+                    total -= self._rendered_tokens(member)
+                    member.state = "dropped"
+                    changed.append(member)
+
+        if changed:
+            self._rewritten = True
+        return changed
+
+    def _live(self) -> list[HistoryEntry]:
+        return [e for e in self.entries if e.state != "dropped"]
+
+    def to_input_list(self) -> list[dict]:
+        live = self._live()
+        self._report(live)
+        return [self._rendered(e) for e in live]
+
+    def _report(self, live: list[HistoryEntry]) -> None:
+        rendered = [(e.seq, e.state) for e in live]
+        stable = 0
+        for previous, current in zip(self._last_rendered, rendered):
+            if previous != current:
+                break
+            stable += 1
+
+        sent = sum(self._rendered_tokens(e) for e in live)
+        full = sum(e.tokens for e in self.entries)
+        self.reports.append(TurnReport(
+            turn=len(self.reports) + 1,
+            items=len(live),
+            full_tokens=full,
+            sent_tokens=sent,
+            saved_tokens=full - sent,
+            stable_prefix_items=stable,
+            rewritten=self._rewritten,
+        ))
+        self._rewritten = False
+        self._last_rendered = rendered
+
+    # Session protocol, so the history can be passed to Runner.run(session=...)
+
+    async def get_items(self, limit: int | None = None) -> list[dict]:
+        # the runner also reads the session to check what it saved, so reading is not a turn
+        live = self._live()
+        return [self._rendered(e) for e in (live[-limit:] if limit else live)]
+
+    async def add_items(self, items: list[dict]) -> None:
+        # session items carry no agent, label them like add_result so drafts can be dropped
+        agent = _running_agent()
+        new, changed = self._append([(item, agent) for item in items])
+        self._report(self._live())
+        await asyncio.to_thread(self._persist, new, changed)
+
+    async def pop_item(self) -> dict | None:
+        if not self.entries:
+            return None
+        entry = self.entries.pop()
+        if self.store:
+            await asyncio.to_thread(self.store.delete, self.session_id, entry.seq)
+        return entry.item
+
+    async def clear_session(self) -> None:
+        self.entries.clear()
+        self._last_rendered = []
+        if self.store:
+            await asyncio.to_thread(self.store.delete, self.session_id)
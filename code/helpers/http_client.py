@@ -0,0 +1,116 @@
+import asyncio
+import random
+import weakref
+
+import httpx
+
+
+# timeouts, pool size and in-flight cap shared by every tool that calls out over HTTP
+HTTP_TIMEOUT = httpx.Timeout(connect=5.0, read=20.0, write=10.0, pool=10.0)
+HTTP_LIMITS = httpx.Limits(
+    max_connections=20,
+    max_keepalive_connections=10,
+    keepalive_expiry=30.0,
+)
+MAX_IN_FLIGHT = 10
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# one pool per event loop, pooled connections cannot be shared across loops
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple[httpx.AsyncClient, asyncio.Semaphore]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def configure_http_pool(
+        timeout: httpx.Timeout | None = None,
+        limits: httpx.Limits | None = None,
+        max_in_flight: int | None = None) -> None:
+    """
+    Overrides the pool defaults, applies to pools created after the call
+    """
+    global HTTP_TIMEOUT, HTTP_LIMITS, MAX_IN_FLIGHT
+    if timeout is not None:
+        HTTP_TIMEOUT = timeout
+    if limits is not None:
+        HTTP_LIMITS = limits
+    if max_in_flight is not None:
+        MAX_IN_FLIGHT = max_in_flight
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Returns the shared keep-alive client for the running event loop
+    """
+    return _get_pool()[0]
+
+
+def _get_pool() -> tuple[httpx.AsyncClient, asyncio.Semaphore]:
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None or pool[0].is_closed:
+        client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT,
+            limits=HTTP_LIMITS,
+            follow_redirects=True,
+        )
+        pool = (client, asyncio.Semaphore(MAX_IN_FLIGHT))
+        _pools[loop] = pool
+    return pool
+
+
+async def aclose_http_pool() -> None:
+    """
+    Closes the pool of the running event loop
+    """
+    pool = _pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool[0].aclose()
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 8.0) -> float:
+    """
+    Full jitter exponential backoff, attempt starts at 1
+    """
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def _retry_after(response: httpx.Response) -> float | None:
+    value = response.headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+async def fetch_text(
+        url: str,
+        params: dict | None = None,
+        headers: dict | None = None,
+        retries: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 8.0) -> str:
+    """
+    GET the url through the shared pool and return the body as text.
+
+    Connection errors, timeouts and 429/5xx responses are retried with
+    jittered backoff, a Retry-After header is honoured when present.
+    """
+    client, in_flight = _get_pool()
+    attempt = 0
+    while True:
+        attempt += 1
+        delay = None
+        try:
+            async with in_flight:
+                response = await client.get(url, params=params, headers=headers)
+            if response.status_code not in RETRY_STATUS_CODES or attempt > retries:
+                response.raise_for_status()
+                return response.text
+            delay = _retry_after(response)
+        except httpx.TransportError:
+            if attempt > retries:
+                raise
+
+        if delay is None:
+            delay = backoff_delay(attempt, backoff, max_backoff)
+        await asyncio.sleep(min(delay, max_backoff))
@@ -0,0 +1,324 @@
+import asyncio
+import dataclasses
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, asdict
+from typing import Any
+
+from pydantic import BaseModel, TypeAdapter
+from openai.types.responses import Response, ResponseCompletedEvent, ResponseUsage
+from openai.types.responses.response_usage import InputTokensDetails, OutputTokensDetails
+from agents import Model, ModelProvider, ModelResponse, Usage
+from agents.items import TResponseOutputItem
+
+
+CACHE_MODES = ("record", "replay", "passthrough")
+LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", "llm_cache.sqlite")
+LLM_CACHE_MODE = os.environ.get("LLM_CACHE_MODE", "record")
+LLM_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+_output_items = TypeAdapter(list[TResponseOutputItem])
+
+
+class LLMCacheMiss(LookupError):
+    pass
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json", exclude_none=True)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return asdict(value)
+    return str(value)
+
+
+def _tool_signature(tool: Any) -> dict:
+    return {
+        "type": type(tool).__name__,
+        "name": getattr(tool, "name", None),
+        "description": getattr(tool, "description", None),
+        "parameters": getattr(tool, "params_json_schema", None),
+    }
+
+
+def model_identity(model: Model | None, model_name: str | None) -> dict:
+    """
+    The model that actually answers: the resolved model name and endpoint of the wrapped model,
+    so agents on a provider's default model get new keys when that default changes
+    """
+    while model is not None:
+        inner = getattr(model, "model", None)
+        if isinstance(inner, str):
+            client = getattr(model, "_client", None)
+            return {"model": inner, "base_url": str(client.base_url) if client is not None else None}
+        if isinstance(inner, Model):
+            model = inner
+            continue
+        # balanced and hedged models answer like their first (primary) model
+        models = getattr(model, "models", None) or [endpoint.model for endpoint in getattr(model, "endpoints", [])]
+        model = models[0] if models else None
+    return {"model": model_name, "base_url": None}
+
+
+def request_key(model, system_instructions, input, model_settings, tools, output_schema, handoffs, **kwargs) -> str:
+    """
+    Content address of a model request, identical requests share the key.
+
+    model is the model_identity (or a model name) the request goes to
+    """
+    settings = model_settings.to_json_dict() if hasattr(model_settings, "to_json_dict") else model_settings
+    request = {
+        "model": model if isinstance(model, dict) else {"model": model, "base_url": None},
+        "instructions": system_instructions,
+        "input": input,
+        "settings": settings,
+        "tools": [_tool_signature(tool) for tool in tools],
+        "output_schema": None if output_schema is None or output_schema.is_plain_text() else output_schema.json_schema(),
+        "handoffs": [
+            {"name": h.tool_name, "description": h.tool_description, "parameters": h.input_json_schema}
+            for h in handoffs
+        ],
+        "prompt": kwargs.get("prompt"),
+    }
+    payload = json.dumps(request, sort_keys=True, default=_json_default, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _usage_record(usage: Any) -> dict:
+    return {
+        "requests": getattr(usage, "requests", 1),
+        "input_tokens": usage.input_tokens if usage else 0,
+        "output_tokens": usage.output_tokens if usage else 0,
+        "total_tokens": usage.total_tokens if usage else 0,
+    }
+
+
+def response_to_record(response: ModelResponse) -> dict:
+    return {
+        "output": [item.model_dump(mode="json", exclude_none=True) for item in response.output],
+        "usage": _usage_record(response.usage),
+        "response_id": getattr(response, "response_id", None) or getattr(response, "referenceable_id", None),
+    }
+
+
+def completed_event_to_record(event: ResponseCompletedEvent) -> dict:
+    return {
+        "output": [item.model_dump(mode="json", exclude_none=True) for item in event.response.output],
+        "usage": _usage_record(event.response.usage),
+        "response_id": event.response.id,
+    }
+
+
+def record_to_response(record: dict) -> ModelResponse:
+    fields = {f.name for f in dataclasses.fields(ModelResponse)}
+    id_field = "response_id" if "response_id" in fields else "referenceable_id"
+    return ModelResponse(
+        output=_output_items.validate_python(record["output"]),
+        usage=Usage(**record["usage"]),
+        **{id_field: record["response_id"]},
+    )
+
+
+def record_to_completed_event(record: dict) -> ResponseCompletedEvent:
+    usage = record["usage"]
+    response = Response.model_construct(
+        id=record["response_id"] or "cached",
+        object="response",
+        created_at=time.time(),
+        model="cached",
+        status="completed",
+        output=_output_items.validate_python(record["output"]),
+        usage=ResponseUsage.model_construct(
+            input_tokens=usage["input_tokens"],
+            output_tokens=usage["output_tokens"],
+            total_tokens=usage["total_tokens"],
+            input_tokens_details=InputTokensDetails.model_construct(cached_tokens=0),
+            output_tokens_details=OutputTokensDetails.model_construct(reasoning_tokens=0),
+        ),
+        tools=[],
+        tool_choice="auto",
+        parallel_tool_calls=False,
+    )
+    return ResponseCompletedEvent.model_construct(type="response.completed", response=response, sequence_number=0)
+
+
+@dataclass
+class LLMCacheStats:
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+
+
+class LLMResponseStore:
+    """
+    Content-addressed SQLite store of model responses with size based LRU eviction
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_bytes: int = LLM_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.stats = LLMCacheStats()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_responses ("
+            "key TEXT PRIMARY KEY, record TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute("SELECT record FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats.misses += 1
+                return None
+            self._conn.execute("UPDATE llm_responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.stats.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, record: dict) -> None:
+        payload = json.dumps(record, separators=(",", ":"))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, record, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), now, now),
+            )
+            self.stats.stores += 1
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute(
+                "SELECT key, size FROM llm_responses ORDER BY last_access").fetchall():
+            self._conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+            self.stats.evictions += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def size_bytes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_responses")
+            self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class CachingModel(Model):
+    """
+    Serves repeated requests from the store.
+
+    record: hits come from the store, misses call the model and are stored
+    replay: hits come from the store, misses raise LLMCacheMiss (no network)
+    passthrough: always calls the model
+    """
+
+    def __init__(self, model: Model | None, model_name: str | None, store: LLMResponseStore, mode: str = "record"):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"mode must be one of {CACHE_MODES}, got {mode}")
+        self.model = model
+        self.model_name = model_name
+        self.identity = model_identity(model, model_name)
+        self.store = store
+        self.mode = mode
+
+    def _key(self, request: dict) -> str:
+        return request_key(self.identity, **{k: v for k, v in request.items() if k != "tracing"})
+
+    async def _lookup(self, key: str) -> dict | None:
+        record = await asyncio.to_thread(self.store.get, key)
+        if record is None and self.mode == "replay":
+            raise LLMCacheMiss(f"no recorded response for {self.model_name} request {key[:12]}")
+        return record
+
+    async def get_response(
+            self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing,
+            **kwargs) -> ModelResponse:
+        request = dict(
+            system_instructions=system_instructions, input=input, model_settings=model_settings, tools=tools,
+            output_schema=output_schema, handoffs=handoffs, tracing=tracing, **kwargs,
+        )
+        if self.mode == "passthrough":
+            return await self.model.get_response(**request)
+
+        key = self._key(request)
+        record = await self._lookup(key)
+        if record is not None:
+            return record_to_response(record)
+
+        response = await self.model.get_response(**request)
+        await asyncio.to_thread(self.store.set, key, response_to_record(response))
+        return response
+
+    async def stream_response(
+            self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing,
+            **kwargs):
+        """
+        Hits replay as a single response.completed event, no text deltas
+        """
+        request = dict(
+            system_instructions=system_instructions, input=input, model_settings=model_settings, tools=tools,
+            output_schema=output_schema, handoffs=handoffs, tracing=tracing, **kwargs,
+        )
+        if self.mode == "passthrough":
+            async for event in self.model.stream_response(**request):
+                yield event
+            return
+
+        key = self._key(request)
+        record = await self._lookup(key)
+        if record is not None:
+            yield record_to_completed_event(record)
+            return
+
+        async for event in self.model.stream_response(**request):
+            if isinstance(event, ResponseCompletedEvent):
+                await asyncio.to_thread(self.store.set, key, completed_event_to_record(event))
+            yield event
+
+
+class CachingModelProvider(ModelProvider):
+    def __init__(self, provider: ModelProvider | None, store: LLMResponseStore, mode: str = "record"):
+        self.provider = provider
+        self.store = store
+        self.mode = mode
+        self._models: dict[str | None, CachingModel] = {}
+
+    def get_model(self, model_name: str | None) -> Model:
+        model = self._models.get(model_name)
+        if model is None:
+            # replay never calls the wrapped provider's models, so it can run without keys. Without
+            # a provider keys use the requested name, entries recorded through one need it again
+            # to resolve the same model and endpoint
+            inner = None if self.provider is None else self.provider.get_model(model_name)
+            model = CachingModel(inner, model_name, self.store, self.mode)
+            self._models[model_name] = model
+        return model
+
+
+def get_caching_model_provider(
+        provider: ModelProvider | None,
+        path: str = LLM_CACHE_PATH,
+        mode: str = LLM_CACHE_MODE,
+        max_bytes: int = LLM_CACHE_MAX_BYTES) -> CachingModelProvider:
+    """
+    Wraps a provider (for example get_github_model_provider) with the record/replay cache
+    """
+    return CachingModelProvider(provider, LLMResponseStore(path, max_bytes), mode)
@@ -0,0 +1,310 @@
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import zlib
+from collections import deque
+from typing import Any
+
+from agents import add_trace_processor, set_trace_processors
+from agents.tracing import Span, Trace, TracingProcessor
+
+
+logger = logging.getLogger(__name__)
+
+LOCAL_TRACES_PATH = os.environ.get("LOCAL_TRACES_PATH", "traces.sqlite")
+
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS traces ("
+    "trace_id TEXT PRIMARY KEY, workflow_name TEXT, group_id TEXT, metadata TEXT, "
+    "started_at REAL, ended_at REAL)",
+    "CREATE TABLE IF NOT EXISTS spans ("
+    "span_id TEXT PRIMARY KEY, trace_id TEXT NOT NULL, parent_id TEXT, span_type TEXT, "
+    "started_at TEXT, ended_at TEXT, data TEXT, error TEXT)",
+    "CREATE INDEX IF NOT EXISTS spans_trace_id ON spans (trace_id)",
+]
+
+
+class LocalTraceStore:
+    """
+    SQLite tables of traces and spans, with a small query API.
+
+    The connection is shared by the writer thread and callers, one statement group at a time.
+    """
+
+    def __init__(self, path: str = LOCAL_TRACES_PATH):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            for statement in _SCHEMA:
+                self._conn.execute(statement)
+            self._conn.commit()
+
+    def write(self, traces: list[dict], spans: list[dict]) -> None:
+        with self._lock:
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO traces VALUES (:trace_id, :workflow_name, :group_id, :metadata, :started_at, :ended_at)",
+                    traces,
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO spans VALUES (:span_id, :trace_id, :parent_id, :span_type, :started_at, :ended_at, :data, :error)",
+                    spans,
+                )
+                self._conn.commit()
+            except sqlite3.Error:
+                self._conn.rollback()
+                raise
+
+    def list_traces(self, limit: int = 20, workflow_name: str | None = None) -> list[dict]:
+        query = "SELECT trace_id, workflow_name, group_id, started_at, ended_at FROM traces"
+        params: tuple = ()
+        if workflow_name:
+            query += " WHERE workflow_name = ?"
+            params = (workflow_name,)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY started_at DESC LIMIT ?", params + (limit,)).fetchall()
+        keys = ("trace_id", "workflow_name", "group_id", "started_at", "ended_at")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def get_trace(self, trace_id: str) -> dict | None:
+        """
+        Returns the trace with its spans nested under "children", root spans under "spans"
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT trace_id, workflow_name, group_id, metadata, started_at, ended_at FROM traces WHERE trace_id = ?",
+                (trace_id,),
+            ).fetchone()
+            span_rows = self._conn.execute(
+                "SELECT span_id, parent_id, span_type, started_at, ended_at, data, error FROM spans "
+                "WHERE trace_id = ? ORDER BY started_at",
+                (trace_id,),
+            ).fetchall()
+        if row is None and not span_rows:
+            return None
+
+        spans = {
+            span_id: {
+                "span_id": span_id, "parent_id": parent_id, "type": span_type,
+                "started_at": started_at, "ended_at": ended_at,
+                "data": json.loads(data) if data else None,
+                "error": json.loads(error) if error else None,
+                "children": [],
+            }
+            for span_id, parent_id, span_type, started_at, ended_at, data, error in span_rows
+        }
+        roots = []
+        for span in spans.values():
+            parent = spans.get(span["parent_id"])
+            (parent["children"] if parent else roots).append(span)
+
+        trace = {"trace_id": trace_id, "spans": roots}
+        if row is not None:
+            trace.update(
+                workflow_name=row[1], group_id=row[2],
+                metadata=json.loads(row[3]) if row[3] else None,
+                started_at=row[4], ended_at=row[5],
+            )
+        return trace
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _span_record(span: Span[Any]) -> dict:
+    exported = span.export() or {}
+    data = exported.get("span_data") or {}
+    return {
+        "span_id": span.span_id,
+        "trace_id": span.trace_id,
+        "parent_id": exported.get("parent_id"),
+        "span_type": data.get("type"),
+        "started_at": exported.get("started_at"),
+        "ended_at": exported.get("ended_at"),
+        "data": json.dumps(data, default=str),
+        "error": json.dumps(exported["error"], default=str) if exported.get("error") else None,
+    }
+
+
+def _trace_record(trace: Trace, started_at: float, ended_at: float) -> dict:
+    exported = trace.export() or {}
+    return {
+        "trace_id": trace.trace_id,
+        "workflow_name": exported.get("workflow_name", getattr(trace, "name", None)),
+        "group_id": exported.get("group_id"),
+        "metadata": json.dumps(exported.get("metadata"), default=str) if exported.get("metadata") else None,
+        "started_at": started_at,
+        "ended_at": ended_at,
+    }
+
+
+class LocalTraceProcessor(TracingProcessor):
+    """
+    Writes traces and spans to a LocalTraceStore in batches from a background thread.
+
+    The agent hot path only appends to a bounded queue. When the queue is full either the
+    new item (drop_newest) or the oldest queued item (drop_oldest) is dropped.
+    head_sample_rate keeps that share of traces from the start. With tail_sample_rate < 1
+    the spans of a trace are held until it ends, traces with errors or slower than
+    slow_trace_s are always kept and the rest are kept at tail_sample_rate.
+    """
+
+    def __init__(
+            self,
+            path: str = LOCAL_TRACES_PATH,
+            max_queue: int = 10000,
+            batch_size: int = 256,
+            flush_interval: float = 1.0,
+            drop_policy: str = "drop_newest",
+            head_sample_rate: float = 1.0,
+            tail_sample_rate: float = 1.0,
+            slow_trace_s: float | None = None,
+            max_spans_per_trace: int = 2000):
+        if drop_policy not in ("drop_newest", "drop_oldest"):
+            raise ValueError(f"unknown drop_policy: {drop_policy}")
+        self.path = path
+        self.store = LocalTraceStore(path)
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.drop_policy = drop_policy
+        self.head_sample_rate = head_sample_rate
+        self.tail_sample_rate = tail_sample_rate
+        self.slow_trace_s = slow_trace_s
+        self.max_spans_per_trace = max_spans_per_trace
+        self.dropped = 0
+        self.written = 0
+
+        # ("trace", (trace, started_at, ended_at)) and ("span", span), exported when drained
+        self._queue: deque[tuple[str, Any]] = deque()
+        self._lock = threading.Lock()
+        # one drain at a time, force_flush returns after a batch the worker was writing
+        self._drain_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        # trace id -> start time of the head sampled traces still running
+        self._sampled: dict[str, float] = {}
+        self._pending: dict[str, list[Span[Any]]] = {}
+        self._worker = threading.Thread(target=self._run, name="local-trace-writer", daemon=True)
+        self._worker.start()
+
+    def _head_sampled(self, trace_id: str) -> bool:
+        # hash based so every process makes the same call for a trace id
+        return zlib.crc32(trace_id.encode()) / 0xFFFFFFFF < self.head_sample_rate
+
+    def _enqueue(self, kind: str, item: Any) -> None:
+        with self._lock:
+            if len(self._queue) >= self.max_queue:
+                self.dropped += 1
+                if self.drop_policy == "drop_newest":
+                    return
+                self._queue.popleft()
+            self._queue.append((kind, item))
+            if len(self._queue) >= self.batch_size:
+                self._wakeup.set()
+
+    # the hooks below run on the agent's thread: they only keep references, spans and
+    # traces are exported and serialised by the writer thread in _drain
+
+    def on_trace_start(self, trace: Trace) -> None:
+        if not self._head_sampled(trace.trace_id):
+            return
+        self._sampled[trace.trace_id] = time.time()
+        if self.tail_sample_rate < 1.0:
+            self._pending[trace.trace_id] = []
+
+    def on_trace_end(self, trace: Trace) -> None:
+        started_at = self._sampled.pop(trace.trace_id, None)
+        if started_at is None:
+            return
+        ended_at = time.time()
+        spans = self._pending.pop(trace.trace_id, None)
+        if spans is not None and not self._tail_keep(ended_at - started_at, spans):
+            return
+        self._enqueue("trace", (trace, started_at, ended_at))
+        for span in spans or []:
+            self._enqueue("span", span)
+
+    def _tail_keep(self, duration: float, spans: list[Span[Any]]) -> bool:
+        if any(span.error for span in spans):
+            return True
+        if self.slow_trace_s is not None and duration >= self.slow_trace_s:
+            return True
+        return random.random() < self.tail_sample_rate
+
+    def on_span_start(self, span: Span[Any]) -> None:
+        pass
+
+    def on_span_end(self, span: Span[Any]) -> None:
+        if span.trace_id not in self._sampled:
+            return
+        pending = self._pending.get(span.trace_id)
+        if pending is None:
+            self._enqueue("span", span)
+        elif len(pending) < self.max_spans_per_trace:
+            pending.append(span)
+        else:
+            self.dropped += 1
+
+    def _drain(self) -> None:
+        with self._drain_lock:
+            with self._lock:
+                batch = list(self._queue)
+                self._queue.clear()
+            if not batch:
+                return
+            traces = [_trace_record(*item) for kind, item in batch if kind == "trace"]
+            spans = [_span_record(item) for kind, item in batch if kind == "span"]
+            self.store.write(traces, spans)
+            self.written += len(batch)
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self._drain()
+            except sqlite3.Error:
+                logger.exception("local trace write failed")
+
+    def force_flush(self) -> None:
+        self._drain()
+
+    def shutdown(self) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+        self._worker.join(timeout=5)
+        self._drain()
+
+
+_local_processor: LocalTraceProcessor | None = None
+
+
+def enable_local_tracing(path: str = LOCAL_TRACES_PATH, keep_remote: bool = False, **kwargs) -> LocalTraceProcessor:
+    """
+    Sends traces to a local SQLite store, by default instead of the remote OpenAI exporter
+    """
+    global _local_processor
+    processor = LocalTraceProcessor(path, **kwargs)
+    if keep_remote:
+        add_trace_processor(processor)
+    else:
+        set_trace_processors([processor])
+    _local_processor = processor
+    return processor
+
+
+def get_local_trace_processor() -> LocalTraceProcessor | None:
+    return _local_processor
+
+
+def get_local_trace_url(trace_id: str) -> str | None:
+    if _local_processor is None:
+        return None
+    return f"file://{os.path.abspath(_local_processor.path)}#trace_id={trace_id}"
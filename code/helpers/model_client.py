@@ -1,5 +1,8 @@
 import os
-from dotenv import load_dotenv
+import asyncio
+import itertools
+import threading
+import weakref
 from openai import AsyncOpenAI
 from agents import (
     OpenAIChatCompletionsModel,
@@ -11,36 +14,201 @@ from agents import (
     set_tracing_export_api_key,
 )
 
+from helpers.env import load_env
+
+
+GITHUB_MODELS_ENDPOINT = "https://models.inference.ai.azure.com"
+
+# pooled connections belong to the event loop that opened them, so clients are shared per loop
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[tuple[str, str], AsyncOpenAI]]" = (
+    weakref.WeakKeyDictionary()
+)
+_clients_lock = threading.Lock()
+_default_client: AsyncOpenAI | None = None
+
+
+def get_client(base_url: str, api_key: str) -> AsyncOpenAI:
+    """
+    Returns the shared client (and its connection pool) for the endpoint and key on the running
+    event loop, outside a running loop every call gets a new client
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return AsyncOpenAI(base_url=base_url, api_key=api_key)
+
+    key = (base_url, api_key)
+    with _clients_lock:
+        clients = _clients.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None:
+            client = AsyncOpenAI(base_url=base_url, api_key=api_key)
+            clients[key] = client
+    return client
+
+
+# weak keys: clients are per event loop and go away with it, their ids get reused
+_no_retry_clients: "weakref.WeakKeyDictionary[AsyncOpenAI, AsyncOpenAI]" = weakref.WeakKeyDictionary()
+
+
+def without_retries(client: AsyncOpenAI) -> AsyncOpenAI:
+    """
+    The client with max_retries=0, for callers that retry (or fail over) on 429s themselves.
+    with_options shares the connection pool of the client
+    """
+    with _clients_lock:
+        if client not in _no_retry_clients:
+            _no_retry_clients[client] = client.with_options(max_retries=0)
+        return _no_retry_clients[client]
+
 
 def get_openai_client() -> AsyncOpenAI:
     """
     Returns the OpenAI client and sets defaults
     """
-    load_dotenv()
+    global _default_client
+    load_env()
     # Set the default OpenAI client with the API key from the environment variable
-    client = AsyncOpenAI(
-            base_url="https://models.inference.ai.azure.com",
-            api_key=os.environ["GITHUB_TOKEN"],
-        )
+    client = get_client(GITHUB_MODELS_ENDPOINT, os.environ["GITHUB_TOKEN"])
 
-    set_default_openai_client(client)
-    set_default_openai_api("chat_completions")
-    set_tracing_export_api_key(os.environ["OPENAI_TRACING_KEY"])
-    set_tracing_disabled(False)
+    # the SDK defaults are process wide, only set them when the client changes
+    if client is not _default_client:
+        set_default_openai_client(client)
+        set_default_openai_api("chat_completions")
+        set_tracing_export_api_key(os.environ["OPENAI_TRACING_KEY"])
+        set_tracing_disabled(False)
+        _default_client = client
 
     return client
 
 
-def get_github_model_provider(client, model="gpt-4o") -> ModelProvider:
+def get_openai_clients(token_env_vars=("GITHUB_TOKEN",), base_url=GITHUB_MODELS_ENDPOINT) -> list[AsyncOpenAI]:
+    """
+    Returns one shared client per configured key, for example ("GITHUB_TOKEN", "GITHUB_TOKEN_MICROSOFT")
+    """
+    load_env()
+    return [
+        get_client(base_url, os.environ[name])
+        for name in token_env_vars
+        if os.environ.get(name)
+    ]
+
+
+class LeastOutstandingModel(Model):
+    """
+    Spreads calls over the same model on several endpoints,
+    each call goes to the endpoint with the fewest requests in flight
+    """
+
+    def __init__(self, models: list[Model]):
+        self.models = models
+        self.outstanding = [0] * len(models)
+        self._order = itertools.count()
+
+    def _acquire(self) -> int:
+        # rotate the start so ties do not always land on the first endpoint
+        start = next(self._order) % len(self.models)
+        candidates = range(start, start + len(self.models))
+        index = min(candidates, key=lambda i: self.outstanding[i % len(self.models)]) % len(self.models)
+        self.outstanding[index] += 1
+        return index
+
+    def _release(self, index: int) -> None:
+        self.outstanding[index] -= 1
+
+    async def get_response(self, *args, **kwargs):
+        index = self._acquire()
+        try:
+            return await self.models[index].get_response(*args, **kwargs)
+        finally:
+            self._release(index)
+
+    async def stream_response(self, *args, **kwargs):
+        index = self._acquire()
+        try:
+            async for event in self.models[index].stream_response(*args, **kwargs):
+                yield event
+        finally:
+            self._release(index)
+
+
+class ModelRegistry:
+    """
+    Cache of model objects per event loop, one per (endpoint, model name).
+
+    Like the clients they wrap, the models of a loop go away with it. Outside a
+    running loop nothing is cached.
+    """
+
+    def __init__(self):
+        self._models: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[tuple, Model]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(models) for models in self._models.values())
+
+    def _loop_models(self) -> dict[tuple, Model]:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return {}
+        with self._lock:
+            return self._models.setdefault(loop, {})
+
+    def get_model(self, client: AsyncOpenAI, model_name: str) -> Model:
+        models = self._loop_models()
+        key = (str(client.base_url), id(client), model_name)
+        with self._lock:
+            model = models.get(key)
+            if model is None:
+                model = OpenAIChatCompletionsModel(model=model_name, openai_client=client)
+                models[key] = model
+        return model
+
+    def get_balanced_model(self, clients: list[AsyncOpenAI], model_name: str) -> Model:
+        if len(clients) == 1:
+            return self.get_model(clients[0], model_name)
+
+        models = self._loop_models()
+        key = ("balanced", tuple(id(client) for client in clients), model_name)
+        with self._lock:
+            model = models.get(key)
+        if model is None:
+            model = LeastOutstandingModel([self.get_model(client, model_name) for client in clients])
+            with self._lock:
+                model = models.setdefault(key, model)
+        return model
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+
+
+MODEL_REGISTRY = ModelRegistry()
+
+
+class GitHubModelProvider(ModelProvider):
+    def __init__(self, clients: list[AsyncOpenAI], model: str, registry: ModelRegistry = MODEL_REGISTRY):
+        self.clients = clients
+        self.model = model
+        self.registry = registry
+
+    def get_model(self, model_name) -> Model:
+        # agents that ask for a model by name get it, the rest use the provider default
+        return self.registry.get_balanced_model(self.clients, model_name or self.model)
+
+
+def get_github_model_provider(client, model="gpt-4o", extra_clients=None) -> ModelProvider:
     """
     Returns the model provider
+
+    extra_clients (see get_openai_clients) are balanced with client on every model lookup
     """
-    class GitHubModelProvider(ModelProvider):
-        def get_model(self, model_name) -> Model:
-            return OpenAIChatCompletionsModel(
-                model=model,
-                openai_client=client)
+    clients = [client] + [c for c in (extra_clients or []) if c is not client]
 
-    GITHUB_MODEL_PROVIDER = GitHubModelProvider()
+    GITHUB_MODEL_PROVIDER = GitHubModelProvider(clients, model)
 
     return GITHUB_MODEL_PROVIDER
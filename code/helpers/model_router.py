@@ -0,0 +1,257 @@
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from agents import ModelBehaviorError, Model, ModelProvider, ModelResponse
+from agents.tracing import get_current_span
+
+from helpers.hedged_model import LatencyWindow
+
+
+@dataclass
+class RoutePolicy:
+    """
+    Models an agent may use. models[0] is the trusted default, used until another
+    model has proven itself on this agent and whenever a cheaper one gives an invalid answer.
+
+    A model qualifies after min_samples calls with an error rate at most max_error_rate
+    and, for agents with a structured output_type, a validation success rate of at least
+    min_validation_rate over min_samples final answers. The fastest qualified model
+    (median latency) is used, explore is the share of calls sent to models still short of samples.
+    """
+    models: tuple[str, ...]
+    min_samples: int = 5
+    min_validation_rate: float = 0.95
+    max_error_rate: float = 0.05
+    explore: float = 0.2
+    escalate_invalid: bool = True
+
+
+@dataclass
+class RouteStats:
+    calls: int = 0
+    errors: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    # structured final answers checked against the output schema
+    validated: int = 0
+    invalid: int = 0
+    escalated: int = 0
+    latency: LatencyWindow = field(default_factory=lambda: LatencyWindow(100))
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.calls if self.calls else 0.0
+
+    @property
+    def validation_rate(self) -> float | None:
+        return 1 - self.invalid / self.validated if self.validated else None
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "p50_s": self.latency.quantile(0.5),
+            "p95_s": self.latency.quantile(0.95),
+            "mean_input_tokens": self.input_tokens / self.calls if self.calls else 0.0,
+            "mean_output_tokens": self.output_tokens / self.calls if self.calls else 0.0,
+            "validated": self.validated,
+            "validation_rate": self.validation_rate,
+            "escalated": self.escalated,
+        }
+
+
+def current_agent_name() -> str | None:
+    """
+    Name of the agent whose turn is running, read from the current (possibly no-op) tracing span
+    """
+    span = get_current_span()
+    if span is None:
+        return None
+    data = span.span_data
+    # turn spans on current SDKs, agent spans on older ones
+    return getattr(data, "agent_name", None) or getattr(data, "name", None)
+
+
+def final_output_text(response: ModelResponse) -> str | None:
+    """
+    The message text of a response that ends the agent's turn, None when it calls tools or hands off
+    """
+    texts = []
+    for item in response.output:
+        kind = getattr(item, "type", None)
+        if kind == "function_call":
+            return None
+        if kind == "message":
+            texts.extend(part.text for part in item.content if getattr(part, "type", None) == "output_text")
+    return "".join(texts) if texts else None
+
+
+def _output_schema(args: tuple, kwargs: dict) -> Any:
+    if "output_schema" in kwargs:
+        return kwargs["output_schema"]
+    # get_response(system_instructions, input, model_settings, tools, output_schema, ...)
+    return args[4] if len(args) > 4 else None
+
+
+class RoutingModel(Model):
+    """
+    Stands for the model an agent asked for, picks the model of the running agent's policy on every call
+    """
+
+    def __init__(self, router: "RoutingModelProvider", model_name: str | None):
+        self.router = router
+        self.model_name = model_name
+
+    def _route(self, args: tuple, kwargs: dict) -> tuple[str, RoutePolicy | None, str | None]:
+        agent = current_agent_name()
+        policy = self.router.policy_for(agent)
+        agent = agent or "unknown"
+        schema = _output_schema(args, kwargs)
+        if schema is not None and not schema.is_plain_text():
+            self.router.structured_agents.add(agent)
+        if policy is None:
+            return agent, None, self.model_name
+        return agent, policy, self.router.choose(agent, policy)
+
+    async def get_response(self, *args, **kwargs):
+        agent, policy, model_name = self._route(args, kwargs)
+        response = await self._call(agent, model_name, args, kwargs)
+        if policy is None or not self._check(agent, model_name, response, args, kwargs):
+            return response
+
+        trusted = policy.models[0]
+        if policy.escalate_invalid and model_name != trusted:
+            self.router.stats(agent, model_name).escalated += 1
+            response = await self._call(agent, trusted, args, kwargs)
+            self._check(agent, trusted, response, args, kwargs)
+        return response
+
+    async def _call(self, agent: str, model_name: str | None, args: tuple, kwargs: dict) -> ModelResponse:
+        stats = self.router.stats(agent, model_name)
+        start = time.perf_counter()
+        try:
+            response = await self.router.provider.get_model(model_name).get_response(*args, **kwargs)
+        except Exception:
+            stats.calls += 1
+            stats.errors += 1
+            raise
+        stats.calls += 1
+        stats.latency.observe(time.perf_counter() - start)
+        if response.usage is not None:
+            stats.input_tokens += response.usage.input_tokens
+            stats.output_tokens += response.usage.output_tokens
+        return response
+
+    def _check(self, agent: str, model_name: str | None, response: ModelResponse, args: tuple, kwargs: dict) -> bool:
+        """
+        Validates a structured final answer against the output schema, True when it is invalid
+        """
+        schema = _output_schema(args, kwargs)
+        if schema is None or schema.is_plain_text():
+            return False
+        text = final_output_text(response)
+        if text is None:
+            return False
+        stats = self.router.stats(agent, model_name)
+        stats.validated += 1
+        try:
+            schema.validate_json(text)
+        except ModelBehaviorError:
+            stats.invalid += 1
+            return True
+        return False
+
+    async def stream_response(self, *args, **kwargs):
+        # streamed calls are routed and timed, escalation would need to replay events already sent
+        agent, policy, model_name = self._route(args, kwargs)
+        stats = self.router.stats(agent, model_name)
+        start = time.perf_counter()
+        try:
+            async for event in self.router.provider.get_model(model_name).stream_response(*args, **kwargs):
+                if getattr(event, "type", None) == "response.completed":
+                    usage = event.response.usage
+                    if usage is not None:
+                        stats.input_tokens += usage.input_tokens
+                        stats.output_tokens += usage.output_tokens
+                yield event
+        except Exception:
+            stats.calls += 1
+            stats.errors += 1
+            raise
+        stats.calls += 1
+        stats.latency.observe(time.perf_counter() - start)
+
+
+class RoutingModelProvider(ModelProvider):
+    """
+    Routes every model call by the agent making it, following per-agent RoutePolicy.
+
+    Agents without a policy (and no default) get the model they ask for from provider.
+    Latency, tokens and validation success are measured online per (agent, model),
+    see report(). Example:
+
+        RoutingModelProvider(get_github_model_provider(client), {
+            "weather_agent": RoutePolicy(("gpt-4o", "gpt-4o-mini")),
+            "weather_data_collector": RoutePolicy(("gpt-4o", "gpt-4o-mini")),
+            "whether_report_summariser_agent": RoutePolicy(("gpt-4o",)),
+        })
+    """
+
+    def __init__(
+            self,
+            provider: ModelProvider,
+            policies: dict[str, RoutePolicy],
+            default: RoutePolicy | None = None,
+            seed: int | None = None):
+        self.provider = provider
+        self.policies = policies
+        self.default = default
+        self._stats: dict[tuple[str, str | None], RouteStats] = {}
+        self._models: dict[str | None, RoutingModel] = {}
+        # agents seen calling with a structured output schema
+        self.structured_agents: set[str] = set()
+        self._random = random.Random(seed)
+
+    def get_model(self, model_name: str | None) -> Model:
+        if model_name not in self._models:
+            self._models[model_name] = RoutingModel(self, model_name)
+        return self._models[model_name]
+
+    def policy_for(self, agent: str | None) -> RoutePolicy | None:
+        return self.policies.get(agent, self.default) if agent else self.default
+
+    def stats(self, agent: str, model_name: str | None) -> RouteStats:
+        key = (agent, model_name)
+        if key not in self._stats:
+            self._stats[key] = RouteStats()
+        return self._stats[key]
+
+    def qualifies(self, agent: str, model_name: str, policy: RoutePolicy) -> bool:
+        stats = self.stats(agent, model_name)
+        if stats.calls < policy.min_samples or stats.error_rate > policy.max_error_rate:
+            return False
+        # agents without structured output have nothing to validate
+        if agent not in self.structured_agents:
+            return True
+        return stats.validated >= policy.min_samples and stats.validation_rate >= policy.min_validation_rate
+
+    def _unproven(self, agent: str, model_name: str, policy: RoutePolicy) -> bool:
+        stats = self.stats(agent, model_name)
+        if stats.calls < policy.min_samples:
+            return True
+        return agent in self.structured_agents and stats.validated < policy.min_samples
+
+    def choose(self, agent: str, policy: RoutePolicy) -> str:
+        unproven = [m for m in policy.models[1:] if self._unproven(agent, m, policy)]
+        if unproven and self._random.random() < policy.explore:
+            return self._random.choice(unproven)
+        qualified = [m for m in policy.models if m == policy.models[0] or self.qualifies(agent, m, policy)]
+        return min(qualified, key=lambda m: self.stats(agent, m).latency.quantile(0.5) or float("inf"))
+
+    def report(self) -> list[dict]:
+        return [
+            {"agent": agent, "model": model, **stats.to_dict()}
+            for (agent, model), stats in sorted(self._stats.items(), key=lambda item: (item[0][0], str(item[0][1])))
+        ]
@@ -0,0 +1,297 @@
+import bisect
+import contextvars
+import threading
+import time
+from typing import Any
+
+from agents import Agent, MaxTurnsExceeded, Model, ModelProvider, RunHooks, Runner
+
+
+# seconds, 1ms .. ~2min doubling
+LATENCY_BUCKETS = tuple(0.001 * 2 ** i for i in range(18))
+# tokens, 1 .. 256k doubling
+TOKEN_BUCKETS = tuple(float(2 ** i) for i in range(19))
+
+
+class StreamingHistogram:
+    """
+    Fixed-bucket histogram: constant memory however many values are observed
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """
+        Upper bound of the bucket holding the q-th value, clamped to the observed max
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                bound = self.buckets[index] if index < len(self.buckets) else self.max
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "min": self.min if self.count else 0.0,
+            "max": self.max if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+def _labels_text(labels: tuple[tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class RunMetrics:
+    """
+    Process-wide registry of labelled histograms and counters
+    """
+
+    def __init__(self):
+        self._histograms: dict[str, dict[tuple, StreamingHistogram]] = {}
+        self._counters: dict[str, dict[tuple, float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, buckets: tuple[float, ...] = LATENCY_BUCKETS, **labels) -> None:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = StreamingHistogram(buckets)
+            histogram.observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "histograms": {
+                    name: [{"labels": dict(key), **h.to_dict()} for key, h in series.items()]
+                    for name, series in self._histograms.items()
+                },
+                "counters": {
+                    name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                    for name, series in self._counters.items()
+                },
+            }
+
+    def to_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            for name, series in self._histograms.items():
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in series.items():
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        labels = _labels_text(key, 'le="%g"' % bound)
+                        lines.append(f"{name}_bucket{labels} {cumulative}")
+                    labels = _labels_text(key, 'le="+Inf"')
+                    lines.append(f"{name}_bucket{labels} {histogram.count}")
+                    lines.append(f"{name}_sum{_labels_text(key)} {histogram.sum:g}")
+                    lines.append(f"{name}_count{_labels_text(key)} {histogram.count}")
+            for name, series in self._counters.items():
+                lines.append(f"# TYPE {name} counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{_labels_text(key)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+RUN_METRICS = RunMetrics()
+
+
+def _model_label(agent: Agent) -> str:
+    if agent.model is None:
+        return "default"
+    if isinstance(agent.model, str):
+        return agent.model
+    return type(agent.model).__name__
+
+
+def _run_key(context) -> int:
+    # every hook context of a run shares the run's usage, nested runs get their own
+    return id(getattr(context, "usage", None) or context)
+
+
+class MetricsRunHooks(RunHooks):
+    """
+    Records agent turn time, tool time, model latency, tokens and handoffs into RunMetrics.
+
+    Timers are kept per run, so one instance can serve a run and the runs nested in its
+    tools (see NestedRunHooks), also when they run in parallel.
+    """
+
+    def __init__(self, metrics: RunMetrics = RUN_METRICS):
+        super().__init__()
+        self.metrics = metrics
+        self._agent_started: dict[tuple[int, str], float] = {}
+        self._tool_started: dict[tuple[str, str], float] = {}
+        self._llm_started: dict[tuple[int, str], float] = {}
+
+    def _end_turn(self, context, agent: Agent) -> None:
+        started = self._agent_started.pop((_run_key(context), agent.name), None)
+        if started is not None:
+            self.metrics.observe("agent_turn_seconds", time.perf_counter() - started, agent=agent.name)
+
+    async def on_agent_start(self, context, agent) -> None:
+        self._agent_started[(_run_key(context), agent.name)] = time.perf_counter()
+
+    async def on_agent_end(self, context, agent, output: Any) -> None:
+        self._end_turn(context, agent)
+
+    async def on_handoff(self, context, from_agent, to_agent) -> None:
+        self.metrics.inc("agent_handoffs_total", from_agent=from_agent.name, to_agent=to_agent.name)
+        self._end_turn(context, from_agent)
+
+    def _tool_key(self, context, tool) -> tuple[str, str]:
+        # parallel calls of the same tool are told apart by the call id when the SDK provides it
+        return tool.name, getattr(context, "tool_call_id", None) or f"{_run_key(context)}"
+
+    async def on_tool_start(self, context, agent, tool) -> None:
+        self._tool_started[self._tool_key(context, tool)] = time.perf_counter()
+
+    async def on_tool_end(self, context, agent, tool, result) -> None:
+        started = self._tool_started.pop(self._tool_key(context, tool), None)
+        if started is not None:
+            self.metrics.observe("tool_seconds", time.perf_counter() - started, agent=agent.name, tool=tool.name)
+
+    async def on_llm_start(self, context, agent, system_prompt, input_items) -> None:
+        self._llm_started[(_run_key(context), agent.name)] = time.perf_counter()
+
+    async def on_llm_end(self, context, agent, response) -> None:
+        labels = {"agent": agent.name, "model": _model_label(agent)}
+        started = self._llm_started.pop((_run_key(context), agent.name), None)
+        if started is not None:
+            self.metrics.observe("llm_call_seconds", time.perf_counter() - started, **labels)
+
+        usage = response.usage
+        if usage is not None:
+            details = getattr(usage, "input_tokens_details", None)
+            self.metrics.observe("llm_input_tokens", usage.input_tokens, TOKEN_BUCKETS, **labels)
+            self.metrics.observe("llm_output_tokens", usage.output_tokens, TOKEN_BUCKETS, **labels)
+            self.metrics.inc("llm_cached_tokens_total", getattr(details, "cached_tokens", 0) or 0, **labels)
+
+
+# the MetricsRunHooks of the run_with_metrics call running in this context
+_active_hooks: contextvars.ContextVar[MetricsRunHooks | None] = contextvars.ContextVar("metrics_run_hooks", default=None)
+
+
+def _forward(name: str):
+    async def hook(self, *args, **kwargs) -> None:
+        hooks = _active_hooks.get()
+        if hooks is not None:
+            await getattr(hooks, name)(*args, **kwargs)
+
+    hook.__name__ = name
+    return hook
+
+
+class NestedRunHooks(RunHooks):
+    """
+    Hooks for runs nested in a tool, Agent.as_tool(hooks=NESTED_RUN_HOOKS) or a Runner.run inside
+    a function tool. Runner.run(hooks=...) only reaches the outer run, these forward to the
+    MetricsRunHooks of the run_with_metrics call the tool runs under, and do nothing outside one.
+    """
+
+    on_agent_start = _forward("on_agent_start")
+    on_agent_end = _forward("on_agent_end")
+    on_handoff = _forward("on_handoff")
+    on_tool_start = _forward("on_tool_start")
+    on_tool_end = _forward("on_tool_end")
+    on_llm_start = _forward("on_llm_start")
+    on_llm_end = _forward("on_llm_end")
+
+
+NESTED_RUN_HOOKS = NestedRunHooks()
+
+
+class TimingModel(Model):
+    """
+    Records time to first event of streamed calls, which the run hooks cannot see
+    """
+
+    def __init__(self, model: Model, model_name: str, metrics: RunMetrics):
+        self.model = model
+        self.model_name = model_name
+        self.metrics = metrics
+
+    async def get_response(self, *args, **kwargs):
+        return await self.model.get_response(*args, **kwargs)
+
+    async def stream_response(self, *args, **kwargs):
+        start = time.perf_counter()
+        first = True
+        async for event in self.model.stream_response(*args, **kwargs):
+            if first:
+                self.metrics.observe("llm_time_to_first_token_seconds", time.perf_counter() - start, model=self.model_name)
+                first = False
+            yield event
+
+
+class TimingModelProvider(ModelProvider):
+    def __init__(self, provider: ModelProvider, metrics: RunMetrics = RUN_METRICS):
+        self.provider = provider
+        self.metrics = metrics
+
+    def get_model(self, model_name: str | None) -> Model:
+        return TimingModel(self.provider.get_model(model_name), model_name or "default", self.metrics)
+
+
+async def run_with_metrics(agent: Agent, input: Any, metrics: RunMetrics = RUN_METRICS, **kwargs):
+    """
+    Runner.run with MetricsRunHooks attached, also counts runs, run time and max-turn exhaustion.
+
+    Runs nested in tools are measured when they were given NESTED_RUN_HOOKS, as get_attn_agent does.
+    """
+    start = time.perf_counter()
+    status = "ok"
+    hooks = MetricsRunHooks(metrics)
+    token = _active_hooks.set(hooks)
+    try:
+        return await Runner.run(agent, input, hooks=hooks, **kwargs)
+    except MaxTurnsExceeded:
+        status = "max_turns_exceeded"
+        raise
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        _active_hooks.reset(token)
+        metrics.observe("run_seconds", time.perf_counter() - start, agent=agent.name)
+        metrics.inc("runs_total", agent=agent.name, status=status)
@@ -0,0 +1,243 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import unicodedata
+import zlib
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+from pydantic import BaseModel, TypeAdapter
+from agents import Agent, Runner, RunResult
+
+from helpers.agent_graph import find_agent, graph_fingerprint
+
+
+SEMANTIC_CACHE_PATH = os.environ.get("SEMANTIC_CACHE_PATH")
+
+# words that do not change the answer, "now" and "today" ask for the same report
+_FILLER_WORDS = {
+    "a", "an", "the", "is", "are", "what", "whats", "how", "in", "at", "for", "of", "on",
+    "please", "tell", "me", "give", "show", "like", "s", "can", "you",
+    "today", "now", "currently", "current", "right", "moment",
+}
+
+
+def normalize_query(text: str) -> str:
+    """
+    Case, accent, punctuation and filler word insensitive form of a query. Word order is kept,
+    "10 USD to EUR" and "10 EUR to USD" ask different things
+    """
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode().casefold()
+    words = re.findall(r"[a-z0-9]+", text)
+    return " ".join([w for w in words if w not in _FILLER_WORDS] or words)
+
+
+class HashingEmbeddingFunction:
+    """
+    Offline embedding: words, word pairs (so word order counts) and character trigrams hashed
+    into `dim` signed buckets, L2 normalised.
+
+    No model download or network access, deterministic across processes, so it
+    suits near-duplicate queries rather than paraphrases with different words.
+    """
+
+    def __init__(self, dim: int = 512, trigram_weight: float = 0.5, bigram_weight: float = 1.0):
+        self.dim = dim
+        self.trigram_weight = trigram_weight
+        self.bigram_weight = bigram_weight
+
+    def _features(self, text: str):
+        words = text.split()
+        for first, second in zip(words, words[1:]):
+            yield f"{first} {second}", self.bigram_weight
+        for word in words:
+            yield word, 1.0
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                yield padded[i:i + 3], self.trigram_weight
+
+    def __call__(self, input: list[str]) -> list[np.ndarray]:
+        vectors = np.zeros((len(input), self.dim), dtype=np.float32)
+        for row, text in enumerate(input):
+            for feature, weight in self._features(text):
+                digest = zlib.crc32(feature.encode())
+                vectors[row, digest % self.dim] += weight if digest & 0x80000000 else -weight
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return list(vectors / np.where(norms == 0, 1, norms))
+
+    def name(self) -> str:
+        return f"hashing-bigrams-{self.dim}"
+
+
+@dataclass
+class SemanticCacheResult:
+    final_output: Any
+    hit: bool
+    similarity: float | None = None
+    matched_query: str | None = None
+    run_result: RunResult | None = None
+
+
+class SemanticCache:
+    """
+    Final outputs of earlier runs in a chromadb collection, looked up by query similarity.
+
+    Entries are scoped (by default per agent graph fingerprint), expire after ttl
+    seconds and only match at min_similarity (cosine) or above. Without path the
+    index lives in memory for the process.
+    """
+
+    def __init__(
+            self,
+            path: str | None = SEMANTIC_CACHE_PATH,
+            collection: str = "agent_answers",
+            min_similarity: float = 0.9,
+            ttl: float = 3600,
+            embedding_function: Any = None):
+        import chromadb
+        from chromadb.config import Settings
+
+        # the telemetry client logs an error per event even when disabled
+        logging.getLogger("chromadb.telemetry.product.posthog").setLevel(logging.CRITICAL)
+        settings = Settings(anonymized_telemetry=False)
+        client = chromadb.PersistentClient(path, settings=settings) if path else chromadb.EphemeralClient(settings)
+        self.embedding_function = embedding_function or HashingEmbeddingFunction()
+        self.collection = client.get_or_create_collection(
+            collection,
+            embedding_function=self.embedding_function,
+            metadata={"hnsw:space": "cosine"},
+        )
+        self.min_similarity = min_similarity
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def _id(self, scope: str, normalized: str) -> str:
+        return hashlib.sha256(f"{scope}\n{normalized}".encode()).hexdigest()
+
+    def lookup(self, query: str, scope: str) -> dict | None:
+        """
+        Metadata of the closest live entry in scope (answer, agent, query) plus its similarity, or None
+        """
+        normalized = normalize_query(query)
+        found = self.collection.query(query_texts=[normalized], n_results=1, where={"scope": scope})
+        if not found["ids"] or not found["ids"][0]:
+            self.misses += 1
+            return None
+
+        metadata = found["metadatas"][0][0]
+        similarity = 1 - found["distances"][0][0]
+        if metadata["created_at"] + self.ttl < time.time():
+            self.collection.delete(ids=[found["ids"][0][0]])
+            self.expired += 1
+            self.misses += 1
+            return None
+        if similarity < self.min_similarity:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {**metadata, "similarity": similarity}
+
+    def store(self, query: str, scope: str, answer: str, agent: str = "") -> None:
+        """
+        answer is the serialized final output, agent the name of the agent that produced it
+        """
+        normalized = normalize_query(query)
+        self.collection.upsert(
+            ids=[self._id(scope, normalized)],
+            documents=[normalized],
+            metadatas=[{
+                "scope": scope, "query": query, "answer": answer, "agent": agent, "created_at": time.time(),
+            }],
+        )
+
+    def purge(self, scope: str | None = None) -> int:
+        """
+        Deletes expired entries (of one scope, or all), returns how many
+        """
+        where: dict = {"created_at": {"$lt": time.time() - self.ttl}}
+        if scope is not None:
+            where = {"$and": [where, {"scope": scope}]}
+        expired = self.collection.get(where=where, include=[])["ids"]
+        if expired:
+            self.collection.delete(ids=expired)
+        return len(expired)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": self.collection.count(),
+        }
+
+
+def _query_text(input: str | list) -> str | None:
+    if isinstance(input, str):
+        return input
+    # the last user message of an input list
+    for item in reversed(input):
+        if isinstance(item, dict) and item.get("role") == "user" and isinstance(item.get("content"), str):
+            return item["content"]
+    return None
+
+
+def _serialize(output: Any) -> str:
+    if isinstance(output, BaseModel):
+        return output.model_dump_json()
+    return json.dumps(output, default=str)
+
+
+def _deserialize(answer: str, agent: Agent, last_agent: str) -> Any:
+    # after handoffs the output type is the one of the agent that answered
+    answered_by = find_agent(agent, last_agent) or agent
+    return TypeAdapter(answered_by.output_type or str).validate_json(answer)
+
+
+_default_cache: SemanticCache | None = None
+
+
+def get_semantic_cache() -> SemanticCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = SemanticCache()
+    return _default_cache
+
+
+async def cached_run(
+        agent: Agent,
+        input: str | list,
+        cache: SemanticCache | None = None,
+        scope: str | None = None,
+        **kwargs) -> SemanticCacheResult:
+    """
+    Runner.run behind the semantic cache, kwargs go to Runner.run.
+
+    The scope defaults to the agent graph fingerprint, so changing instructions,
+    tools or handoffs starts from an empty cache. Inputs without a user query run uncached.
+    """
+    cache = cache or get_semantic_cache()
+    query = _query_text(input)
+    if query is None:
+        result = await Runner.run(agent, input, **kwargs)
+        return SemanticCacheResult(result.final_output, hit=False, run_result=result)
+
+    scope = scope or graph_fingerprint(agent)
+    found = await asyncio.to_thread(cache.lookup, query, scope)
+    if found is not None:
+        return SemanticCacheResult(
+            _deserialize(found["answer"], agent, found["agent"]),
+            hit=True, similarity=found["similarity"], matched_query=found["query"],
+        )
+
+    result = await Runner.run(agent, input, **kwargs)
+    await asyncio.to_thread(cache.store, query, scope, _serialize(result.final_output), result.last_agent.name)
+    return SemanticCacheResult(result.final_output, hit=False, run_result=result)
@@ -0,0 +1,80 @@
+import statistics
+import subprocess
+import sys
+import time
+
+
+DEFAULT_MODULES = (
+    "helpers.wttn_models",
+    "helpers.wttn_agent",
+    "helpers.trace_util",
+    "helpers.model_client",
+    "agents",
+)
+
+_IMPORT_SCRIPT = (
+    "import time, sys\n"
+    "start = time.perf_counter()\n"
+    "import {module}\n"
+    "print(time.perf_counter() - start, 'agents' in sys.modules, 'IPython' in sys.modules)\n"
+)
+
+
+def benchmark_imports(modules: tuple[str, ...] = DEFAULT_MODULES, runs: int = 5) -> list[dict]:
+    """
+    Cold import time of each module, every run in a fresh interpreter so nothing is cached in sys.modules.
+
+    Also reports whether the import pulled in the agents SDK or IPython.
+    """
+    results = []
+    for module in modules:
+        samples = []
+        loads_agents = loads_ipython = False
+        for _ in range(runs):
+            output = subprocess.run(
+                [sys.executable, "-c", _IMPORT_SCRIPT.format(module=module)],
+                capture_output=True, text=True, check=True,
+            ).stdout.split()
+            samples.append(float(output[0]))
+            loads_agents, loads_ipython = output[1] == "True", output[2] == "True"
+        results.append({
+            "module": module,
+            "median_ms": statistics.median(samples) * 1000,
+            "min_ms": min(samples) * 1000,
+            "loads_agents": loads_agents,
+            "loads_ipython": loads_ipython,
+        })
+    return results
+
+
+def benchmark_graph_construction(runs: int = 200, collector_mode: str = "llm") -> dict:
+    """
+    Time to build the weather graph from scratch against a memoized get_attn_agent call
+    """
+    from helpers.wttn_agent import _build_attn_agent, get_attn_agent
+
+    # the first build also pays for importing the SDK
+    start = time.perf_counter()
+    get_attn_agent(collector_mode=collector_mode)
+    first_ms = (time.perf_counter() - start) * 1000
+
+    def timed(fn) -> float:
+        samples = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - start)
+        return statistics.median(samples) * 1e6
+
+    return {
+        "collector_mode": collector_mode,
+        "first_call_ms": first_ms,
+        "build_us": timed(lambda: _build_attn_agent(collector_mode, None)),
+        "memoized_us": timed(lambda: get_attn_agent(collector_mode=collector_mode)),
+    }
+
+
+if __name__ == "__main__":
+    for row in benchmark_imports():
+        print(row)
+    print(benchmark_graph_construction())
@@ -0,0 +1,200 @@
+import asyncio
+import contextvars
+import dataclasses
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Any, Callable
+
+from pydantic import BaseModel
+
+from helpers.cache_util import SingleFlight, TTLCache
+
+
+logger = logging.getLogger(__name__)
+
+# threads shared by every sync tool wrapped with idempotent_tool
+TOOL_THREADS = int(os.environ.get("TOOL_THREADS", "8"))
+
+_MISSING = object()
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_tool_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=TOOL_THREADS, thread_name_prefix="tool")
+    return _executor
+
+
+def enable_tool_logging(level: int = logging.DEBUG) -> None:
+    """
+    Shows the helpers' tool logging (calls, cache hits, fallbacks) on stderr, it is silent by default
+    """
+    helpers_logger = logging.getLogger("helpers")
+    helpers_logger.setLevel(level)
+    if not any(getattr(h, "_tool_logging", False) for h in helpers_logger.handlers):
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s"))
+        handler._tool_logging = True
+        helpers_logger.addHandler(handler)
+
+
+@dataclass
+class ToolCacheStats:
+    calls: int = 0
+    hits: int = 0
+    coalesced: int = 0
+    executions: int = 0
+    errors: int = 0
+    run_s: float = 0.0
+    # hits and coalesced calls, each valued at the mean execution time when it was served
+    saved_s: float = 0.0
+
+    @property
+    def mean_run_s(self) -> float:
+        return self.run_s / self.executions if self.executions else 0.0
+
+    def reset(self) -> None:
+        self.__init__()
+
+    def to_dict(self) -> dict:
+        stats = asdict(self)
+        stats["hit_rate"] = (self.hits + self.coalesced) / self.calls if self.calls else 0.0
+        stats["mean_run_s"] = self.mean_run_s
+        return stats
+
+
+_TOOL_STATS: dict[str, ToolCacheStats] = {}
+_TOOL_CACHES: dict[str, TTLCache] = {}
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return asdict(value)
+    return str(value)
+
+
+def _private_copy(value: Any) -> Any:
+    # cached pydantic results are shared, each caller gets its own copy to change
+    return value.model_copy(deep=True) if isinstance(value, BaseModel) else value
+
+
+def _context_parameter(signature: inspect.Signature) -> str | None:
+    # function_tool passes the run context as the first parameter when it is annotated as such
+    parameters = list(signature.parameters.values())
+    if not parameters:
+        return None
+    annotation = parameters[0].annotation
+    name = getattr(annotation, "__name__", None) or str(annotation)
+    if "RunContextWrapper" in name or "ToolContext" in name:
+        return parameters[0].name
+    return None
+
+
+def idempotent_tool(ttl: float = 300.0, maxsize: int = 1024, name: str | None = None):
+    """
+    Declares a tool idempotent for ttl seconds: results are memoized by the canonical JSON of
+    the arguments (the run context excluded) and concurrent identical calls share one execution.
+
+    Sync functions run in the shared bounded tool thread pool instead of on the event loop.
+    Goes under function_tool, which sees the original signature and docstring:
+
+        @function_tool
+        @idempotent_tool(ttl=60)
+        def get_current_time(location: str) -> CurrentTime: ...
+
+    Errors are not cached, pydantic results are returned as copies so callers cannot change
+    each other's. Per-tool hit rates and saved time are in tool_cache_report().
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        tool_name = name or fn.__name__
+        signature = inspect.signature(fn)
+        context_parameter = _context_parameter(signature)
+        cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        flight = SingleFlight()
+        stats = _TOOL_STATS.setdefault(tool_name, ToolCacheStats())
+        _TOOL_CACHES[tool_name] = cache
+        is_async = inspect.iscoroutinefunction(fn)
+
+        def key_of(args: tuple, kwargs: dict) -> str:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = {k: v for k, v in bound.arguments.items() if k != context_parameter}
+            return json.dumps(arguments, sort_keys=True, separators=(",", ":"), default=_json_default)
+
+        async def execute(args: tuple, kwargs: dict) -> Any:
+            start = time.perf_counter()
+            try:
+                if is_async:
+                    result = await fn(*args, **kwargs)
+                else:
+                    # copy_context keeps tracing spans and other context variables in the thread
+                    context = contextvars.copy_context()
+                    call = functools.partial(context.run, fn, *args, **kwargs)
+                    result = await asyncio.get_running_loop().run_in_executor(get_tool_executor(), call)
+            except Exception:
+                stats.errors += 1
+                raise
+            stats.executions += 1
+            stats.run_s += time.perf_counter() - start
+            return result
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            stats.calls += 1
+            key = key_of(args, kwargs)
+            cached = cache.get(key, _MISSING)
+            if cached is not _MISSING:
+                stats.hits += 1
+                stats.saved_s += stats.mean_run_s
+                logger.debug("tool %s hit args=%s", tool_name, key)
+                return _private_copy(cached)
+
+            # nothing awaits between this check and flight.do, so it sees the same in-flight calls
+            coalesced = flight.in_flight(key)
+
+            async def load() -> Any:
+                logger.debug("tool %s run args=%s", tool_name, key)
+                result = await execute(args, kwargs)
+                cache.set(key, result)
+                return result
+
+            result = await flight.do(key, load)
+            if coalesced:
+                stats.coalesced += 1
+                stats.saved_s += stats.mean_run_s
+                logger.debug("tool %s coalesced args=%s", tool_name, key)
+            return _private_copy(result)
+
+        wrapper.tool_cache = cache
+        wrapper.tool_stats = stats
+        return wrapper
+
+    return decorator
+
+
+def tool_cache_report() -> dict[str, dict]:
+    """
+    Calls, hit rate (hits and coalesced calls), executions and saved seconds per idempotent tool
+    """
+    return {tool_name: stats.to_dict() for tool_name, stats in _TOOL_STATS.items()}
+
+
+def clear_tool_caches() -> None:
+    for cache in _TOOL_CACHES.values():
+        cache.clear()
+    for stats in _TOOL_STATS.values():
+        stats.reset()
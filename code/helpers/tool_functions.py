@@ -1,9 +1,16 @@
+import logging
+
 from pydantic import BaseModel, Field
 from agents import function_tool
-import requests
 
 import random
 
+from helpers.tool_cache import idempotent_tool
+from helpers.wttn_client import get_wttn_report
+
+
+logger = logging.getLogger(__name__)
+
 
 class Weather(BaseModel):
     city: str
@@ -17,19 +24,20 @@ class CurrentTime(BaseModel):
 
 
 @function_tool
-def get_weather(city: str) -> Weather:
-    print(f"[debug-server] get_current_weather({city})")
+async def get_weather(city: str) -> Weather:
+    # get_wttn_report already memoizes and coalesces per city
+    logger.debug("get_weather city=%s", city)
 
-    endpoint = "https://wttr.in"
-    response = requests.get(f"{endpoint}/{city}")
-    return response.text
+    return await get_wttn_report(city)
 
 
 @function_tool
+@idempotent_tool(ttl=30)
 def get_current_time(location) -> CurrentTime:
-    from datetime import datetime
     """Get the current time for a given location"""
-    print(f"[debug] get_current_time called with location: {location}")
+    from datetime import datetime
+
+    logger.debug("get_current_time location=%s", location)
     location_lower = location.lower()
 
     current_time = datetime.now().strftime("%I:%M %p")
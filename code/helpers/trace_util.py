@@ -1,200 +1,247 @@
-from agents import trace
+import html
+import json
+import sys
+from typing import IO, Any
 
 
-def get_trace_url(tr: trace) -> str:
+def get_trace_url(tr) -> str:
+    # points at the local trace store when enable_local_tracing() is active,
+    # which can only be the case once helpers.local_tracing has been imported
+    local_tracing = sys.modules.get("helpers.local_tracing")
+    local_url = local_tracing.get_local_trace_url(tr.trace_id) if local_tracing else None
+    if local_url is not None:
+        return local_url
     tracing_url = f"https://platform.openai.com/traces/trace?trace_id={tr.trace_id}"
     return tracing_url
 
 
 
-# ...existing code...
-
-from IPython.display import display, HTML
-import json
-from typing import List, Dict, Any
+_THEMES = {
+    "dark": {
+        "main_bg": "#2d2d2d",
+        "header_bg": "#3c3c3c",
+        "text_color": "#e0e0e0",
+        "heading_color": "#61dafb",
+        "strong_color": "#f0f0f0",
+        "border_color": "#555",
+        "json_bg": "#1e1e1e",
+        "json_border": "#444",
+        "json_text": "#d4d4d4",
+        "tool_output_bg": "#1a2233",
+        "tool_output_border": "#61dafb",
+        "message_bg": "#1e331e",
+        "message_border": "#4caf50",
+        "step_type_color": "#61dafb",
+        "muted_color": "#999",
+    },
+    "light": {
+        "main_bg": "#ffffff",
+        "header_bg": "#f5f5f5",
+        "text_color": "#333333",
+        "heading_color": "#1a73e8",
+        "strong_color": "#000000",
+        "border_color": "#ddd",
+        "json_bg": "#f8f8f8",
+        "json_border": "#e0e0e0",
+        "json_text": "#333333",
+        "tool_output_bg": "#f0f7ff",
+        "tool_output_border": "#1a73e8",
+        "message_bg": "#f0fff0",
+        "message_border": "#34a853",
+        "step_type_color": "#1a73e8",
+        "muted_color": "#777",
+    },
+}
+
+_STYLE = """
+<style>
+    .agent-steps {{ font-family: 'Segoe UI', Arial, sans-serif; margin: 20px 0; width: 100%; color: {text_color}; }}
+    .agent-steps .step {{ margin-bottom: 20px; border: 1px solid {border_color}; border-radius: 5px; overflow: hidden; background-color: {main_bg}; }}
+    .agent-steps .step-header {{ background-color: {header_bg}; padding: 10px; font-weight: bold; border-bottom: 1px solid {border_color}; }}
+    .agent-steps .step-content {{ padding: 15px; background-color: {main_bg}; }}
+    .agent-steps .step-type {{ color: {step_type_color}; display: inline-block; margin-right: 10px; }}
+    .agent-steps .step-agent {{ color: {muted_color}; font-weight: normal; margin-left: 10px; }}
+    .agent-steps .json-block {{ background-color: {json_bg}; border: 1px solid {json_border}; border-radius: 3px; padding: 10px;
+        font-family: 'Consolas', 'Courier New', monospace; white-space: pre-wrap; word-break: break-word; margin-top: 10px; color: {json_text}; }}
+    .agent-steps .tool-output {{ background-color: {tool_output_bg}; border-left: 4px solid {tool_output_border}; padding: 10px; margin-top: 10px; white-space: pre-wrap; }}
+    .agent-steps .message-content {{ background-color: {message_bg}; border-left: 4px solid {message_border}; padding: 10px; margin-top: 10px; white-space: pre-wrap; }}
+    .agent-steps .truncated {{ color: {muted_color}; font-style: italic; }}
+    .agent-steps summary {{ cursor: pointer; color: {muted_color}; }}
+    .agent-steps h2 {{ color: {heading_color}; margin-bottom: 15px; }}
+    .agent-steps strong {{ color: {strong_color}; }}
+    .agent-steps .theme-toggle {{ margin: 10px 0; text-align: right; }}
+</style>
+"""
+
+# payloads longer than this are collapsed, and cut at the max_chars of the renderer
+COLLAPSE_CHARS = 600
+MAX_CHARS = 4000
+
+
+def _message_text(raw_item: Any) -> str:
+    return "".join(getattr(part, "text", "") for part in getattr(raw_item, "content", None) or [])
+
+
+def _field(raw_item: Any, name: str) -> Any:
+    return raw_item.get(name) if isinstance(raw_item, dict) else getattr(raw_item, name, None)
+
+
+def _clip(text: str, max_chars: int | None) -> str:
+    return text if max_chars is None or len(text) <= max_chars else text[:max_chars]
+
+
+def step_record(step: int, item: Any, max_chars: int | None = MAX_CHARS) -> dict:
+    """
+    Plain dict of one RunItem: step, type, agent and the type's payload, text fields cut at max_chars.
 
-def display_agent_execution_steps(result, theme="dark"):
+    Payload sizes before cutting are kept in *_chars fields. Arguments are kept as the raw JSON string.
+    """
+    raw = item.raw_item
+    record = {"step": step, "type": item.type, "agent": getattr(getattr(item, "agent", None), "name", None)}
+    if item.type == "tool_call_item":
+        arguments = _field(raw, "arguments") or ""
+        record.update(
+            tool=_field(raw, "name") or type(raw).__name__,
+            call_id=_field(raw, "call_id"),
+            arguments=_clip(arguments, max_chars),
+            arguments_chars=len(arguments),
+        )
+    elif item.type == "tool_call_output_item":
+        output = getattr(item, "output", None)
+        if output is None or output == "":
+            output = _field(raw, "output") or "No output"
+        if isinstance(output, str):
+            text = output
+        elif hasattr(output, "model_dump_json"):
+            text = output.model_dump_json()
+        else:
+            text = json.dumps(output, default=str)
+        record.update(call_id=_field(raw, "call_id"), output=_clip(text, max_chars), output_chars=len(text))
+    elif item.type == "message_output_item":
+        text = _message_text(raw)
+        record.update(text=_clip(text, max_chars), text_chars=len(text))
+    elif item.type in ("handoff_call_item", "handoff_output_item"):
+        record.update(
+            tool=_field(raw, "name"),
+            source=getattr(getattr(item, "source_agent", None), "name", None),
+            target=getattr(getattr(item, "target_agent", None), "name", None),
+        )
+    return record
+
+
+def _payload_html(parts: list[str], css_class: str, text: str, chars: int, collapse_chars: int) -> None:
+    body = html.escape(text)
+    if chars > len(text):
+        body += f'<span class="truncated"> ... {chars - len(text):,} more characters</span>'
+    if chars > collapse_chars:
+        parts.append(f'<details><summary>{chars:,} characters</summary><div class="{css_class}">{body}</div></details>')
+    else:
+        parts.append(f'<div class="{css_class}">{body}</div>')
+
+
+def step_html(record: dict, collapse_chars: int = COLLAPSE_CHARS) -> str:
+    """
+    HTML of one step_record, every payload escaped
+    """
+    parts = [
+        '<div class="step"><div class="step-header">',
+        f'<span class="step-type">{html.escape(record["type"])}</span>',
+        f'<span>Step {record["step"]}</span>',
+    ]
+    if record.get("agent"):
+        parts.append(f'<span class="step-agent">{html.escape(record["agent"])}</span>')
+    parts.append('</div><div class="step-content">')
+
+    if "arguments" in record:
+        parts.append(f'<p><strong>Tool:</strong> {html.escape(record["tool"])}</p><p><strong>Arguments:</strong></p>')
+        _payload_html(parts, "json-block", record["arguments"], record["arguments_chars"], collapse_chars)
+    elif "output" in record:
+        parts.append("<p><strong>Tool Output:</strong></p>")
+        _payload_html(parts, "tool-output", record["output"], record["output_chars"], collapse_chars)
+    elif "text" in record:
+        parts.append("<p><strong>Assistant Response:</strong></p>")
+        _payload_html(parts, "message-content", record["text"], record["text_chars"], collapse_chars)
+    elif record.get("target") or record.get("source"):
+        parts.append(
+            f'<p><strong>Handoff:</strong> {html.escape(record.get("source") or "?")}'
+            f' &rarr; {html.escape(record.get("target") or "?")}</p>'
+        )
+
+    parts.append("</div></div>")
+    return "".join(parts)
+
+
+def steps_header_html(theme: str = "dark") -> str:
+    styles = _THEMES.get(theme.lower(), _THEMES["light"])
+    return (
+        _STYLE.format(**styles)
+        + f'<div class="agent-steps"><div class="theme-toggle"><em>Current theme: {html.escape(theme)}</em></div>'
+        + "<h2>Agent Execution Steps</h2></div>"
+    )
+
+
+def display_agent_execution_steps(
+        result,
+        theme="dark",
+        max_chars: int | None = MAX_CHARS,
+        collapse_chars: int = COLLAPSE_CHARS):
     """
     Display the execution steps of an agent in a nicely formatted HTML output.
 
     Args:
         result: The result object containing new_items with agent execution steps
         theme: "dark" or "light" theme option (default: "dark")
+        max_chars: payloads are cut at this many characters (None keeps them whole)
+        collapse_chars: payloads longer than this start collapsed
     """
-    # Define theme-based styling
-    if theme.lower() == "dark":
-        styles = {
-            "main_bg": "#2d2d2d",
-            "header_bg": "#3c3c3c",
-            "text_color": "#e0e0e0",
-            "heading_color": "#61dafb",
-            "strong_color": "#f0f0f0",
-            "border_color": "#555",
-            "json_bg": "#1e1e1e",
-            "json_border": "#444",
-            "json_text": "#d4d4d4",
-            "tool_output_bg": "#1a2233",
-            "tool_output_border": "#61dafb",
-            "message_bg": "#1e331e",
-            "message_border": "#4caf50",
-            "step_type_color": "#61dafb"
-        }
-    else:  # light theme
-        styles = {
-            "main_bg": "#ffffff",
-            "header_bg": "#f5f5f5",
-            "text_color": "#333333",
-            "heading_color": "#1a73e8",
-            "strong_color": "#000000",
-            "border_color": "#ddd",
-            "json_bg": "#f8f8f8",
-            "json_border": "#e0e0e0",
-            "json_text": "#333333",
-            "tool_output_bg": "#f0f7ff",
-            "tool_output_border": "#1a73e8",
-            "message_bg": "#f0fff0",
-            "message_border": "#34a853",
-            "step_type_color": "#1a73e8"
-        }
-
-    html = f"""
-    <style>
-        .agent-steps {{
-            font-family: 'Segoe UI', Arial, sans-serif;
-            margin: 20px 0;
-            width: 100%;
-            color: {styles["text_color"]};
-        }}
-        .step {{
-            margin-bottom: 20px;
-            border: 1px solid {styles["border_color"]};
-            border-radius: 5px;
-            overflow: hidden;
-            background-color: {styles["main_bg"]};
-        }}
-        .step-header {{
-            background-color: {styles["header_bg"]};
-            padding: 10px;
-            font-weight: bold;
-            border-bottom: 1px solid {styles["border_color"]};
-        }}
-        .step-content {{
-            padding: 15px;
-            background-color: {styles["main_bg"]};
-        }}
-        .step-type {{
-            color: {styles["step_type_color"]};
-            display: inline-block;
-            margin-right: 10px;
-        }}
-        .json-block {{
-            background-color: {styles["json_bg"]};
-            border: 1px solid {styles["json_border"]};
-            border-radius: 3px;
-            padding: 10px;
-            font-family: 'Consolas', 'Courier New', monospace;
-            white-space: pre-wrap;
-            margin-top: 10px;
-            color: {styles["json_text"]};
-        }}
-        .tool-output {{
-            background-color: {styles["tool_output_bg"]};
-            border-left: 4px solid {styles["tool_output_border"]};
-            padding: 10px;
-            margin-top: 10px;
-        }}
-        .message-content {{
-            background-color: {styles["message_bg"]};
-            border-left: 4px solid {styles["message_border"]};
-            padding: 10px;
-            margin-top: 10px;
-        }}
-        .agent-steps h2 {{
-            color: {styles["heading_color"]};
-            margin-bottom: 15px;
-        }}
-        strong {{
-            color: {styles["strong_color"]};
-        }}
-        .theme-toggle {{
-            margin: 10px 0;
-            text-align: right;
-        }}
-    </style>
-    <div class="agent-steps">
-        <div class="theme-toggle">
-            <em>Current theme: {theme}</em>
-        </div>
-        <h2>Agent Execution Steps</h2>
-    """
+    # IPython is only needed when rendering, headless workers never import it
+    from IPython.display import HTML
 
+    parts = [steps_header_html(theme), '<div class="agent-steps">']
     for i, item in enumerate(result.new_items):
-        item_type = item.type
-        step_num = i + 1
-
-        html += f"""
-        <div class="step">
-            <div class="step-header">
-                <span class="step-type">{item_type}</span>
-                <span>Step {step_num}</span>
-            </div>
-            <div class="step-content">
-        """
-
-        # Tool Call
-        if item_type == 'tool_call_item':
-            tool_name = item.raw_item.name
-            tool_args = item.raw_item.arguments
-
-            html += f"""
-                <p><strong>Tool:</strong> {tool_name}</p>
-                <p><strong>Arguments:</strong></p>
-                <div class="json-block">{json.dumps(json.loads(tool_args), indent=2)}</div>
-            """
-
-        # Tool Output
-        elif item_type == 'tool_call_output_item':
-            if hasattr(item, 'output') and item.output:
-                # Format the output based on the Weather class
-                # html += f"""
-                #     <p><strong>Tool Output:</strong></p>
-                #     <div class="tool-output">
-                #         <p>City: {item.output}</p>
-                #         # <p>Temperature: {item.output.temperature}</p>
-                #         # <p>Conditions: {item.output.conditions}</p>
-                #     </div>
-                # """
-                html += f"""
-                    <p><strong>Tool Output:</strong></p>
-                    <div class="tool-output">
-                        <p>Tool Output: {item.output}</p>
-                    </div>
-                """
-            else:
-                output_str = str(item.raw_item.get('output', 'No output'))
-                html += f"""
-                    <p><strong>Tool Output:</strong></p>
-                    <div class="tool-output">{output_str}</div>
-                """
-
-        # Final Message
-        elif item_type == 'message_output_item':
-            message_content = ""
-            if hasattr(item.raw_item, 'content'):
-                for content_item in item.raw_item.content:
-                    if hasattr(content_item, 'text'):
-                        message_content += content_item.text
-
-            html += f"""
-                <p><strong>Assistant Response:</strong></p>
-                <div class="message-content">{message_content}</div>
-            """
-
-        html += """
-            </div>
-        </div>
-        """
-
-    html += "</div>"
-
-    return HTML(html)
+        parts.append(step_html(step_record(i + 1, item, max_chars), collapse_chars))
+    parts.append("</div>")
+    return HTML("".join(parts))
+
+
+async def display_streamed_execution_steps(
+        result,
+        theme="dark",
+        max_chars: int | None = MAX_CHARS,
+        collapse_chars: int = COLLAPSE_CHARS) -> list[dict]:
+    """
+    Displays each step of a Runner.run_streamed() result as it happens, one output per step
+    so nothing already shown is rendered again. Returns the step records (see export_steps_jsonl).
+    """
+    from IPython.display import HTML, display
+    from agents import RunItemStreamEvent
+
+    display(HTML(steps_header_html(theme)))
+    records = []
+    async for event in result.stream_events():
+        if isinstance(event, RunItemStreamEvent):
+            record = step_record(len(records) + 1, event.item, max_chars)
+            records.append(record)
+            display(HTML(f'<div class="agent-steps">{step_html(record, collapse_chars)}</div>'))
+    return records
+
+
+def export_steps_jsonl(result_or_records, file: str | IO[str], max_chars: int | None = MAX_CHARS) -> int:
+    """
+    Writes one JSON line per step of a run result (or of records from display_streamed_execution_steps),
+    returns the number of steps written
+    """
+    if isinstance(result_or_records, list):
+        records = result_or_records
+    else:
+        records = (step_record(i + 1, item, max_chars) for i, item in enumerate(result_or_records.new_items))
+
+    if isinstance(file, str):
+        with open(file, "w", encoding="utf-8") as f:
+            return export_steps_jsonl(result_or_records, f, max_chars)
+
+    count = 0
+    for record in records:
+        file.write(json.dumps(record, separators=(",", ":"), default=str) + "\n")
+        count += 1
+    return count
@@ -1,11 +1,319 @@
-from agents.extensions.visualization import draw_graph
+import os
+import re
+from dataclasses import dataclass, field, asdict
+
+from agents import Agent
+from pydantic import TypeAdapter
+
+from helpers.agent_graph import agent_tools, graph_fingerprint, handoff_agents, tool_agent
+from helpers.history import estimate_tokens
+
+
+# filename -> fingerprint of the graph last drawn there by this process
+_drawn: dict[str, str] = {}
 
 
 def vis_agent(agent, visual_name="vis1") -> str:
+    # draw_graph needs graphviz, only import it when actually drawing
+    from agents.extensions.visualization import draw_graph
+
     filename = f"viz/{visual_name}.gv"
+    fingerprint = graph_fingerprint(agent)
+    if _drawn.get(filename) == fingerprint and os.path.exists(f"{filename}.png"):
+        return filename
     try:
         draw_graph(agent, filename=filename)
+        _drawn[filename] = fingerprint
     except Exception as e:
         print(f"An error occurred: {e}")
 
     return filename
+
+
+# static prompt above this many tokens per call is flagged
+LARGE_PROMPT_TOKENS = 1500
+# embedded data blocks above this many tokens are flagged
+DATA_BLOCK_TOKENS = 200
+WORST_CASE_CALLS = 100
+
+
+@dataclass
+class AgentCost:
+    """
+    Static estimate for one agent, sub agents and handoff targets included.
+
+    prompt_tokens is what every call of this agent sends before any conversation:
+    instructions, tool and handoff schemas and the output schema.
+    """
+    name: str
+    instruction_tokens: int | None
+    tool_schema_tokens: int
+    output_schema_tokens: int
+    prompt_tokens: int
+    own_calls: int
+    expected_calls: float
+    worst_case_calls: int
+    critical_path: int
+    expected_prompt_tokens: float
+    flags: list[str] = field(default_factory=list)
+
+
+@dataclass
+class GraphCost:
+    root: str
+    fingerprint: str
+    max_turns: int
+    agents: dict[str, AgentCost]
+    flags: list[str]
+
+    @property
+    def expected_calls(self) -> float:
+        return self.agents[self.root].expected_calls
+
+    @property
+    def worst_case_calls(self) -> int:
+        return self.agents[self.root].worst_case_calls
+
+    @property
+    def critical_path(self) -> int:
+        return self.agents[self.root].critical_path
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def _schema_tokens(output_type) -> int:
+    if output_type is None or output_type is str:
+        return 0
+    try:
+        return estimate_tokens(TypeAdapter(output_type).json_schema())
+    except Exception:
+        return 0
+
+
+def _tool_tokens(agent: Agent) -> int:
+    tools = [
+        {"name": tool.name, "description": getattr(tool, "description", ""),
+         "parameters": getattr(tool, "params_json_schema", None)}
+        for tool in agent.tools
+    ]
+    handoffs = [{"name": f"transfer_to_{target.name}", "description": target.handoff_description or ""}
+                for target in handoff_agents(agent)]
+    return estimate_tokens(tools + handoffs) if tools or handoffs else 0
+
+
+def _data_block(text: str, min_lines: int = 5) -> tuple[int, int]:
+    """
+    (lines, tokens) of the longest run of lines that are mostly not letters: tables, reports, JSON
+    """
+    best = (0, 0)
+    run: list[str] = []
+    for line in text.splitlines() + [""]:
+        stripped = line.strip()
+        letters = len(re.findall(r"[A-Za-z]", stripped))
+        if stripped and letters < 0.6 * len(stripped):
+            run.append(line)
+            continue
+        if len(run) >= min_lines and len(run) > best[0]:
+            best = (len(run), estimate_tokens("\n".join(run)))
+        run = []
+    return best
+
+
+def _handoff_closure(agent: Agent) -> list[Agent]:
+    seen = {id(agent)}
+    order = [agent]
+    for current in order:
+        for target in handoff_agents(current):
+            if id(target) not in seen:
+                seen.add(id(target))
+                order.append(target)
+    return order
+
+
+def analyze_agent_graph(
+        agent: Agent,
+        max_turns: int = 10,
+        large_prompt_tokens: int = LARGE_PROMPT_TOKENS,
+        data_block_tokens: int = DATA_BLOCK_TOKENS) -> GraphCost:
+    """
+    Walks agents, as_tool sub agents, handoffs and tools without running anything.
+
+    Expected calls assume every tool is called once, one tool round per agent,
+    and a handoff to each target equally likely. The critical path counts sequential
+    calls when tool calls of one turn run in parallel. The worst case lets every run
+    use max_turns turns, each calling every sub agent. Prompt tokens only count the
+    static part of each call, the conversation grows on top of it.
+    """
+    costs: dict[int, AgentCost] = {}
+    in_progress: set[int] = set()
+    flags: list[str] = []
+
+    def visit(current: Agent) -> AgentCost:
+        if id(current) in costs:
+            return costs[id(current)]
+        if id(current) in in_progress:
+            flags.append(f"{current.name}: handoff or tool cycle, only max_turns bounds it")
+            return AgentCost(current.name, 0, 0, 0, 0, 0, 0, 0, 0, 0)
+        in_progress.add(id(current))
+
+        agent_flags = []
+        if isinstance(current.instructions, str):
+            instruction_tokens = estimate_tokens(current.instructions)
+            lines, block_tokens = _data_block(current.instructions)
+            if block_tokens >= data_block_tokens:
+                agent_flags.append(
+                    f"{current.name}: instructions embed a {lines} line data block (~{block_tokens} tokens) "
+                    "sent with every call"
+                )
+        else:
+            instruction_tokens = None
+            agent_flags.append(f"{current.name}: dynamic instructions, not counted")
+        tool_tokens = _tool_tokens(current)
+        output_tokens = _schema_tokens(current.output_type)
+        prompt_tokens = (instruction_tokens or 0) + tool_tokens + output_tokens
+        if prompt_tokens > large_prompt_tokens:
+            agent_flags.append(f"{current.name}: ~{prompt_tokens} static prompt tokens per call")
+
+        subs = [visit(sub) for _, sub in agent_tools(current)]
+        targets = [visit(target) for target in handoff_agents(current)]
+        own_calls = (1 if current.tools else 0) + 1
+
+        def mean(values: list[float]) -> float:
+            return sum(values) / len(values) if values else 0
+
+        turn_cost = max(
+            1 + sum(visit(sub).worst_case_calls for _, sub in agent_tools(member))
+            for member in _handoff_closure(current)
+        )
+        cost = AgentCost(
+            name=current.name,
+            instruction_tokens=instruction_tokens,
+            tool_schema_tokens=tool_tokens,
+            output_schema_tokens=output_tokens,
+            prompt_tokens=prompt_tokens,
+            own_calls=own_calls,
+            expected_calls=own_calls + sum(s.expected_calls for s in subs) + mean([t.expected_calls for t in targets]),
+            worst_case_calls=max_turns * turn_cost,
+            critical_path=own_calls + max((s.critical_path for s in subs), default=0)
+            + max((t.critical_path for t in targets), default=0),
+            expected_prompt_tokens=own_calls * prompt_tokens + sum(s.expected_prompt_tokens for s in subs)
+            + mean([t.expected_prompt_tokens for t in targets]),
+            flags=agent_flags,
+        )
+        in_progress.discard(id(current))
+        costs[id(current)] = cost
+        flags.extend(agent_flags)
+        return cost
+
+    root = visit(agent)
+    if root.worst_case_calls > WORST_CASE_CALLS:
+        flags.append(f"{agent.name}: worst case {root.worst_case_calls} LLM calls per run")
+    return GraphCost(
+        root=agent.name,
+        fingerprint=graph_fingerprint(agent),
+        max_turns=max_turns,
+        agents={cost.name: cost for cost in costs.values()},
+        flags=flags,
+    )
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def cost_graph_dot(agent: Agent, analysis: GraphCost) -> str:
+    """
+    DOT source of the agent graph, agents annotated with their estimates, flagged agents in red
+    """
+    lines = [
+        f"// graph {analysis.fingerprint} max_turns {analysis.max_turns}",
+        "digraph G {",
+        '    graph [splines=true, label="{}", labelloc=t];'.format(_escape(
+            f"expected {analysis.expected_calls:g} LLM calls, critical path {analysis.critical_path}, "
+            f"worst case {analysis.worst_case_calls}"
+        )),
+        '    node [fontname="Arial"];',
+        '    "__start__" [shape=ellipse, style=filled, fillcolor=lightblue];',
+        f'    "__start__" -> "{_escape(agent.name)}";',
+    ]
+    seen: set[int] = set()
+    pending = [agent]
+    while pending:
+        current = pending.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        cost = analysis.agents[current.name]
+        label = (
+            f"{current.name}\n~{cost.prompt_tokens} prompt tokens/call\n"
+            f"calls {cost.expected_calls:g} (worst {cost.worst_case_calls}), path {cost.critical_path}"
+        )
+        color = "lightpink" if cost.flags else "lightyellow"
+        lines.append(f'    "{_escape(current.name)}" [label="{_escape(label)}", shape=box, style=filled, fillcolor={color}];')
+        for tool in current.tools:
+            sub_agent = tool_agent(tool)
+            if sub_agent is not None:
+                lines.append(f'    "{_escape(current.name)}" -> "{_escape(sub_agent.name)}" [style=dashed, label="{_escape(tool.name)}"];')
+                pending.append(sub_agent)
+            else:
+                tool_id = f"{current.name}.{tool.name}"
+                lines.append(f'    "{_escape(tool_id)}" [label="{_escape(tool.name)}", shape=ellipse, style=filled, fillcolor=lightgreen];')
+                lines.append(f'    "{_escape(current.name)}" -> "{_escape(tool_id)}" [style=dotted, dir=both];')
+        for target in handoff_agents(current):
+            lines.append(f'    "{_escape(current.name)}" -> "{_escape(target.name)}";')
+            pending.append(target)
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def vis_agent_costs(agent: Agent, visual_name="vis1", max_turns: int = 10, render_format: str | None = "svg") -> str:
+    """
+    Writes the cost annotated graph to viz/<visual_name>.gv (rendered to render_format when
+    graphviz is installed) and prints the flags. Unchanged graphs are not redrawn: the
+    file starts with the graph fingerprint, which is compared before drawing.
+    """
+    filename = f"viz/{visual_name}.gv"
+    analysis = analyze_agent_graph(agent, max_turns)
+    header = f"// graph {analysis.fingerprint} max_turns {max_turns}"
+    for flag in analysis.flags:
+        print(f"[cost] {flag}")
+
+    unchanged = False
+    if os.path.exists(filename):
+        with open(filename, encoding="utf-8") as f:
+            unchanged = f.readline().rstrip("\n") == header
+    rendered = f"{filename}.{render_format}"
+    if unchanged and (not render_format or os.path.exists(rendered)):
+        return filename
+
+    dot = cost_graph_dot(agent, analysis)
+    if not unchanged:
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write(dot)
+    if render_format:
+        try:
+            import graphviz
+            graphviz.Source(dot).render(outfile=rendered, format=render_format)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+    return filename
+
+
+def format_graph_cost(analysis: GraphCost) -> str:
+    """
+    One line per agent, for printing in a notebook or a CI log
+    """
+    lines = [
+        f"{analysis.root}: expected {analysis.expected_calls:g} LLM calls, "
+        f"critical path {analysis.critical_path}, worst case {analysis.worst_case_calls} (max_turns {analysis.max_turns})"
+    ]
+    for cost in analysis.agents.values():
+        lines.append(
+            f"  {cost.name}: ~{cost.prompt_tokens} prompt tokens/call "
+            f"(instructions {cost.instruction_tokens}, tools {cost.tool_schema_tokens}, output {cost.output_schema_tokens}), "
+            f"{cost.expected_calls:g} calls, ~{cost.expected_prompt_tokens:,.0f} prompt tokens expected"
+        )
+    lines.extend(f"  ! {flag}" for flag in analysis.flags)
+    return "\n".join(lines)
@@ -1,66 +1,52 @@
-from pydantic import BaseModel, Field
-from agents import function_tool
-import requests
-
-import random
-
-from dotenv import load_dotenv
-from agents import (
-
-    Agent,
-    Runner,
-    RunConfig,
-    trace,
-    ModelSettings,
-    handoff
+import functools
+import importlib
+import logging
+from typing import TYPE_CHECKING, Any
+
+from helpers.wttn_models import (
+    WttnReport,
+    WttnPeriodReport,
+    WttnFullReport,
 )
-load_dotenv()
 
+if TYPE_CHECKING:
+    from agents import Agent, FunctionTool
 
-from helpers.trace_util import get_trace_url
-
-from helpers.model_client import (
-    get_openai_client,
-    get_github_model_provider
-)
 
+logger = logging.getLogger(__name__)
 
 
-@function_tool
-def get_wttn_function(city: str) -> str:
-    """Get the weather for a given city"""
-    print(f"[debug] get_wttn called with city: {city}")
-    endpoint = "https://wttr.in"
-    response = requests.get(f"{endpoint}/{city}")
-    return response.text
+# The agents SDK, which is most of the import time, .env and the model and tracing
+# helpers are only loaded when a graph is first built, so importing this module stays
+# cheap. The names this module used to import are still available as attributes.
+_LAZY_ATTRIBUTES = {
+    "get_trace_url": "helpers.trace_util",
+    "get_openai_client": "helpers.model_client",
+    "get_github_model_provider": "helpers.model_client",
+    **{
+        name: "agents"
+        for name in ("Agent", "Runner", "RunConfig", "trace", "ModelSettings", "handoff",
+                     "function_tool", "FunctionTool", "RunContextWrapper")
+    },
+}
 
 
-class WttnReport(BaseModel):
-    city: str = Field(..., description="The name of the city")
-    temperature: str = Field(..., description="The temperature in the city")
-    feels_like: str = Field(..., description="The feels like temperature in the city")
-    conditions: str = Field(..., description="The weather conditions in the city")
-    wind_speed: str = Field(..., description="The wind speed in the city")
-    wind_direction: str = Field(..., description="The wind direction in the city")
-    precepitation: str = Field(..., description="The precepitation in the city")
-    humidity: str = Field(..., description="The humidity in the city")
-    location_logLat: str = Field(..., description="The latitude of the city")
-    location_logLong: str = Field(..., description="The longitude of the city")
-
+async def get_wttn(city: str) -> str:
+    """Get the weather for a given city"""
+    from helpers.wttn_client import get_wttn_report
 
-class WttnPeriodReport(BaseModel):
-    weekday: str = Field(..., description="The name of the week day")
-    periodofday: str = Field(..., description="The period of the day for example Morning, Noon, Evening and Night")
-    periodforecast: WttnReport = Field(..., description="The weather report for the period of the day")
+    logger.debug("get_wttn city=%s", city)
+    return await get_wttn_report(city)
 
 
-class WttnFullReport(BaseModel):
-    weather_now: WttnReport = Field(..., description="The current weather report")
-    weather_forecast_day1: list[WttnPeriodReport] = Field(..., description="The weather forecast for the first day in the report")
-    weather_forecast_day2: list[WttnPeriodReport] = Field(..., description="The weather forecast for the second day in the report")
-    weather_forecast_day3: list[WttnPeriodReport] = Field(..., description="The weather forecast for the third day in the repor")
-    weather_wttn_raw_response: str = Field(..., description="The raw response from the wttr.in API")
+@functools.cache
+def get_wttn_function_tool() -> "FunctionTool":
+    """
+    The get_wttn_function tool, created on first use
+    """
+    from agents import function_tool
 
+    return function_tool(get_wttn, name_override="get_wttn_function")
 
 
 def sample_wttn_response():
@@ -135,37 +121,15 @@ def get_attn_report_output() -> str:
 
 
 
-def get_attn_agent(agent_name="weather_and_location_agent") -> Agent:
-    """
-    Get the agent for the given agent name.
-    """
-    # Create the agent with the specified tools and model settings
-
-    summariser_agent = Agent(
-        name="whether_report_summariser_agent",
-        model="o3-mini",
-        tools=[],
-        model_settings=ModelSettings(**{"max_tokens": 16000}),
-        output_type=str,
-        instructions=f"""
+WEATHER_SUMMARISER_INSTRUCTIONS = """
         you can read a detailed structured weather report, and then write a weather report summary for the user.
         the summary can be ready by a human and should be easy to understand.
         the report should include information about the weather conditions now,
         summary of changes in the weather over the next three days,
         with special attention to any extreme changes during the day or over the next few days
-        """,
-        handoff_description = "You are writing a weather report summary for the user from structured and detailed weather report data",
-
-        )
-
+        """
 
-    weather_data_collector = Agent(
-        name="weather_data_collector",
-        tools=[get_wttn_function],
-        handoffs=[],
-        model_settings=ModelSettings(**{"max_tokens": 16000}),
-        output_type=WttnFullReport,
-        instructions=f"""
+WEATHER_DATA_COLLECTOR_INSTRUCTIONS = f"""
         You are a weather and location agent. You can answer questions about the weather and locations.
         You can also provide a weather report for a given city.
         You can also provide a weather forecast for the next 3 days for a given city.
@@ -182,27 +146,157 @@ def get_attn_agent(agent_name="weather_and_location_agent") -> Agent:
         and you will return a structured weather report and raw response from the API
 
         """
+
+WEATHER_AGENT_INSTRUCTIONS = """
+        You are a weather and location agent.
+        You can answer questions about the weather and locations.
+        You orchestrate the process of data collection and writing the weather report summary.
+        write your report in Mardown format.
+        Your report should be detailed and comprehensive
+        """
+
+
+def get_weather_summariser_agent() -> "Agent":
+    from agents import Agent, ModelSettings
+
+    return Agent(
+        name="whether_report_summariser_agent",
+        model="o3-mini",
+        tools=[],
+        model_settings=ModelSettings(**{"max_tokens": 16000}),
+        output_type=str,
+        instructions=WEATHER_SUMMARISER_INSTRUCTIONS,
+        handoff_description = "You are writing a weather report summary for the user from structured and detailed weather report data",
+
+        )
+
+
+def get_weather_data_collector_agent() -> "Agent":
+    from agents import Agent, ModelSettings
+
+    return Agent(
+        name="weather_data_collector",
+        tools=[get_wttn_function_tool()],
+        handoffs=[],
+        model_settings=ModelSettings(**{"max_tokens": 16000}),
+        output_type=WttnFullReport,
+        instructions=WEATHER_DATA_COLLECTOR_INSTRUCTIONS,
     )
 
 
+def get_parsed_weather_collector_tool(fallback_agent: "Agent", findings: bool = False) -> "FunctionTool":
+    """
+    weather_data_collector tool that parses the wttr.in report without a model call,
+    the fallback agent only runs when the report cannot be parsed.
+
+    With findings the tool returns the compact wttn_analytics summary (daily ranges
+    and precomputed extreme changes) instead of the full report JSON.
+    """
+    from agents import RunContextWrapper, Runner, function_tool
+    from helpers.wttn_client import get_wttn_report
+    from helpers.wttn_parser import WttnParseError, parse_wttn_records, records_to_report
+    from helpers.run_metrics import NESTED_RUN_HOOKS
+
+    if findings:
+        from helpers.wttn_analytics import ForecastColumns, findings_summary
+
+    @function_tool(
+        name_override="weather_data_collector",
+        description_override="you collect data about weather from different data sources for a given city or location",
+    )
+    async def collect_weather_report(ctx: RunContextWrapper[Any], city: str) -> str:
+        raw_report = await get_wttn_report(city)
+        try:
+            records = parse_wttn_records(raw_report)
+            if findings:
+                return findings_summary(ForecastColumns.from_records([records]))
+            report = records_to_report(records)
+        except WttnParseError as e:
+            logger.info("wttn report for %s not parsed (%s), falling back to %s", city, e, fallback_agent.name)
+            result = await Runner.run(
+                fallback_agent,
+                input=f"get the weather report for {city}",
+                context=ctx.context,
+                # newer SDKs expose the parent run config on the tool context
+                run_config=getattr(ctx, "run_config", None),
+                hooks=NESTED_RUN_HOOKS,
+            )
+            report = result.final_output
+            if findings:
+                return findings_summary(ForecastColumns.from_reports([report]))
+        return report.model_dump_json()
+
+    return collect_weather_report
+
+
+_attn_agents: dict[tuple, "Agent"] = {}
+
+
+def get_attn_agent(agent_name="weather_and_location_agent", collector_mode="llm", collector_on_stream=None) -> "Agent":
+    """
+    Get the agent for the given agent name.
+
+    collector_mode "llm" extracts the report with the weather_data_collector agent,
+    "parser" uses the wttn_parser and only calls the collector agent if parsing fails,
+    "findings" parses the same way but gives the summariser precomputed findings instead of the full report.
+    collector_on_stream receives the streamed events of the nested collector run (llm mode).
+
+    The graph is built once per configuration and shared, agents hold no per-run
+    state. Use agent.clone(...) rather than changing a returned graph in place.
+    With collector_on_stream, often a per-request callback, a new graph is built
+    on every call and not kept.
+    """
+    if collector_on_stream is not None:
+        return _build_attn_agent(collector_mode, collector_on_stream)
+    key = (agent_name, collector_mode)
+    weather_agent = _attn_agents.get(key)
+    if weather_agent is None:
+        weather_agent = _attn_agents[key] = _build_attn_agent(collector_mode, None)
+    return weather_agent
+
+
+def _build_attn_agent(collector_mode: str, collector_on_stream) -> "Agent":
+    from agents import Agent, ModelSettings
+    from helpers.run_metrics import NESTED_RUN_HOOKS
+
+    # Create the agent with the specified tools and model settings
+
+    summariser_agent = get_weather_summariser_agent()
+
+    weather_data_collector = get_weather_data_collector_agent()
+
+    if collector_mode in ("parser", "findings"):
+        collector_tool = get_parsed_weather_collector_tool(
+            weather_data_collector, findings=collector_mode == "findings"
+        )
+    elif collector_mode == "llm":
+        collector_tool = weather_data_collector.as_tool(
+            tool_name = "weather_data_collector",
+            tool_description = "you collect data about weather from different data sources for a given city or location",
+            on_stream = collector_on_stream,
+            hooks = NESTED_RUN_HOOKS,
+        )
+    else:
+        raise ValueError(f"unknown collector_mode: {collector_mode}")
+
+
     weather_agent = Agent(
         name="weather_agent",
-        tools=[weather_data_collector.as_tool(
-            tool_name = "weather_data_collector",
-            tool_description = "you collect data about weather from different data sources for a given city or location"
-        )],
+        tools=[collector_tool],
         handoffs=[summariser_agent],
         model_settings=ModelSettings(**{"max_tokens": 16000}),
         output_type=str,
-        instructions=f"""
-        You are a weather and location agent.
-        You can answer questions about the weather and locations.
-        You orchestrate the process of data collection and writing the weather report summary.
-        write your report in Mardown format.
-        Your report should be detailed and comprehensive
-        """,
+        instructions=WEATHER_AGENT_INSTRUCTIONS,
         tool_use_behavior="run_llm_again"
     )
 
     return weather_agent
 
+
+def __getattr__(name: str):
+    if name == "get_wttn_function":
+        return get_wttn_function_tool()
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module), name)
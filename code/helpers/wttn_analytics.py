@@ -0,0 +1,318 @@
+import contextlib
+import re
+import warnings
+from dataclasses import dataclass
+from typing import Iterable
+
+import numpy as np
+
+from helpers.wttn_models import WttnFullReport, WttnReport
+from helpers.wttn_parser import PERIODS_OF_DAY
+
+
+DAYS = 3
+PERIODS = len(PERIODS_OF_DAY)
+
+_NUMBER_RE = re.compile(r"[-+]?\d+(?:\.\d+)?")
+# wind ranges like 18-21 km/h, the dash is not a sign
+_UNSIGNED_RE = re.compile(r"\d+(?:\.\d+)?")
+_TO_KMH = {"km/h": 1.0, "mph": 1.609344, "m/s": 3.6}
+_TO_MM = {"mm": 1.0, "in": 25.4}
+
+
+def _temperature(text: str) -> float:
+    match = _NUMBER_RE.search(text or "")
+    if match is None:
+        return np.nan
+    value = float(match.group())
+    return (value - 32) * 5 / 9 if "F" in text else value
+
+
+def _wind(text: str) -> tuple[float, float]:
+    numbers = [float(n) for n in _UNSIGNED_RE.findall(text or "")]
+    if not numbers:
+        return np.nan, np.nan
+    factor = next((f for unit, f in _TO_KMH.items() if unit in text), 1.0)
+    return numbers[0] * factor, numbers[-1] * factor
+
+
+def _precipitation(text: str) -> float:
+    match = _UNSIGNED_RE.search(text or "")
+    if match is None:
+        return np.nan
+    return float(match.group()) * (_TO_MM["in"] if text.rstrip().endswith("in") else 1.0)
+
+
+def _percent(text: str) -> float:
+    match = _UNSIGNED_RE.search(text or "")
+    return float(match.group()) if match else np.nan
+
+
+def _values(conditions: dict) -> tuple[float, ...]:
+    low, high = _wind(conditions["wind_speed"])
+    return (
+        _temperature(conditions["temperature"]),
+        _temperature(conditions["feels_like"]),
+        low,
+        high,
+        _precipitation(conditions["precepitation"]),
+        # only parser records carry the chance of rain
+        _percent(conditions.get("rain_chance", "")),
+    )
+
+
+_METRICS = ("temperature", "feels_like", "wind_low", "wind_high", "precipitation", "rain_chance")
+
+
+@dataclass
+class ForecastColumns:
+    """
+    Columnar view of many reports: one float32 array per metric, shaped city x day x period.
+
+    Temperatures are in °C, wind in km/h, precipitation in mm and the chance of rain in %,
+    whatever units the reports used. Missing values are NaN. The *_now arrays hold
+    the current weather, one value per city.
+    """
+    cities: list[str]
+    weekdays: np.ndarray
+    temperature: np.ndarray
+    feels_like: np.ndarray
+    wind_low: np.ndarray
+    wind_high: np.ndarray
+    precipitation: np.ndarray
+    rain_chance: np.ndarray
+    temperature_now: np.ndarray
+    feels_like_now: np.ndarray
+    wind_low_now: np.ndarray
+    wind_high_now: np.ndarray
+    precipitation_now: np.ndarray
+    rain_chance_now: np.ndarray
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict]) -> "ForecastColumns":
+        """
+        Builds the columns from wttn_parser records (parse_wttn_records), without creating pydantic objects
+        """
+        cities, weekdays, rows, now_rows = [], [], [], []
+        for record in records:
+            cities.append(record["city"])
+            days = record["days"][:DAYS]
+            weekdays.append([day["weekday"] for day in days])
+            for day in days:
+                forecast = dict(zip(day["periods"], day["forecast"]))
+                # periods missing from a day stay NaN
+                rows.extend(_values(forecast[p]) if p in forecast else (np.nan,) * len(_METRICS) for p in PERIODS_OF_DAY)
+            now_rows.append(_values(record["now"]))
+
+        shape = (len(cities), DAYS, PERIODS)
+        table = np.array(rows, dtype=np.float32).reshape(*shape, len(_METRICS)) if rows else np.empty((*shape, len(_METRICS)), np.float32)
+        now = np.array(now_rows, dtype=np.float32).reshape(len(cities), len(_METRICS))
+        columns = {name: np.ascontiguousarray(table[..., i]) for i, name in enumerate(_METRICS)}
+        columns.update({f"{name}_now": now[:, i].copy() for i, name in enumerate(_METRICS)})
+        return cls(cities=cities, weekdays=np.array(weekdays, dtype=str).reshape(len(cities), DAYS), **columns)
+
+    @classmethod
+    def from_reports(cls, reports: Iterable[WttnFullReport]) -> "ForecastColumns":
+        return cls.from_records(_report_record(report) for report in reports)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes + getattr(self, f"{name}_now").nbytes for name in _METRICS)
+
+
+def _conditions(report: WttnReport) -> dict:
+    # the report's humidity is not the chance of rain, rain_chance stays NaN for reports
+    return report.model_dump(include={"temperature", "feels_like", "wind_speed", "precepitation"})
+
+
+def _report_record(report: WttnFullReport) -> dict:
+    days = [report.weather_forecast_day1, report.weather_forecast_day2, report.weather_forecast_day3]
+    return {
+        "city": report.weather_now.city,
+        "now": _conditions(report.weather_now),
+        "days": [
+            {
+                "weekday": periods[0].weekday if periods else "",
+                "periods": [p.periodofday for p in periods],
+                "forecast": [_conditions(p.periodforecast) for p in periods],
+            }
+            for periods in days
+        ],
+    }
+
+
+@dataclass
+class Finding:
+    city: str
+    city_index: int
+    kind: str
+    day: int
+    period: int | None
+    value: float
+    detail: str
+
+    def text(self) -> str:
+        return f"{self.city}: {self.detail}"
+
+
+def _where(mask: np.ndarray) -> Iterable[tuple[int, ...]]:
+    return zip(*(axis.tolist() for axis in np.nonzero(mask)))
+
+
+@contextlib.contextmanager
+def _quiet_nan():
+    # all-NaN slices (missing data) just produce no finding
+    with warnings.catch_warnings(), np.errstate(invalid="ignore"):
+        warnings.simplefilter("ignore", RuntimeWarning)
+        yield
+
+
+def temperature_swings(columns: ForecastColumns, within_day: float = 8.0, day_to_day: float = 5.0) -> list[Finding]:
+    """
+    Days whose temperature range across periods is at least within_day °C, and
+    daily mean changes of at least day_to_day °C from the previous day
+    """
+    findings = []
+    with _quiet_nan():
+        high = np.nanmax(columns.temperature, axis=2)
+        low = np.nanmin(columns.temperature, axis=2)
+        swing = high - low
+        for city, day in _where(swing >= within_day):
+            hot = int(np.nanargmax(columns.temperature[city, day]))
+            cold = int(np.nanargmin(columns.temperature[city, day]))
+            findings.append(Finding(
+                columns.cities[city], city, "temperature_swing", day, None, float(swing[city, day]),
+                f"{columns.weekdays[city, day]} swings {swing[city, day]:.0f} °C, "
+                f"{low[city, day]:.0f} °C ({PERIODS_OF_DAY[cold]}) to {high[city, day]:.0f} °C ({PERIODS_OF_DAY[hot]})",
+            ))
+
+        mean = np.nanmean(columns.temperature, axis=2)
+        change = np.diff(mean, axis=1)
+        for city, step in _where(np.abs(change) >= day_to_day):
+            day = step + 1
+            direction = "warmer" if change[city, step] > 0 else "colder"
+            findings.append(Finding(
+                columns.cities[city], city, "temperature_change", day, None, float(change[city, step]),
+                f"{columns.weekdays[city, day]} is {abs(change[city, step]):.0f} °C {direction} on average than {columns.weekdays[city, step]}",
+            ))
+    return findings
+
+
+def wind_spikes(columns: ForecastColumns, above_median: float = 15.0, strong: float = 50.0) -> list[Finding]:
+    """
+    Periods whose top wind speed is at least above_median km/h over the city's median, or at least strong km/h
+    """
+    findings = []
+    with _quiet_nan():
+        flat = columns.wind_high.reshape(len(columns.cities), -1)
+        median = np.nanmedian(flat, axis=1)[:, None, None]
+        spikes = (columns.wind_high - median >= above_median) | (columns.wind_high >= strong)
+    for city, day, period in _where(spikes):
+        speed = columns.wind_high[city, day, period]
+        findings.append(Finding(
+            columns.cities[city], city, "wind_spike", day, period, float(speed),
+            f"{columns.weekdays[city, day]} {PERIODS_OF_DAY[period]} wind up to {speed:.0f} km/h "
+            f"(usually {float(median[city, 0, 0]):.0f} km/h)",
+        ))
+    return findings
+
+
+def precipitation_onset(columns: ForecastColumns, min_mm: float = 0.1, min_chance: float = 50.0) -> list[Finding]:
+    """
+    First period of each city where it turns wet after being dry, now included as the starting point.
+
+    A period is wet with at least min_mm of rain or, in parsed reports, at least min_chance % chance of rain
+    """
+    with _quiet_nan():
+        wet = (np.nan_to_num(columns.precipitation) >= min_mm) | (np.nan_to_num(columns.rain_chance) >= min_chance)
+        wet_now = np.nan_to_num(columns.precipitation_now) >= min_mm
+    steps = wet.reshape(len(columns.cities), -1)
+    previous = np.concatenate([wet_now[:, None], steps[:, :-1]], axis=1)
+    onset = steps & ~previous
+    has_onset = onset.any(axis=1)
+    first = onset.argmax(axis=1)
+
+    findings = []
+    for city in np.nonzero(has_onset)[0].tolist():
+        day, period = divmod(int(first[city]), PERIODS)
+        amount = columns.precipitation[city, day, period]
+        chance = columns.rain_chance[city, day, period]
+        detail = f"{amount:.1f} mm" if np.isnan(chance) else f"{amount:.1f} mm, {chance:.0f}% chance"
+        findings.append(Finding(
+            columns.cities[city], city, "precipitation_onset", day, period, float(amount),
+            f"rain starts {columns.weekdays[city, day]} {PERIODS_OF_DAY[period]} ({detail})",
+        ))
+    return findings
+
+
+def detect_findings(columns: ForecastColumns) -> list[Finding]:
+    """
+    Every detector with its default thresholds, ordered by city, day and period
+    """
+    findings = temperature_swings(columns) + wind_spikes(columns) + precipitation_onset(columns)
+    findings.sort(key=lambda f: (f.city_index, f.day, -1 if f.period is None else f.period))
+    return findings
+
+
+def aggregate_cities(columns: ForecastColumns, findings: list[Finding] | None = None) -> dict:
+    """
+    Cross-city view per forecast day: temperature spread, hottest, coldest and windiest city, finding counts
+    """
+    if not columns.cities:
+        return {"days": [], "findings": {}}
+    with _quiet_nan():
+        high = np.nanmax(columns.temperature, axis=2)
+        low = np.nanmin(columns.temperature, axis=2)
+        wind = np.nanmax(columns.wind_high, axis=2)
+        rain = np.nansum(columns.precipitation, axis=2)
+        days = []
+        for day in range(DAYS):
+            days.append({
+                "day": day + 1,
+                "mean_high_c": float(np.nanmean(high[:, day])),
+                "mean_low_c": float(np.nanmean(low[:, day])),
+                "hottest": columns.cities[int(np.nanargmax(np.nan_to_num(high[:, day], nan=-np.inf)))],
+                "coldest": columns.cities[int(np.nanargmin(np.nan_to_num(low[:, day], nan=np.inf)))],
+                "windiest": columns.cities[int(np.nanargmax(np.nan_to_num(wind[:, day], nan=-np.inf)))],
+                "wet_cities": int((rain[:, day] > 0).sum()),
+            })
+    counts: dict[str, int] = {}
+    for finding in findings if findings is not None else detect_findings(columns):
+        counts[finding.kind] = counts.get(finding.kind, 0) + 1
+    return {"cities": len(columns.cities), "days": days, "findings": counts}
+
+
+def findings_summary(columns: ForecastColumns, findings: list[Finding] | None = None) -> str:
+    """
+    Compact text for the summariser: current weather, one line per day and the findings,
+    in place of the full structured report
+    """
+    findings = findings if findings is not None else detect_findings(columns)
+    # grouped by row, not name: a batch may hold the same city twice
+    by_city: dict[int, list[Finding]] = {}
+    for finding in findings:
+        by_city.setdefault(finding.city_index, []).append(finding)
+    lines = []
+    with _quiet_nan():
+        for city_index, city in enumerate(columns.cities):
+            lines.append(
+                f"{city} now: {columns.temperature_now[city_index]:.0f} °C "
+                f"(feels like {columns.feels_like_now[city_index]:.0f} °C), "
+                f"wind {columns.wind_high_now[city_index]:.0f} km/h, "
+                f"{np.nan_to_num(columns.precipitation_now[city_index]):.1f} mm"
+            )
+            for day in range(DAYS):
+                lines.append(
+                    f"  {columns.weekdays[city_index, day]}: "
+                    f"{np.nanmin(columns.temperature[city_index, day]):.0f} to "
+                    f"{np.nanmax(columns.temperature[city_index, day]):.0f} °C, "
+                    f"wind up to {np.nanmax(columns.wind_high[city_index, day]):.0f} km/h, "
+                    f"{np.nansum(columns.precipitation[city_index, day]):.1f} mm"
+                )
+            city_findings = by_city.get(city_index)
+            if city_findings:
+                lines.append("  notable changes:")
+                lines.extend(f"  - {f.detail}" for f in city_findings)
+            else:
+                lines.append("  notable changes: none, conditions stay steady")
+    return "\n".join(lines)
@@ -0,0 +1,174 @@
+import asyncio
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+from urllib.parse import quote
+
+from helpers.cache_util import SingleFlight, TTLCache
+from helpers.env import load_env
+from helpers.http_client import fetch_text
+
+
+WTTN_ENDPOINT = os.environ.get("WTTN_ENDPOINT", "https://wttr.in")
+WTTN_CACHE_TTL = float(os.environ.get("WTTN_CACHE_TTL", 600))
+WTTN_CACHE_MAXSIZE = 1024
+
+async def fetch_wttn_report(city: str, endpoint: str | None = None) -> str:
+    """
+    Returns the raw wttr.in report for the city, without blocking the event loop
+    """
+    endpoint = (endpoint or WTTN_ENDPOINT).rstrip("/")
+    return await fetch_text(f"{endpoint}/{quote(city.strip())}")
+
+
+def normalize_location(city: str) -> str:
+    """
+    Cache key of a location: "London", " london" and "LONDON" share a key. Only case and
+    whitespace are normalised, "Birmingham, UK" and "Birmingham, US" are different places
+    """
+    text = " ".join(unicodedata.normalize("NFKC", city).casefold().split())
+    return re.sub(r"\s*,\s*", ", ", text)
+
+
+class WttnDiskStore:
+    """
+    SQLite table of raw reports so cached entries survive a restart
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS wttn_reports ("
+            "location TEXT PRIMARY KEY, report TEXT NOT NULL, fetched_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, location: str, ttl: float) -> tuple[str, float] | None:
+        """
+        Returns (report, remaining ttl) or None when missing or expired
+        """
+        row = self._conn.execute(
+            "SELECT report, fetched_at FROM wttn_reports WHERE location = ?",
+            (location,),
+        ).fetchone()
+        if row is None:
+            return None
+        remaining = row[1] + ttl - time.time()
+        return (row[0], remaining) if remaining > 0 else None
+
+    def set(self, location: str, report: str) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO wttn_reports (location, report, fetched_at) VALUES (?, ?, ?)",
+            (location, report, time.time()),
+        )
+        self._conn.commit()
+
+    def purge(self, ttl: float) -> int:
+        cursor = self._conn.execute(
+            "DELETE FROM wttn_reports WHERE fetched_at < ?", (time.time() - ttl,)
+        )
+        self._conn.commit()
+        return cursor.rowcount
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class WttnReportCache:
+    """
+    TTL + LRU cache in front of wttr.in, concurrent misses for a location share one fetch
+    """
+
+    def __init__(
+            self,
+            ttl: float = WTTN_CACHE_TTL,
+            maxsize: int = WTTN_CACHE_MAXSIZE,
+            disk_path: str | None = None,
+            endpoint: str | None = None):
+        self.ttl = ttl
+        self.endpoint = endpoint
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.disk = WttnDiskStore(disk_path) if disk_path else None
+        self.disk_hits = 0
+        self.upstream_fetches = 0
+        self._single_flight = SingleFlight()
+
+    async def get_report(self, city: str) -> str:
+        location = normalize_location(city)
+        report = self.memory.get(location)
+        if report is not None:
+            return report
+        return await self._single_flight.do(location, lambda: self._load(location, city))
+
+    async def _load(self, location: str, city: str) -> str:
+        # location is the cache key, wttr.in gets the city as it was asked for
+        if self.disk is not None:
+            entry = await asyncio.to_thread(self.disk.get, location, self.ttl)
+            if entry is not None:
+                report, remaining = entry
+                self.disk_hits += 1
+                self.memory.set(location, report, ttl=remaining)
+                return report
+
+        self.upstream_fetches += 1
+        report = await fetch_wttn_report(city, endpoint=self.endpoint)
+        self.memory.set(location, report)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, location, report)
+        return report
+
+    def stats(self) -> dict:
+        stats = self.memory.stats.to_dict()
+        stats.update(
+            coalesced=self._single_flight.coalesced,
+            disk_hits=self.disk_hits,
+            upstream_fetches=self.upstream_fetches,
+            size=len(self.memory),
+        )
+        return stats
+
+
+_report_cache: WttnReportCache | None = None
+
+
+def configure_wttn_cache(**kwargs) -> WttnReportCache:
+    """
+    Replaces the process-wide report cache, kwargs go to WttnReportCache
+    """
+    global _report_cache
+    if _report_cache is not None and _report_cache.disk is not None:
+        _report_cache.disk.close()
+    _report_cache = WttnReportCache(**kwargs)
+    return _report_cache
+
+
+def set_wttn_cache(cache: WttnReportCache | None) -> WttnReportCache | None:
+    """
+    Swaps in cache as the process-wide report cache and returns the previous one, left open
+    so it can be put back (None means a default cache is built on next use)
+    """
+    global _report_cache
+    previous, _report_cache = _report_cache, cache
+    return previous
+
+
+def get_wttn_cache() -> WttnReportCache:
+    global _report_cache
+    if _report_cache is None:
+        # .env is read on first use, importing the helpers does not load it
+        load_env()
+        _report_cache = WttnReportCache(
+            disk_path=os.environ.get("WTTN_CACHE_PATH"),
+            endpoint=os.environ.get("WTTN_ENDPOINT"),
+        )
+    return _report_cache
+
+
+async def get_wttn_report(city: str) -> str:
+    """
+    Returns the wttr.in report for the city through the shared cache
+    """
+    return await get_wttn_cache().get_report(city)
@@ -0,0 +1,28 @@
+from pydantic import BaseModel, Field
+
+
+class WttnReport(BaseModel):
+    city: str = Field(..., description="The name of the city")
+    temperature: str = Field(..., description="The temperature in the city")
+    feels_like: str = Field(..., description="The feels like temperature in the city")
+    conditions: str = Field(..., description="The weather conditions in the city")
+    wind_speed: str = Field(..., description="The wind speed in the city")
+    wind_direction: str = Field(..., description="The wind direction in the city")
+    precepitation: str = Field(..., description="The precepitation in the city")
+    humidity: str = Field(..., description="The humidity in the city")
+    location_logLat: str = Field(..., description="The latitude of the city")
+    location_logLong: str = Field(..., description="The longitude of the city")
+
+
+class WttnPeriodReport(BaseModel):
+    weekday: str = Field(..., description="The name of the week day")
+    periodofday: str = Field(..., description="The period of the day for example Morning, Noon, Evening and Night")
+    periodforecast: WttnReport = Field(..., description="The weather report for the period of the day")
+
+
+class WttnFullReport(BaseModel):
+    weather_now: WttnReport = Field(..., description="The current weather report")
+    weather_forecast_day1: list[WttnPeriodReport] = Field(..., description="The weather forecast for the first day in the report")
+    weather_forecast_day2: list[WttnPeriodReport] = Field(..., description="The weather forecast for the second day in the report")
+    weather_forecast_day3: list[WttnPeriodReport] = Field(..., description="The weather forecast for the third day in the repor")
+    weather_wttn_raw_response: str = Field(..., description="The raw response from the wttr.in API")
@@ -0,0 +1,265 @@
+import re
+import statistics
+import time
+from typing import Iterable
+
+from helpers.wttn_models import WttnFullReport, WttnPeriodReport, WttnReport
+
+
+# the weather icon takes the first 15 columns of the report and of every table cell
+ICON_WIDTH = 15
+PERIODS_OF_DAY = ["Morning", "Noon", "Evening", "Night"]
+
+# same reading of the arrows as get_attn_report_output() in wttn_agent
+WIND_DIRECTIONS = {
+    "↑": "north",
+    "↗": "north east",
+    "→": "east",
+    "↘": "south east",
+    "↓": "south",
+    "↙": "south west",
+    "←": "west",
+    "↖": "north west",
+}
+
+ANSI_ESCAPE_RE = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+REPORT_HEADER_RE = re.compile(r"Weather report:\s*(?P<city>.+)")
+DAY_HEADER_RE = re.compile(r"┤\s*(?P<day>\w{3}\s+\d{1,2}\s+\w{3})\s*├")
+LOCATION_RE = re.compile(
+    r"Location:\s*(?P<name>.*?)\s*\[\s*(?P<lat>[-+]?\d+(?:\.\d+)?)\s*,\s*(?P<long>[-+]?\d+(?:\.\d+)?)\s*\]"
+)
+TEMPERATURE_RE = re.compile(
+    r"(?P<temp>[-+]?\d+)(?:\((?P<feels>[-+]?\d+)\))?(?:\.\.[-+]?\d+(?:\([-+]?\d+\))?)?\s*°(?P<unit>[CF])"
+)
+WIND_RE = re.compile(r"(?P<arrow>[←↑→↓↖↗↘↙])\s*(?P<speed>\d+(?:-\d+)?)\s*(?P<unit>km/h|mph|m/s)")
+PRECIPITATION_RE = re.compile(r"(?P<amount>\d+(?:\.\d+)?)\s*(?P<unit>mm|in)\b(?:\s*\|\s*(?P<chance>\d+)%)?")
+
+
+class WttnParseError(ValueError):
+    pass
+
+
+def _parse_conditions(lines: list[str]) -> dict:
+    """
+    Reads one weather block (current weather or one table cell) into a flat dict
+    """
+    texts = [line[ICON_WIDTH:].strip() for line in lines]
+    body = "\n".join(texts)
+
+    temperature = TEMPERATURE_RE.search(body)
+    wind = WIND_RE.search(body)
+    if not texts or not texts[0] or temperature is None or wind is None:
+        raise WttnParseError(f"unrecognised weather block: {lines!r}")
+
+    unit = f"°{temperature['unit']}"
+    precipitation = PRECIPITATION_RE.search(body)
+    return {
+        "conditions": texts[0],
+        "temperature": f"{temperature['temp']} {unit}",
+        "feels_like": f"{temperature['feels'] or temperature['temp']} {unit}",
+        "wind_speed": f"{wind['speed']} {wind['unit']}",
+        "wind_direction": WIND_DIRECTIONS[wind["arrow"]],
+        "precepitation": f"{precipitation['amount']} {precipitation['unit']}" if precipitation else "",
+        # the "| N%" after the amount is the chance of rain, the report has no humidity
+        "rain_chance": f"{precipitation['chance']}%" if precipitation and precipitation["chance"] else "",
+    }
+
+
+class WttnReportParser:
+    """
+    Line-oriented parser for the wttr.in ASCII report.
+
+    Text can be fed in arbitrary chunks as it arrives from the network,
+    close() returns the WttnFullReport once the whole report has been seen.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._raw: list[str] = []
+        self._state = "preamble"
+        self._city: str | None = None
+        self._now_lines: list[str] = []
+        self._days: list[dict] = []
+        self._rows: list[list[str]] = []
+        self._location: dict | None = None
+
+    def feed(self, chunk: str) -> None:
+        self._raw.append(chunk)
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split("\n")
+        for line in lines:
+            self._feed_line(line)
+
+    def _feed_line(self, line: str) -> None:
+        line = ANSI_ESCAPE_RE.sub("", line).rstrip("\r").rstrip()
+
+        location = LOCATION_RE.search(line)
+        if location:
+            self._location = location.groupdict()
+            return
+
+        if self._state == "preamble":
+            header = REPORT_HEADER_RE.search(line)
+            if header:
+                self._city = header["city"].strip()
+                self._state = "now"
+            return
+
+        if self._state == "now":
+            if "┌" not in line:
+                if line.strip():
+                    self._now_lines.append(line)
+                return
+            self._state = "tables"
+
+        day = DAY_HEADER_RE.search(line)
+        if day:
+            self._days.append({"weekday": " ".join(day["day"].split()), "periods": PERIODS_OF_DAY})
+            self._rows = []
+            return
+
+        if not self._days or not line.startswith("│"):
+            if line.startswith("└") and self._days and self._rows:
+                self._close_day()
+            return
+
+        cells = line.strip("│").split("│")
+        periods = re.findall(r"Morning|Noon|Evening|Night", line)
+        if periods and not self._rows:
+            self._days[-1]["periods"] = periods
+        else:
+            self._rows.append(cells)
+
+    def _close_day(self) -> None:
+        day = self._days[-1]
+        columns = list(zip(*self._rows))
+        if len(columns) != len(day["periods"]):
+            raise WttnParseError(f"expected {len(day['periods'])} columns for {day['weekday']}, got {len(columns)}")
+        day["forecast"] = [_parse_conditions(list(column)) for column in columns]
+        self._rows = []
+
+    def close_records(self) -> dict:
+        """
+        Finishes parsing and returns plain dicts, without building the pydantic models
+        """
+        if self._buffer:
+            self._feed_line(self._buffer)
+            self._buffer = ""
+        if self._city is None:
+            raise WttnParseError("missing 'Weather report:' header")
+        if self._location is None:
+            raise WttnParseError("missing 'Location: ... [lat,long]' line")
+        days = [day for day in self._days if "forecast" in day]
+        if len(days) < 3:
+            raise WttnParseError(f"expected 3 forecast days, got {len(days)}")
+
+        return {
+            "city": self._city,
+            "latitude": self._location["lat"],
+            "longitude": self._location["long"],
+            "now": _parse_conditions(self._now_lines),
+            "days": days[:3],
+            "raw": "".join(self._raw),
+        }
+
+    def close(self) -> WttnFullReport:
+        return records_to_report(self.close_records())
+
+
+def _report_fields(conditions: dict) -> dict:
+    fields = {key: value for key, value in conditions.items() if key != "rain_chance"}
+    # wttr.in's report does not show the humidity
+    fields["humidity"] = ""
+    return fields
+
+
+def records_to_report(records: dict) -> WttnFullReport:
+    place = {
+        "city": records["city"],
+        "location_logLat": records["latitude"],
+        "location_logLong": records["longitude"],
+    }
+    days = [
+        [
+            WttnPeriodReport(
+                weekday=day["weekday"],
+                periodofday=period,
+                periodforecast=WttnReport(**place, **_report_fields(forecast)),
+            )
+            for period, forecast in zip(day["periods"], day["forecast"])
+        ]
+        for day in records["days"]
+    ]
+    return WttnFullReport(
+        weather_now=WttnReport(**place, **_report_fields(records["now"])),
+        weather_forecast_day1=days[0],
+        weather_forecast_day2=days[1],
+        weather_forecast_day3=days[2],
+        weather_wttn_raw_response=records["raw"],
+    )
+
+
+def parse_wttn_records(text: str | Iterable[str]) -> dict:
+    parser = WttnReportParser()
+    for chunk in [text] if isinstance(text, str) else text:
+        parser.feed(chunk)
+    return parser.close_records()
+
+
+def parse_wttn_report(text: str | Iterable[str]) -> WttnFullReport:
+    """
+    Parses a raw wttr.in report, or an iterable of chunks of one, into a WttnFullReport
+    """
+    return records_to_report(parse_wttn_records(text))
+
+
+def _latency_summary(samples: list[float]) -> dict:
+    samples = sorted(samples)
+    return {
+        "runs": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p50_ms": samples[len(samples) // 2] * 1000,
+        "max_ms": samples[-1] * 1000,
+    }
+
+
+def benchmark_parser(text: str | None = None, runs: int = 1000) -> dict:
+    """
+    Times parse_wttn_report over the sample report (or the given text)
+    """
+    if text is None:
+        from helpers.wttn_agent import sample_wttn_response
+        text = sample_wttn_response()
+
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        parse_wttn_report(text)
+        samples.append(time.perf_counter() - start)
+    return _latency_summary(samples)
+
+
+async def benchmark_llm_extraction(run_config, city: str = "London", runs: int = 3) -> dict:
+    """
+    Times the weather_data_collector agent doing the same extraction through the model
+    """
+    from agents import Runner
+    from helpers.wttn_agent import get_weather_data_collector_agent
+
+    collector = get_weather_data_collector_agent()
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await Runner.run(collector, input=f"get the weather report for {city}", run_config=run_config)
+        samples.append(time.perf_counter() - start)
+    return _latency_summary(samples)
+
+
+async def compare_parser_with_llm(run_config, city: str = "London", runs: int = 3) -> dict:
+    parser = benchmark_parser()
+    llm = await benchmark_llm_extraction(run_config, city=city, runs=runs)
+    return {
+        "parser": parser,
+        "llm": llm,
+        "speedup": llm["mean_ms"] / parser["mean_ms"],
+    }
@@ -0,0 +1,259 @@
+import asyncio
+import json
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, AsyncIterator
+
+from pydantic import ValidationError
+from agents import Agent, Runner, RunConfig
+
+from helpers.wttn_models import WttnFullReport
+
+
+@dataclass
+class WeatherStreamEvent:
+    """
+    One event of a streamed weather run.
+
+    type is one of
+      agent_updated  data: name of the agent now running
+      tool_called    data: {"tool", "arguments"}
+      tool_output    data: tool output as returned to the model
+      handoff        data: {"from", "to"}
+      report_field   data: {"field", "value"}, a top-level WttnFullReport field is complete
+      report_item    data: {"field", "index", "value"}, one period of a forecast list is complete
+      report         data: the complete WttnFullReport
+      text_delta     data: Markdown text as the model writes it
+      done           data: the final output of the run
+    elapsed_s is measured from the start of the stream, so the first text_delta is the time to first byte.
+    """
+    type: str
+    agent: str
+    data: Any = None
+    elapsed_s: float = 0.0
+
+
+class PartialJsonObjectParser:
+    """
+    Incremental scanner over a JSON object arriving in chunks.
+
+    Every chunk is scanned once. A top-level field is decoded as soon as its value is
+    closed, and so is every item of a top-level array, so weather_now is available
+    while the forecast lists are still being generated.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.fields: dict[str, Any] = {}
+        self._pos = 0
+        self._stack: list[str] = []
+        self._in_string = False
+        self._escape = False
+        self._field_start = 0
+        self._key: str | None = None
+        self._item_start = 0
+        self._item_index = 0
+
+    def feed(self, chunk: str) -> list[tuple[str, str, Any, int | None]]:
+        """
+        Returns ("field", key, value, None) and ("item", key, value, index) tuples completed by this chunk
+        """
+        self.text += chunk
+        completed = []
+        text = self.text
+        for pos in range(self._pos, len(text)):
+            char = text[pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._stack.append(char)
+                if len(self._stack) == 1:
+                    self._field_start = pos + 1
+                elif len(self._stack) == 2 and char == "[":
+                    self._item_start = pos + 1
+                    self._item_index = 0
+            elif char in "}]":
+                self._close_item(pos, completed)
+                self._stack.pop()
+                if not self._stack:
+                    self._close_field(pos, completed)
+            elif char == ":" and len(self._stack) == 1:
+                self._key = json.loads(text[self._field_start:pos])
+            elif char == ",":
+                if len(self._stack) == 1:
+                    self._close_field(pos, completed)
+                else:
+                    self._close_item(pos, completed)
+        self._pos = len(text)
+        return completed
+
+    def _close_item(self, pos: int, completed: list) -> None:
+        if self._stack[-1:] != ["["] or len(self._stack) != 2:
+            return
+        segment = self.text[self._item_start:pos]
+        if segment.strip():
+            completed.append(("item", self._key, json.loads(segment), self._item_index))
+            self._item_index += 1
+        self._item_start = pos + 1
+
+    def _close_field(self, pos: int, completed: list) -> None:
+        segment = self.text[self._field_start:pos]
+        if segment.strip():
+            (key, value), = json.loads("{" + segment + "}").items()
+            self.fields[key] = value
+            completed.append(("field", key, value, None))
+        self._field_start = pos + 1
+        self._key = None
+
+
+_collector_events: ContextVar[asyncio.Queue | None] = ContextVar("wttn_collector_events", default=None)
+
+
+def _forward_collector_event(event: dict) -> None:
+    # runs inside the tool task, which inherits the context of the stream that started it
+    queue = _collector_events.get()
+    if queue is not None:
+        queue.put_nowait(event)
+
+
+def get_streaming_attn_agent(collector_mode: str = "llm") -> Agent:
+    """
+    The get_attn_agent graph with the nested collector run streamed
+    """
+    from helpers.wttn_agent import get_attn_agent
+
+    return get_attn_agent(collector_mode=collector_mode, collector_on_stream=_forward_collector_event)
+
+
+def _text_delta(event: Any) -> str | None:
+    data = getattr(event, "data", None)
+    if getattr(event, "type", None) == "raw_response_event" and getattr(data, "type", None) == "response.output_text.delta":
+        return data.delta
+    return None
+
+
+def _structured(agent: Agent) -> bool:
+    return agent.output_type not in (None, str)
+
+
+class _EventTranslator:
+    """
+    Turns SDK stream events, of the top-level run and the nested collector run, into WeatherStreamEvents
+    """
+
+    def __init__(self, start: float):
+        self.start = start
+        self.report_parsers: dict[str, PartialJsonObjectParser] = {}
+        self.report_sent = False
+
+    def new_event(self, type: str, agent: str, data: Any = None) -> WeatherStreamEvent:
+        return WeatherStreamEvent(type, agent, data, time.perf_counter() - self.start)
+
+    def _report_events(self, agent: str, text: str) -> list[WeatherStreamEvent]:
+        parser = self.report_parsers.setdefault(agent, PartialJsonObjectParser())
+        events = []
+        for kind, key, value, index in parser.feed(text):
+            if kind == "item":
+                events.append(self.new_event("report_item", agent, {"field": key, "index": index, "value": value}))
+            else:
+                events.append(self.new_event("report_field", agent, {"field": key, "value": value}))
+        return events
+
+    def _full_report(self, agent: str, output: Any) -> list[WeatherStreamEvent]:
+        if self.report_sent:
+            return []
+        try:
+            report = output if isinstance(output, WttnFullReport) else WttnFullReport.model_validate_json(output)
+        except (ValidationError, ValueError, TypeError):
+            return []
+        self.report_sent = True
+        return [self.new_event("report", agent, report)]
+
+    def translate(self, event: Any, agent: Agent) -> list[WeatherStreamEvent]:
+        delta = _text_delta(event)
+        if delta is not None:
+            if _structured(agent):
+                return self._report_events(agent.name, delta)
+            return [self.new_event("text_delta", agent.name, delta)]
+
+        if event.type == "agent_updated_stream_event":
+            return [self.new_event("agent_updated", event.new_agent.name, event.new_agent.name)]
+        if event.type != "run_item_stream_event":
+            return []
+
+        item = event.item
+        if event.name == "tool_called":
+            raw = item.raw_item
+            return [self.new_event("tool_called", agent.name, {
+                "tool": getattr(raw, "name", None), "arguments": getattr(raw, "arguments", None),
+            })]
+        if event.name == "tool_output":
+            return [self.new_event("tool_output", agent.name, item.output), *self._full_report(agent.name, item.output)]
+        if event.name == "handoff_occured":
+            return [self.new_event("handoff", agent.name, {"from": item.source_agent.name, "to": item.target_agent.name})]
+        if event.name == "message_output_created" and _structured(agent):
+            parser = self.report_parsers.get(agent.name)
+            return self._full_report(agent.name, parser.text if parser else None)
+        return []
+
+
+async def stream_weather_report(
+        input: str | list,
+        run_config: RunConfig | None = None,
+        collector_mode: str = "llm",
+        agent: Agent | None = None,
+        max_turns: int = 10) -> AsyncIterator[WeatherStreamEvent]:
+    """
+    Streams the weather graph with Runner.run_streamed.
+
+    Yields progress events for tool calls and handoffs, report_field / report_item events
+    as the collector's WttnFullReport JSON is generated (or the whole report at once in
+    parser mode), then the summariser's Markdown as text_delta events and finally done.
+    """
+    agent = agent or get_streaming_attn_agent(collector_mode)
+    queue: asyncio.Queue = asyncio.Queue()
+    token = _collector_events.set(queue)
+    try:
+        result = Runner.run_streamed(agent, input, run_config=run_config, max_turns=max_turns)
+    finally:
+        _collector_events.reset(token)
+
+    translator = _EventTranslator(time.perf_counter())
+    current = agent
+
+    async def pump() -> None:
+        try:
+            async for event in result.stream_events():
+                await queue.put({"event": event, "agent": None})
+        finally:
+            await queue.put(None)
+
+    pumping = asyncio.create_task(pump())
+    try:
+        while (payload := await queue.get()) is not None:
+            event = payload["event"]
+            if payload["agent"] is None:
+                # top-level events, the running agent changes on handoff
+                if event.type == "agent_updated_stream_event":
+                    current = event.new_agent
+                source = current
+            else:
+                source = payload["agent"]
+            for translated in translator.translate(event, source):
+                yield translated
+        await pumping
+        yield translator.new_event("done", current.name, result.final_output)
+    finally:
+        if not pumping.done():
+            result.cancel()
+            pumping.cancel()
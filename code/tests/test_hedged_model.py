@@ -0,0 +1,117 @@
+"""
+helpers.hedged_model against two local FakeModelServers, run from code/ with: python -m pytest tests
+"""
+import asyncio
+import time
+import unittest
+
+from openai import AsyncOpenAI
+from agents import Agent, RunConfig, Runner
+
+from helpers.fake_model_server import NO_LATENCY, FakeModelServer, LatencyProfile
+from helpers.hedged_model import HedgedModelProvider, get_hedged_github_model_provider
+
+SLOW = LatencyProfile(ttft_median_ms=1000, ttft_sigma=0.0, tokens_per_second=(0, 0))
+
+
+class HedgedModelTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.primary = FakeModelServer(latency=NO_LATENCY, error_status=503)
+        self.secondary = FakeModelServer(latency=NO_LATENCY)
+        self.primary_url = await self.primary.start()
+        self.secondary_url = await self.secondary.start()
+        self.agent = Agent(name="assistant", instructions="answer briefly")
+
+    async def asyncTearDown(self):
+        await self.primary.stop()
+        await self.secondary.stop()
+
+    def provider(self, **options) -> HedgedModelProvider:
+        return get_hedged_github_model_provider(
+            AsyncOpenAI(base_url=self.primary_url, api_key="test"), "gpt-4o-mini",
+            secondary_client=AsyncOpenAI(base_url=self.secondary_url, api_key="test"),
+            **options,
+        )
+
+    async def run_agent(self, provider: HedgedModelProvider, agent: Agent | None = None) -> float:
+        start = time.perf_counter()
+        result = await Runner.run(
+            agent or self.agent, "hello", run_config=RunConfig(model_provider=provider, tracing_disabled=True),
+        )
+        self.assertTrue(result.final_output)
+        return time.perf_counter() - start
+
+    async def test_hedge_fires_and_loser_is_cancelled(self):
+        self.primary.latency = SLOW
+        provider = self.provider(initial_hedge_delay=0.1)
+        elapsed = await self.run_agent(provider)
+        primary, secondary = provider.stats()[None].values()
+        self.assertLess(elapsed, 0.9)
+        self.assertEqual((secondary["hedged"], secondary["won"]), (1, 1))
+        self.assertEqual((primary["won"], primary["cancelled"]), (0, 1))
+
+    async def test_no_hedge_when_primary_answers_in_time(self):
+        provider = self.provider(initial_hedge_delay=0.5)
+        await self.run_agent(provider)
+        primary, secondary = provider.stats()[None].values()
+        self.assertEqual(primary["won"], 1)
+        self.assertEqual(secondary["started"], 0)
+        self.assertEqual(self.secondary.requests, 0)
+
+    async def test_503_fails_over_without_waiting_for_the_hedge(self):
+        self.primary.error_rate = 1.0
+        provider = self.provider(initial_hedge_delay=5.0)
+        elapsed = await self.run_agent(provider)
+        primary, secondary = provider.stats()[None].values()
+        self.assertLess(elapsed, 2.0)
+        self.assertEqual(primary["failed"], 1)
+        self.assertEqual((secondary["hedged"], secondary["won"]), (0, 1))
+
+    async def test_breaker_opens_half_opens_and_closes(self):
+        self.primary.error_rate = 1.0
+        provider = self.provider(initial_hedge_delay=5.0, failure_threshold=2, reset_timeout=0.3)
+        breaker = provider.breakers[0]
+
+        for _ in range(2):
+            await self.run_agent(provider)
+        self.assertEqual(breaker.state, "open")
+
+        # while open the primary is skipped
+        requests = self.primary.requests
+        await self.run_agent(provider)
+        self.assertEqual(self.primary.requests, requests)
+        primary, _ = provider.stats()[None].values()
+        self.assertEqual(primary["skipped"], 1)
+
+        self.primary.error_rate = 0.0
+        await asyncio.sleep(0.35)
+        self.assertEqual(breaker.state, "half_open")
+        await self.run_agent(provider)
+        self.assertEqual(self.primary.requests, requests + 1)
+        self.assertEqual(breaker.state, "closed")
+
+    async def test_failed_probe_reopens_the_breaker(self):
+        self.primary.error_rate = 1.0
+        provider = self.provider(initial_hedge_delay=5.0, failure_threshold=1, reset_timeout=0.2)
+        await self.run_agent(provider)
+        await asyncio.sleep(0.25)
+        self.assertEqual(provider.breakers[0].state, "half_open")
+        await self.run_agent(provider)
+        self.assertEqual(provider.breakers[0].state, "open")
+
+    async def test_breaker_is_shared_by_model_names(self):
+        self.primary.error_rate = 1.0
+        provider = self.provider(initial_hedge_delay=5.0, failure_threshold=1)
+        await self.run_agent(provider)
+        self.assertEqual(provider.breakers[0].state, "open")
+
+        # another model name on the same endpoint does not have to trip it again
+        requests = self.primary.requests
+        await self.run_agent(provider, self.agent.clone(model="gpt-4o"))
+        self.assertEqual(self.primary.requests, requests)
+        self.assertIs(provider.get_model("gpt-4o").endpoints[0].breaker, provider.get_model(None).endpoints[0].breaker)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+"""
+helpers.history as a Runner session on SQLite, run from code/ with: python -m pytest tests
+"""
+import os
+import tempfile
+import threading
+import unittest
+
+from helpers.history import ConversationHistory
+
+
+def message(role: str, text: str) -> dict:
+    return {"role": role, "content": text}
+
+
+class ConversationHistoryTestCase(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "history.sqlite")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_history(self, **kwargs) -> ConversationHistory:
+        history = ConversationHistory(session_id="s", path=self.path, **kwargs)
+        self.addCleanup(history.store.close)
+        return history
+
+    async def test_reading_is_not_a_turn(self):
+        history = self.make_history()
+        await history.add_items([message("user", "hi"), message("assistant", "hello")])
+        self.assertEqual(len(history.reports), 1)
+        for limit in (None, 1, None):
+            await history.get_items(limit)
+        self.assertEqual(len(history.reports), 1)
+        self.assertEqual(await history.get_items(1), [message("assistant", "hello")])
+
+        await history.add_items([message("user", "and now?")])
+        report = history.reports[-1]
+        self.assertEqual((report.turn, report.items, report.stable_prefix_items), (2, 3, 2))
+
+    async def test_store_writes_run_off_the_event_loop(self):
+        history = self.make_history()
+        loop_thread = threading.get_ident()
+        threads = []
+        for name in ("append", "set_state", "delete"):
+            write = getattr(history.store, name)
+
+            def record(*args, write=write):
+                threads.append(threading.get_ident())
+                return write(*args)
+
+            setattr(history.store, name, record)
+
+        await history.add_items([message("user", "hi")])
+        await history.pop_item()
+        await history.clear_session()
+        self.assertEqual(len(threads), 3)
+        self.assertNotIn(loop_thread, threads)
+
+    async def test_rewrite_is_persisted(self):
+        history = self.make_history(token_budget=150, pinned=1, keep_recent=1, draft_agents=["writer"])
+        await history.add_items([message("user", "write me a poem")])
+        history.add([message("assistant", f"draft {i} " + "words " * 20) for i in range(3)], agent="writer")
+        self.assertFalse(any(e.state == "dropped" for e in history.entries))
+        # the session write goes over budget and rewrites
+        await history.add_items([message("user", "thanks " * 10)])
+        self.assertTrue(history.reports[-1].rewritten)
+        drafts = [e for e in history.entries if e.agent == "writer"]
+        self.assertEqual([e.state for e in drafts], ["dropped", "dropped", "active"])
+
+        reloaded = ConversationHistory(session_id="s", path=self.path)
+        self.addCleanup(reloaded.store.close)
+        self.assertEqual(await reloaded.get_items(), await history.get_items())
+        self.assertEqual(reloaded.reports, [])
+
+    async def test_pop_and_clear_reach_the_store(self):
+        history = self.make_history()
+        await history.add_items([message("user", "a"), message("assistant", "b")])
+        self.assertEqual(await history.pop_item(), message("assistant", "b"))
+        self.assertEqual(len(history.store.load("s")), 1)
+        await history.clear_session()
+        self.assertEqual(history.store.load("s"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
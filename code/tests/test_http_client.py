@@ -0,0 +1,152 @@
+"""
+helpers.http_client against a local stub server, run from code/ with: python -m pytest tests
+"""
+import asyncio
+import unittest
+
+import httpx
+
+from helpers import http_client
+from helpers.http_client import aclose_http_pool, configure_http_pool, fetch_text, get_http_client
+
+
+class StubServer:
+    """
+    Minimal keep-alive HTTP/1.1 server on 127.0.0.1, the path picks the behaviour:
+
+    /fail/<n>  503 for the first n requests, then 200
+    /down      always 503
+    /slow/<s>  the first request waits s seconds before answering, then 200
+    /hold      answers after a short wait, counting requests in progress
+    """
+
+    def __init__(self):
+        self.hits: dict[str, int] = {}
+        self.active = 0
+        self.max_active = 0
+        self._server: asyncio.AbstractServer | None = None
+        self._connections: set[asyncio.Task] = set()
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._connection, "127.0.0.1", 0)
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def stop(self) -> None:
+        self._server.close()
+        for task in self._connections:
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        await self._server.wait_closed()
+
+    async def _connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._connections.add(asyncio.current_task())
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    return
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                path = request_line.split()[1].decode()
+                status, body = await self._respond(path)
+                writer.write(
+                    f"HTTP/1.1 {status} X\r\nContent-Length: {len(body)}\r\n\r\n{body}".encode()
+                )
+                await writer.drain()
+        except (asyncio.CancelledError, ConnectionError):
+            pass
+        finally:
+            self._connections.discard(asyncio.current_task())
+            writer.close()
+
+    async def _respond(self, path: str) -> tuple[int, str]:
+        hits = self.hits[path] = self.hits.get(path, 0) + 1
+        kind, _, argument = path.strip("/").partition("/")
+        if kind == "fail":
+            return (503, "unavailable") if hits <= int(argument) else (200, "ok")
+        if kind == "down":
+            return 503, "unavailable"
+        if kind == "slow":
+            if hits == 1:
+                await asyncio.sleep(float(argument))
+            return 200, "ok"
+        if kind == "hold":
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            try:
+                await asyncio.sleep(0.05)
+            finally:
+                self.active -= 1
+            return 200, "ok"
+        return 404, "not found"
+
+
+class HttpClientTestCase(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.defaults = (http_client.HTTP_TIMEOUT, http_client.HTTP_LIMITS, http_client.MAX_IN_FLIGHT)
+
+    def tearDown(self):
+        configure_http_pool(*self.defaults)
+
+    async def asyncSetUp(self):
+        self.server = StubServer()
+        self.url = await self.server.start()
+
+    async def asyncTearDown(self):
+        await aclose_http_pool()
+        await self.server.stop()
+
+    async def test_retries_5xx_until_success(self):
+        text = await fetch_text(f"{self.url}/fail/2", backoff=0.01)
+        self.assertEqual(text, "ok")
+        self.assertEqual(self.server.hits["/fail/2"], 3)
+
+    async def test_gives_up_after_retries(self):
+        with self.assertRaises(httpx.HTTPStatusError) as raised:
+            await fetch_text(f"{self.url}/down", retries=2, backoff=0.01)
+        self.assertEqual(raised.exception.response.status_code, 503)
+        self.assertEqual(self.server.hits["/down"], 3)
+
+    async def test_retries_timeouts(self):
+        configure_http_pool(timeout=httpx.Timeout(0.2))
+        text = await fetch_text(f"{self.url}/slow/1", backoff=0.01)
+        self.assertEqual(text, "ok")
+        self.assertEqual(self.server.hits["/slow/1"], 2)
+
+    async def test_timeout_raised_after_retries(self):
+        configure_http_pool(timeout=httpx.Timeout(0.2))
+        with self.assertRaises(httpx.TimeoutException):
+            await fetch_text(f"{self.url}/slow/1", retries=0)
+
+    async def test_in_flight_cap(self):
+        configure_http_pool(limits=httpx.Limits(max_connections=50), max_in_flight=3)
+        texts = await asyncio.gather(*(fetch_text(f"{self.url}/hold") for _ in range(12)))
+        self.assertEqual(texts, ["ok"] * 12)
+        self.assertEqual(self.server.max_active, 3)
+
+    async def test_one_client_per_loop(self):
+        self.assertIs(get_http_client(), get_http_client())
+
+
+class PoolPerLoopTestCase(unittest.TestCase):
+
+    def test_each_event_loop_gets_its_own_pool(self):
+        async def fetch() -> httpx.AsyncClient:
+            server = StubServer()
+            url = await server.start()
+            try:
+                self.assertEqual(await fetch_text(f"{url}/hold"), "ok")
+                return get_http_client()
+            finally:
+                await server.stop()
+
+        # the second loop must not reuse connections pooled by the first, now closed, loop
+        first = asyncio.run(fetch())
+        second = asyncio.run(fetch())
+        self.assertIsNot(first, second)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+"""
+helpers.semantic_cache on an in-memory chromadb, run from code/ with: python -m pytest tests
+"""
+import time
+import unittest
+import uuid
+
+from helpers.semantic_cache import SemanticCache, normalize_query
+
+
+class NormalizeQueryTestCase(unittest.TestCase):
+
+    def test_folds_case_accents_punctuation_and_filler_words(self):
+        self.assertEqual(normalize_query("What is the weather in Zürich today?"), "weather zurich")
+        self.assertEqual(normalize_query("weather   ZURICH"), "weather zurich")
+
+    def test_keeps_word_order(self):
+        self.assertNotEqual(normalize_query("convert 10 USD to EUR"), normalize_query("convert 10 EUR to USD"))
+
+
+class SemanticCacheTestCase(unittest.TestCase):
+
+    def make_cache(self, **kwargs) -> SemanticCache:
+        # the in-memory client is shared by the process, a collection per test keeps them apart
+        return SemanticCache(path=None, collection=f"test_{uuid.uuid4().hex}", **kwargs)
+
+    def test_near_duplicate_query_hits(self):
+        cache = self.make_cache()
+        cache.store("What is the weather in London today?", "scope", '"sunny"', "weather_agent")
+        found = cache.lookup("weather in london", "scope")
+        self.assertIsNotNone(found)
+        self.assertEqual(found["answer"], '"sunny"')
+        self.assertEqual(found["agent"], "weather_agent")
+        self.assertAlmostEqual(found["similarity"], 1.0, places=5)
+
+    def test_reversed_query_misses(self):
+        cache = self.make_cache()
+        cache.store("convert 10 USD to EUR", "scope", '"9.2 EUR"')
+        self.assertIsNone(cache.lookup("convert 10 EUR to USD", "scope"))
+        cache.store("Flights from London to Paris", "scope", '"AF1681"')
+        self.assertIsNone(cache.lookup("Flights from Paris to London", "scope"))
+        self.assertEqual(cache.stats()["hits"], 0)
+
+    def test_other_scope_misses(self):
+        cache = self.make_cache()
+        cache.store("weather in London", "graph-a", '"sunny"')
+        self.assertIsNone(cache.lookup("weather in London", "graph-b"))
+
+    def test_expired_entry_misses_and_is_deleted(self):
+        cache = self.make_cache(ttl=0.05)
+        cache.store("weather in London", "scope", '"sunny"')
+        self.assertIsNotNone(cache.lookup("weather in London", "scope"))
+        time.sleep(0.1)
+        self.assertIsNone(cache.lookup("weather in London", "scope"))
+        self.assertEqual(cache.stats()["expired"], 1)
+        self.assertEqual(cache.stats()["entries"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+"""
+helpers.wttn_analytics on the bundled sample report, run from code/ with: python -m pytest tests
+"""
+import copy
+import unittest
+
+from helpers.wttn_agent import sample_wttn_response
+from helpers.wttn_analytics import ForecastColumns, detect_findings, findings_summary
+from helpers.wttn_parser import parse_wttn_records
+
+
+class FindingsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        record = parse_wttn_records(sample_wttn_response())
+        hot = copy.deepcopy(record)
+        hot["days"][0]["forecast"][0]["temperature"] = "+40(38) °C"
+        # two rows with the same city name
+        self.columns = ForecastColumns.from_records([record, hot])
+
+    def test_findings_carry_the_row(self):
+        findings = detect_findings(self.columns)
+        self.assertEqual([f.city_index for f in findings], sorted(f.city_index for f in findings))
+        swings = {f.city_index: f.value for f in findings if f.kind == "temperature_swing" and f.day == 0}
+        self.assertEqual(set(swings), {0, 1})
+        self.assertLess(swings[0], swings[1])
+
+    def test_summary_lists_each_finding_under_its_own_row(self):
+        summary = findings_summary(self.columns)
+        self.assertEqual(summary.count("swings 32 °C"), 1)
+        self.assertEqual(summary.count("swings 9 °C"), 1)
+        first, second = summary.split("London now:")[1:]
+        self.assertIn("swings 9 °C", first)
+        self.assertNotIn("swings 32 °C", first)
+        self.assertIn("swings 32 °C", second)
+        self.assertNotIn("swings 9 °C", second)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+"""
+helpers.cache_util and the wttr.in report cache against the fake server, run from code/ with: python -m pytest tests
+"""
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+
+from helpers.cache_util import SingleFlight, TTLCache
+from helpers.fake_model_server import FakeModelServer
+from helpers.http_client import aclose_http_pool
+from helpers.wttn_agent import sample_wttn_response
+from helpers.wttn_client import WttnReportCache, normalize_location
+
+
+class TTLCacheTestCase(unittest.TestCase):
+
+    def test_evicts_least_recently_used(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((cache.get("a"), cache.get("c")), (1, 3))
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.stats.evictions, 1)
+
+    def test_entries_expire(self):
+        cache = TTLCache(maxsize=8, ttl=0.05)
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=60)
+        self.assertEqual(cache.get("a"), 1)
+        time.sleep(0.1)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("b"), 2)
+        self.assertEqual(len(cache), 1)
+        stats = cache.stats.to_dict()
+        self.assertEqual((stats["hits"], stats["misses"], stats["expirations"]), (2, 1, 1))
+
+
+class SingleFlightTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def test_concurrent_calls_share_one(self):
+        single_flight = SingleFlight()
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return calls
+
+        results = await asyncio.gather(*(single_flight.do("key", fetch) for _ in range(10)))
+        self.assertEqual(results, [1] * 10)
+        self.assertEqual(calls, 1)
+        self.assertEqual(single_flight.coalesced, 9)
+        self.assertFalse(single_flight.in_flight("key"))
+        # once done the next call runs again
+        self.assertEqual(await single_flight.do("key", fetch), 2)
+
+    async def test_cancelled_waiter_does_not_cancel_the_call(self):
+        single_flight = SingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        first = asyncio.ensure_future(single_flight.do("key", fetch))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(single_flight.do("key", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        self.assertEqual(await second, "done")
+
+
+class WttnReportCacheTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.server = FakeModelServer()
+        self.endpoint = f"{await self.server.start()}/wttr"
+
+    async def asyncTearDown(self):
+        await aclose_http_pool()
+        await self.server.stop()
+
+    def test_normalize_location(self):
+        self.assertEqual(normalize_location("  LONDON "), normalize_location("london"))
+        self.assertEqual(normalize_location("Birmingham ,UK"), "birmingham, uk")
+        self.assertNotEqual(normalize_location("Birmingham, UK"), normalize_location("Birmingham, US"))
+
+    async def test_concurrent_misses_fetch_once(self):
+        cache = WttnReportCache(ttl=60, endpoint=self.endpoint)
+        reports = await asyncio.gather(*(cache.get_report(city) for city in ["London", " london", "LONDON"] * 4))
+        self.assertEqual(set(reports), {sample_wttn_response()})
+        self.assertEqual(cache.upstream_fetches, 1)
+        stats = cache.stats()
+        self.assertEqual((stats["coalesced"], stats["size"]), (11, 1))
+
+        await cache.get_report("London")
+        self.assertEqual(cache.upstream_fetches, 1)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    async def test_expired_report_is_fetched_again(self):
+        cache = WttnReportCache(ttl=0.05, endpoint=self.endpoint)
+        await cache.get_report("London")
+        await asyncio.sleep(0.1)
+        await cache.get_report("London")
+        self.assertEqual(cache.upstream_fetches, 2)
+
+    async def test_disk_store_survives_a_restart(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "wttn.sqlite")
+            first = WttnReportCache(ttl=60, disk_path=path, endpoint=self.endpoint)
+            await first.get_report("London")
+            first.disk.close()
+
+            second = WttnReportCache(ttl=60, disk_path=path, endpoint=self.endpoint)
+            self.assertEqual(await second.get_report("london"), sample_wttn_response())
+            self.assertEqual((second.upstream_fetches, second.disk_hits), (0, 1))
+            second.disk.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+helpers.wttn_parser on the bundled sample report, run from code/ with: python -m pytest tests
+"""
+import unittest
+
+from helpers.wttn_agent import sample_wttn_response
+from helpers.wttn_parser import WttnParseError, WttnReportParser, parse_wttn_records, parse_wttn_report
+
+
+def chunks(text: str, size: int) -> list[str]:
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class WttnParserTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.text = sample_wttn_response()
+
+    def assert_sample(self, records: dict):
+        self.assertEqual(records["city"], "London")
+        self.assertEqual(records["latitude"], "51.5073219")
+        self.assertEqual(records["longitude"], "-0.1276474")
+        self.assertEqual(records["now"], {
+            "conditions": "Partly cloudy",
+            "temperature": "+7 °C",
+            "feels_like": "4 °C",
+            "wind_speed": "18 km/h",
+            "wind_direction": "south west",
+            "precepitation": "0.0 mm",
+            "rain_chance": "",
+        })
+        self.assertEqual(len(records["days"]), 3)
+        day = records["days"][0]
+        self.assertEqual(day["weekday"], "Sat 05 Apr")
+        self.assertEqual(day["periods"], ["Morning", "Noon", "Evening", "Night"])
+        self.assertEqual(dict(zip(day["periods"], day["forecast"]))["Noon"], {
+            "conditions": "Sunny",
+            "temperature": "17 °C",
+            "feels_like": "17 °C",
+            "wind_speed": "20-23 km/h",
+            "wind_direction": "south west",
+            "precepitation": "0.0 mm",
+            "rain_chance": "0%",
+        })
+        self.assertEqual(records["raw"], self.text)
+
+    def test_whole_report(self):
+        self.assert_sample(parse_wttn_records(self.text))
+
+    def test_small_chunks(self):
+        for size in (1, 7, 64):
+            with self.subTest(size=size):
+                self.assert_sample(parse_wttn_records(chunks(self.text, size)))
+
+    def test_feed_and_close_build_the_report(self):
+        parser = WttnReportParser()
+        for chunk in chunks(self.text, 13):
+            parser.feed(chunk)
+        report = parser.close()
+        self.assertEqual(report, parse_wttn_report(self.text))
+        self.assertEqual(report.weather_now.city, "London")
+        self.assertEqual(report.weather_now.location_logLat, "51.5073219")
+        self.assertEqual(report.weather_now.location_logLong, "-0.1276474")
+        self.assertEqual(report.weather_now.humidity, "")
+        noon = report.weather_forecast_day1[1]
+        self.assertEqual((noon.weekday, noon.periodofday), ("Sat 05 Apr", "Noon"))
+        self.assertEqual(noon.periodforecast.temperature, "17 °C")
+
+    def test_truncated_report_raises(self):
+        cut = self.text.index("Sun 06 Apr")
+        with self.assertRaises(WttnParseError):
+            parse_wttn_records(self.text[:cut])
+        with self.assertRaises(WttnParseError):
+            parse_wttn_records("")
+
+    def test_missing_days_raise(self):
+        # keep the trailing Location line so only the forecast days are missing
+        location = self.text[self.text.index("Location:"):]
+        cut = self.text.index("Mon 07 Apr")
+        with self.assertRaisesRegex(WttnParseError, "expected 3 forecast days, got 2"):
+            parse_wttn_records(self.text[:cut] + "\n" + location)
+
+    def test_missing_header_raises(self):
+        with self.assertRaisesRegex(WttnParseError, "Weather report"):
+            parse_wttn_records(self.text.replace("Weather report:", ""))
+
+    def test_truncated_day_raises(self):
+        lines = self.text.split("\n")
+        # drop one table row so a day has cells that do not line up into columns
+        row = next(i for i, line in enumerate(lines) if "+12(10) °C" in line)
+        broken = "\n".join(lines[:row] + [lines[row][:40]] + lines[row + 1:])
+        with self.assertRaises(WttnParseError):
+            parse_wttn_records(broken)
+
+
+if __name__ == "__main__":
+    unittest.main()